@@ -0,0 +1,98 @@
+# api/db/async_supabase_client.py
+
+from typing import Optional
+
+from flask import g, has_request_context
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from api.db.supabase_client import (
+    SUPABASE_ANON_KEY,
+    SUPABASE_HTTP_TIMEOUT,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_URL,
+    is_stateless_mode,
+)
+from api.utils.logger_config import logger
+
+
+def _async_options(token: str) -> AsyncClientOptions:
+    # Passing the Authorization header up front scopes PostgREST and storage to
+    # the token without GoTrue session handling.
+    return AsyncClientOptions(
+        headers={"Authorization": f"Bearer {token}"},
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=SUPABASE_HTTP_TIMEOUT,
+        storage_client_timeout=int(SUPABASE_HTTP_TIMEOUT),
+    )
+
+
+async def get_async_supabase_client(
+    user_jwt: Optional[str] = None, refresh_token: Optional[str] = None
+) -> AsyncClient:
+    """
+    Creates an asyncio Supabase client scoped to the current user's JWT.
+
+    The client's HTTP connections belong to the running event loop, so create
+    one per request and share it between the coroutines of that request.
+    """
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        logger.error("Supabase URL or Anon Key not found in environment variables.")
+        raise ValueError("Supabase URL or Anon Key not found in environment variables.")
+
+    if has_request_context():
+        if user_jwt is None and (not is_stateless_mode() or g.get("user_id", None)):
+            user_jwt = g.get("user_jwt", None)
+        if refresh_token is None:
+            refresh_token = g.get("refresh_token", None)
+
+    authenticated = bool(user_jwt) and (is_stateless_mode() or bool(refresh_token))
+    token = user_jwt if authenticated else SUPABASE_ANON_KEY
+
+    try:
+        client = await acreate_client(
+            SUPABASE_URL, SUPABASE_ANON_KEY, _async_options(token)
+        )
+        if authenticated and not is_stateless_mode():
+            await client.auth.get_user(user_jwt)
+        logger.info(
+            f"Async Supabase client created ({'user' if authenticated else 'anon'})."
+        )
+        return client
+    except Exception as e:
+        logger.error(f"Error creating async Supabase client: {e}")
+        raise
+
+
+async def get_async_supabase_admin_client() -> AsyncClient:
+    """
+    Creates an asyncio Supabase client with the service role key.
+    This client BYPASSES all Row-Level Security policies.
+    """
+    if not SUPABASE_SERVICE_KEY:
+        logger.error(
+            "SUPABASE_SERVICE_ROLE_KEY is not configured. Cannot create admin client."
+        )
+        raise ValueError("Service role key is not configured.")
+
+    if not SUPABASE_URL:
+        logger.error("Supabase URL not found in environment variables.")
+        raise ValueError("Supabase URL not found in environment variables.")
+
+    try:
+        return await acreate_client(
+            SUPABASE_URL, SUPABASE_SERVICE_KEY, _async_options(SUPABASE_SERVICE_KEY)
+        )
+    except Exception as e:
+        logger.error(f"Error creating async Supabase admin client: {e}")
+        raise
+
+
+async def close_async_client(client: AsyncClient) -> None:
+    """
+    Closes the HTTP connections of an async client created by this module.
+    Sub-clients are created on first use, so only those that exist are closed.
+    """
+    for sub_client in (client._postgrest, client._storage):
+        if sub_client is not None:
+            await sub_client.aclose()
+    await client.auth.close()
@@ -0,0 +1,663 @@
+# api/db/cache.py
+
+import functools
+import math
+import os
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import redis
+from dotenv import load_dotenv
+
+from api.utils.json_provider import dumps_bytes, loads_bytes
+from api.utils.logger_config import logger
+
+load_dotenv()
+
+# With REDIS_URL set, cached entries are shared by every instance; without it
+# each process keeps its own LocalCache.
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "books-api")
+# How long an instance trusts its copy of an entity version before re-reading
+# it; bounds how long other instances serve entries from before an invalidate().
+CACHE_VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", "2"))
+# Version counters expire this long after their last invalidate() (at least the
+# entity's TTL plus stale TTL), so per-user scopes do not pile up in Redis. Once
+# a counter is gone every entry written under it has expired too.
+CACHE_VERSION_KEY_TTL = int(os.getenv("CACHE_VERSION_KEY_TTL", str(7 * 86400)))
+CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "10000"))
+# Decoded entries kept in each process in front of the shared store.
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "1000"))
+# XFetch beta: >1 refreshes hot keys earlier, 0 disables early refresh.
+CACHE_EARLY_REFRESH_BETA = float(os.getenv("CACHE_EARLY_REFRESH_BETA", "1.0"))
+# How long callers wait on another caller's load of the same key.
+CACHE_FLIGHT_TIMEOUT = float(os.getenv("CACHE_FLIGHT_TIMEOUT", "10"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+
+# Default TTL in seconds per entity, overridable with CACHE_TTL_<ENTITY>.
+DEFAULT_TTLS = {
+    "categories": 300,
+    "candidates": 600,
+    "discover": 60,
+    "epub_paths": 86400,
+}
+DEFAULT_TTL = 60
+
+# How long past its TTL an entry may still be served, while it is refreshed in
+# the background or when the refresh fails; CACHE_STALE_TTL_<ENTITY> overrides.
+DEFAULT_STALE_TTLS = {
+    "categories": 86400,
+    "discover": 600,
+}
+
+
+def entity_ttl(entity: str) -> int:
+    return int(
+        os.getenv(f"CACHE_TTL_{entity.upper()}", DEFAULT_TTLS.get(entity, DEFAULT_TTL))
+    )
+
+
+def entity_stale_ttl(entity: str) -> int:
+    return int(
+        os.getenv(
+            f"CACHE_STALE_TTL_{entity.upper()}", DEFAULT_STALE_TTLS.get(entity, 0)
+        )
+    )
+
+
+class CachedJSON:
+    """
+    A cached JSON document. `raw` holds the encoded bytes exactly as stored,
+    so a hit can be written to a response without decoding and re-encoding;
+    `data` decodes them on first access.
+
+    `stale_for` is None for a fresh value, otherwise the seconds since it
+    expired; `stale_reason` is "revalidating" while a refresh is running
+    and "error" when the last refresh failed.
+    """
+
+    __slots__ = ("raw", "_data", "_decoded", "stale_for", "stale_reason")
+
+    def __init__(self, raw: bytes, data: Any = None, decoded: bool = False):
+        self.raw = raw
+        self._data = data
+        self._decoded = decoded
+        self.stale_for: Optional[float] = None
+        self.stale_reason: Optional[str] = None
+
+    def as_stale(self, stale_for: float, reason: str) -> "CachedJSON":
+        """Returns a copy marked stale; it shares the bytes and decoded data."""
+        stale = CachedJSON(self.raw, self.data, decoded=True)
+        stale.stale_for = stale_for
+        stale.stale_reason = reason
+        return stale
+
+    @classmethod
+    def encode(cls, data: Any) -> "CachedJSON":
+        return cls(dumps_bytes(data), data, decoded=True)
+
+    @property
+    def data(self) -> Any:
+        if not self._decoded:
+            self._data = loads_bytes(self.raw)
+            self._decoded = True
+        return self._data
+
+
+class LocalCache:
+    """
+    In-process stand-in for Redis with the subset of commands SharedCache
+    uses. Entries expire after their TTL; past `max_entries` the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = CACHE_LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # key -> (expires_at, value)
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._get(key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ex if ex else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set_many(self, items: Dict[str, bytes], ex: Optional[int] = None) -> None:
+        for key, value in items.items():
+            self.set(key, value, ex)
+
+    def incr(self, key: str, ex: Optional[int] = None, start: int = 0) -> int:
+        expires_at = time.monotonic() + ex if ex else float("inf")
+        with self._lock:
+            current = self._get(key)
+            value = int(current) + 1 if current is not None else start + 1
+            self._entries[key] = (expires_at, str(value).encode())
+            self._entries.move_to_end(key)
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Adapter exposing a redis.Redis client through the LocalCache interface."""
+
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(
+            url,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(key)
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return self._redis.mget(keys)
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        self._redis.set(key, value, ex=ex)
+
+    def set_many(self, items: Dict[str, bytes], ex: Optional[int] = None) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(key, value, ex=ex)
+        pipeline.execute()
+
+    def incr(self, key: str, ex: Optional[int] = None, start: int = 0) -> int:
+        if not ex and not start:
+            return self._redis.incr(key)
+        pipeline = self._redis.pipeline(transaction=True)
+        pipeline.set(key, start, nx=True)
+        pipeline.incr(key)
+        if ex:
+            pipeline.expire(key, ex)
+        return pipeline.execute()[1]
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+
+class _Entry(NamedTuple):
+    expires_at: float  # wall-clock, so every instance agrees
+    stale_until: float  # served stale (and refreshed) until then
+    delta: float  # seconds the loader took, for early refresh
+    value: CachedJSON
+
+
+_ENVELOPE = struct.Struct("!ddd")
+
+
+def _pack(entry: _Entry) -> bytes:
+    header = _ENVELOPE.pack(entry.expires_at, entry.stale_until, entry.delta)
+    return header + entry.value.raw
+
+
+def _unpack(stored: bytes) -> _Entry:
+    expires_at, stale_until, delta = _ENVELOPE.unpack_from(stored)
+    return _Entry(expires_at, stale_until, delta, CachedJSON(stored[_ENVELOPE.size :]))
+
+
+def _run_in_thread(fn: Callable[[], None]) -> None:
+    threading.Thread(target=fn, name="cache-refresh", daemon=True).start()
+
+
+class _Flight:
+    """One in-progress load that concurrent callers of the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[CachedJSON] = None
+        self.error: Optional[BaseException] = None
+
+
+class SharedCache:
+    """
+    Two-tier cache-aside layer in front of the repositories: a bounded
+    in-process LRU (L1) of decoded entries in front of the shared backend
+    (L2, Redis or LocalCache).
+
+    Keys are `<namespace>:<entity>:v<version>[:<scope>:s<version>]:<parts>`.
+    invalidate(entity[, scope]) increments a version counter in the backend,
+    so every entry written under the old version becomes unreachable on every
+    instance at once (after at most CACHE_VERSION_TTL) and then expires. The
+    counters themselves expire after CACHE_VERSION_KEY_TTL without invalidations.
+    Values are stored as JSON bytes behind a 24-byte expiry header.
+
+    Stampede protection for get_or_load:
+      * Single flight: concurrent misses for one key in a process wait for
+        the first caller's load instead of each hitting the database.
+      * Probabilistic early refresh (XFetch): a hit recomputes ahead of
+        expiry with a probability that rises as expiry nears and with the
+        cost of the last load, so a hot key is usually refreshed by one
+        caller before it ever expires. Other callers keep getting the
+        current value meanwhile.
+      * Stale-while-revalidate: entities with a stale TTL serve the expired
+        value immediately and refresh it off the request path.
+
+    The cache never fails a request: backend errors are logged, counted and
+    treated as misses, and loader results of None are not cached. Cached
+    values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        backend,
+        namespace: str = CACHE_NAMESPACE,
+        l1_max_entries: int = CACHE_L1_MAX_ENTRIES,
+        early_refresh_beta: float = CACHE_EARLY_REFRESH_BETA,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.l1_max_entries = l1_max_entries
+        self.early_refresh_beta = early_refresh_beta
+        self._l1: "OrderedDict[str, _Entry]" = OrderedDict()
+        # version key -> (read_at, version), bounded like L1 since scopes are per user
+        self._versions: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        # key -> when its last refresh failed; cleared by the next success
+        self._failed_refreshes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, entity: str, counter: str, amount: int = 1) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(
+                entity,
+                {
+                    "l1_hits": 0,
+                    "l2_hits": 0,
+                    "misses": 0,
+                    "coalesced": 0,
+                    "early_refreshes": 0,
+                    "stale_hits": 0,
+                    "stale_revalidations": 0,
+                    "failed_refreshes": 0,
+                    "errors": 0,
+                    "invalidations": 0,
+                },
+            )
+            entry[counter] += amount
+
+    def _version_key(self, entity: str, scope: Optional[Any] = None) -> str:
+        if scope is None:
+            return f"{self.namespace}:{entity}:version"
+        return f"{self.namespace}:{entity}:{scope}:version"
+
+    def _remember_version(self, version_key: str, version: int) -> None:
+        with self._lock:
+            self._versions[version_key] = (time.monotonic(), version)
+            self._versions.move_to_end(version_key)
+            while len(self._versions) > self.l1_max_entries:
+                self._versions.popitem(last=False)
+
+    def _version(self, entity: str, scope: Optional[Any] = None) -> int:
+        version_key = self._version_key(entity, scope)
+        cached = self._versions.get(version_key)
+        if cached is not None and time.monotonic() - cached[0] < CACHE_VERSION_TTL:
+            return cached[1]
+        raw = self.backend.get(version_key)
+        version = int(raw) if raw is not None else 0
+        self._remember_version(version_key, version)
+        return version
+
+    def _key(
+        self, entity: str, parts: Sequence[Any], scope: Optional[Any] = None
+    ) -> str:
+        prefix = f"{self.namespace}:{entity}:v{self._version(entity)}:"
+        if scope is not None:
+            prefix += f"{scope}:s{self._version(entity, scope)}:"
+        return prefix + ":".join(str(part) for part in parts)
+
+    def _l1_get(self, key: str, now: float) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            if entry.stale_until <= now:
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return entry
+
+    def _l1_put(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            self._l1[key] = entry
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _read(self, entity: str, key: str) -> Optional[_Entry]:
+        """Returns the key's entry from L1 or L2, including stale-but-servable ones."""
+        now = time.time()
+        entry = self._l1_get(key, now)
+        if entry is not None:
+            self._count(entity, "l1_hits")
+            return entry
+        try:
+            stored = self.backend.get(key)
+        except Exception as e:
+            self._count(entity, "errors")
+            logger.warning(f"Cache read failed for {entity}: {e}")
+            return None
+        if stored is None:
+            return None
+        entry = _unpack(stored)
+        if entry.stale_until <= now:
+            return None
+        self._l1_put(key, entry)
+        self._count(entity, "l2_hits")
+        return entry
+
+    def _should_refresh_early(self, entry: _Entry) -> bool:
+        if self.early_refresh_beta <= 0 or entry.delta <= 0:
+            return False
+        # XFetch: -log(U) is exponentially distributed, so the refresh point
+        # is jittered per caller and lands about `delta * beta` before expiry.
+        # Only refresh jitter, never used for anything security related.
+        jitter = -math.log(1.0 - random.random())  # nosec B311
+        return time.time() + entry.delta * self.early_refresh_beta * jitter >= (
+            entry.expires_at
+        )
+
+    def _lead(
+        self,
+        entity: str,
+        key: str,
+        flight: _Flight,
+        loader: Callable[[], Any],
+        ttl: int,
+        stale_ttl: int,
+        fallback: Optional[CachedJSON] = None,
+    ) -> Optional[CachedJSON]:
+        try:
+            started = time.monotonic()
+            value = loader()
+            delta = time.monotonic() - started
+            if value is None:
+                raise LookupError("loader returned no value")
+
+            expires_at = time.time() + ttl
+            entry = _Entry(
+                expires_at, expires_at + stale_ttl, delta, CachedJSON.encode(value)
+            )
+            self._l1_put(key, entry)
+            with self._lock:
+                self._failed_refreshes.pop(key, None)
+            try:
+                self.backend.set(key, _pack(entry), ex=ttl + stale_ttl)
+            except Exception as e:
+                self._count(entity, "errors")
+                logger.warning(f"Cache write failed for {entity}: {e}")
+            flight.value = entry.value
+            return entry.value
+        except Exception as e:
+            if fallback is None:
+                if isinstance(e, LookupError):
+                    return None
+                flight.error = e
+                raise
+            # A failed refresh keeps serving the current value.
+            logger.warning(f"Refresh of {entity} failed; serving cached value: {e}")
+            self._count(entity, "failed_refreshes")
+            with self._lock:
+                self._failed_refreshes[key] = time.time()
+                while len(self._failed_refreshes) > self.l1_max_entries:
+                    self._failed_refreshes.pop(next(iter(self._failed_refreshes)))
+            flight.value = fallback
+            return fallback
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _join_flight(self, key: str) -> Tuple[_Flight, bool]:
+        """Returns the key's in-progress load and whether the caller must run it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def get_or_load(
+        self,
+        entity: str,
+        parts: Sequence[Any],
+        loader: Callable[[], Any],
+        ttl: Optional[int] = None,
+        scope: Optional[Any] = None,
+        stale_ttl: Optional[int] = None,
+        background: Callable[[Callable[[], None]], None] = _run_in_thread,
+    ) -> Optional[CachedJSON]:
+        """
+        Returns the cached value for (entity, scope, parts), or calls `loader`,
+        caches its result for `ttl` (default: the entity's TTL) and returns it.
+        Returns None if the loader returns None. `scope` (e.g. a user id)
+        can be invalidated on its own with invalidate(entity, scope).
+
+        For `stale_ttl` seconds (default: the entity's stale TTL) after
+        expiry, the old value is returned at once, marked via `stale_for`,
+        while `background` runs a single refresh (stale-while-revalidate).
+        If that refresh fails, the old value keeps being served
+        (stale-if-error). `background` receives a no-argument callable and
+        must arrange for it to run, e.g. with the caller's credentials.
+        """
+        if not CACHE_ENABLED:
+            value = loader()
+            return CachedJSON.encode(value) if value is not None else None
+
+        ttl = ttl or entity_ttl(entity)
+        stale_ttl = entity_stale_ttl(entity) if stale_ttl is None else stale_ttl
+        try:
+            key = self._key(entity, parts, scope)
+        except Exception as e:
+            self._count(entity, "errors")
+            logger.warning(f"Cache version read failed for {entity}: {e}")
+            value = loader()
+            return CachedJSON.encode(value) if value is not None else None
+
+        entry = self._read(entity, key)
+        if entry is not None:
+            now = time.time()
+            expired = entry.expires_at <= now
+            if not expired and not self._should_refresh_early(entry):
+                return entry.value
+
+            flight, leader = self._join_flight(key)
+            if leader:
+                if expired:
+                    self._count(entity, "stale_revalidations")
+                else:
+                    self._count(entity, "early_refreshes")
+                refresh = functools.partial(
+                    self._lead, entity, key, flight, loader, ttl, stale_ttl, entry.value
+                )
+                if stale_ttl:
+                    background(refresh)
+                elif not expired:
+                    return refresh()
+            if not expired:
+                return entry.value
+
+            self._count(entity, "stale_hits")
+            reason = "error" if key in self._failed_refreshes else "revalidating"
+            return entry.value.as_stale(now - entry.expires_at, reason)
+
+        self._count(entity, "misses")
+        flight, leader = self._join_flight(key)
+        if leader:
+            return self._lead(entity, key, flight, loader, ttl, stale_ttl)
+
+        self._count(entity, "coalesced")
+        if not flight.done.wait(CACHE_FLIGHT_TIMEOUT):
+            logger.warning(f"Timed out waiting for a {entity} load; loading directly.")
+            value = loader()
+            return CachedJSON.encode(value) if value is not None else None
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def get_or_load_many(
+        self,
+        entity: str,
+        ids: Sequence[str],
+        loader: Callable[[List[str]], Optional[Dict[str, Any]]],
+        ttl: Optional[int] = None,
+    ) -> Optional[Dict[str, CachedJSON]]:
+        """
+        Batch form of get_or_load for one entity, backed by L2 only: reads all
+        `ids` in one round trip and calls `loader` once with the missing ids.
+        The loader returns {id: value} (ids it omits are not cached) or None
+        on error, in which case only the hits are returned.
+        """
+        if not ids:
+            return {}
+
+        ttl = ttl or entity_ttl(entity)
+        found: Dict[str, CachedJSON] = {}
+        missing = list(ids)
+        keys: Dict[str, str] = {}
+        if CACHE_ENABLED:
+            try:
+                keys = {id_: self._key(entity, (id_,)) for id_ in ids}
+                now = time.time()
+                missing = []
+                for id_, stored in zip(ids, self.backend.mget(list(keys.values()))):
+                    entry = _unpack(stored) if stored is not None else None
+                    if entry is None or entry.stale_until <= now:
+                        missing.append(id_)
+                    else:
+                        found[id_] = entry.value
+                self._count(entity, "l2_hits", len(found))
+            except Exception as e:
+                keys, missing = {}, [id_ for id_ in ids if id_ not in found]
+                self._count(entity, "errors")
+                logger.warning(f"Cache read failed for {entity}: {e}")
+        self._count(entity, "misses", len(missing))
+        if not missing:
+            return found
+
+        loaded = loader(missing)
+        if loaded is None:
+            return found if found else None
+        fresh = {id_: CachedJSON.encode(value) for id_, value in loaded.items()}
+        found.update(fresh)
+        if keys and fresh:
+            expires_at = time.time() + ttl
+            try:
+                self.backend.set_many(
+                    {
+                        keys[id_]: _pack(_Entry(expires_at, expires_at, 0.0, cached))
+                        for id_, cached in fresh.items()
+                    },
+                    ex=ttl,
+                )
+            except Exception as e:
+                self._count(entity, "errors")
+                logger.warning(f"Cache write failed for {entity}: {e}")
+        return found
+
+    def version(self, entity: str) -> Optional[int]:
+        """
+        Returns the current invalidation version of `entity` (re-read at most
+        every CACHE_VERSION_TTL), so process-local caches layered on top can
+        drop entries after invalidate(). None if the backend is unreachable.
+        """
+        try:
+            return self._version(entity)
+        except Exception as e:
+            self._count(entity, "errors")
+            logger.warning(f"Cache version read failed for {entity}: {e}")
+            return None
+
+    def invalidate(self, entity: str, scope: Optional[Any] = None) -> None:
+        """
+        Makes every cached entry of `entity` (or only those of `scope`)
+        unreachable on all instances.
+        """
+        version_key = self._version_key(entity, scope)
+        try:
+            key_ttl = max(
+                CACHE_VERSION_KEY_TTL, entity_ttl(entity) + entity_stale_ttl(entity)
+            )
+            # A counter recreated after expiring starts from the clock, so it
+            # never reuses a version whose entries may still be cached.
+            version = self.backend.incr(
+                version_key, ex=key_ttl, start=int(time.time() * 1000)
+            )
+            self._remember_version(version_key, int(version))
+            self._count(entity, "invalidations")
+        except Exception as e:
+            # Without the bump, entries expire after their TTL instead.
+            with self._lock:
+                self._versions.pop(version_key, None)
+            self._count(entity, "errors")
+            logger.error(f"Cache invalidation failed for {entity}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "enabled": CACHE_ENABLED,
+                "l1_entries": len(self._l1),
+                "l1_max_entries": self.l1_max_entries,
+                "entities": {entity: dict(c) for entity, c in self._stats.items()},
+            }
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """Returns the per-process SharedCache, backed by Redis when REDIS_URL is set."""
+    global _shared_cache
+
+    if _shared_cache is not None:
+        return _shared_cache
+
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            if REDIS_URL:
+                backend = RedisCache(REDIS_URL)
+                logger.info("Shared cache backed by Redis.")
+            else:
+                backend = LocalCache()
+                logger.info("REDIS_URL not set; shared cache is process-local.")
+            _shared_cache = SharedCache(backend)
+    return _shared_cache
@@ -0,0 +1,163 @@
+# api/db/postgres_client.py
+
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+from urllib.parse import urlparse
+
+from psycopg2 import extensions, pool
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+from flask import g, has_request_context
+from api.utils.logger_config import logger
+
+load_dotenv()
+
+# Connection string to the Supabase Postgres instance: the primary (port 5432)
+# or the Supavisor pooler in session mode. In transaction mode (port 6543)
+# consecutive statements may run on different server connections, so
+# server-side prepared statements are not used there.
+DATABASE_URL = os.getenv("DATABASE_URL")
+# "auto" (default) disables PREPARE when DATABASE_URL points at the transaction
+# pooler port; "on"/"off" force it.
+POSTGRES_PREPARED_STATEMENTS = os.getenv("POSTGRES_PREPARED_STATEMENTS", "auto").lower()
+TRANSACTION_POOLER_PORT = 6543
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+
+# "postgrest" (default) talks to the database through the Supabase HTTP API,
+# "postgres" runs the hot repository queries over a direct psycopg2 connection.
+REPOSITORY_BACKEND = os.getenv("REPOSITORY_BACKEND", "postgrest").lower()
+
+
+class PreparedStatementConnection(extensions.connection):
+    """A psycopg2 connection that remembers which statements it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set = set()
+
+
+_pool: Optional[pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def is_postgres_backend() -> bool:
+    return REPOSITORY_BACKEND == "postgres"
+
+
+def prepared_statements_enabled() -> bool:
+    if POSTGRES_PREPARED_STATEMENTS in ("on", "true", "1"):
+        return True
+    if POSTGRES_PREPARED_STATEMENTS in ("off", "false", "0"):
+        return False
+    try:
+        port = urlparse(DATABASE_URL or "").port
+    except ValueError:
+        port = None
+    return port != TRANSACTION_POOLER_PORT
+
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+
+
+def get_postgres_pool() -> pool.ThreadedConnectionPool:
+    """Returns the per-process connection pool, creating it on first use."""
+    global _pool
+
+    if _pool is not None:
+        return _pool
+
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL is not configured. Cannot create Postgres pool.")
+        raise ValueError("DATABASE_URL is not configured.")
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(
+                POSTGRES_POOL_MIN,
+                POSTGRES_POOL_MAX,
+                DATABASE_URL,
+                connection_factory=PreparedStatementConnection,
+            )
+            logger.info(
+                f"Postgres connection pool created (min={POSTGRES_POOL_MIN}, max={POSTGRES_POOL_MAX})."
+            )
+    return _pool
+
+
+class PostgresSession:
+    """
+    Runs queries on a pooled connection as a specific Supabase user.
+
+    Every transaction switches to the claims' role and publishes the claims
+    as `request.jwt.claims`, so `auth.uid()` and `auth.role()` resolve exactly
+    as they do behind PostgREST and the RLS policies still apply.
+    """
+
+    def __init__(self, claims: Dict[str, Any], connection_pool=None):
+        self.claims = claims
+        self._pool = connection_pool
+
+    @contextmanager
+    def transaction(self) -> Iterator[RealDictCursor]:
+        connection_pool = self._pool or get_postgres_pool()
+        conn = connection_pool.getconn()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(
+                    "SELECT set_config('role', %s, true), "
+                    "set_config('request.jwt.claims', %s, true)",
+                    (self.claims.get("role", "anon"), json.dumps(self.claims)),
+                )
+                yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            connection_pool.putconn(conn, close=bool(conn.closed))
+
+    def execute_prepared(
+        self,
+        cursor: RealDictCursor,
+        name: str,
+        sql: str,
+        params: Sequence[Any],
+    ) -> None:
+        """
+        Executes a server-side prepared statement, preparing it once per
+        connection. `sql` uses $1, $2, ... placeholders and `name` must be a
+        fixed identifier, never user input. When prepared statements are
+        disabled (transaction pooler), `sql` is sent as a plain statement.
+        """
+        if not prepared_statements_enabled():
+            plain = _PLACEHOLDER.sub(r"%(p\1)s", sql.replace("%", "%%"))
+            values = {f"p{i}": value for i, value in enumerate(params, start=1)}
+            cursor.execute(plain, values)  # nosec B608
+            return
+
+        conn = cursor.connection
+        if name not in conn.prepared_statements:
+            cursor.execute(f"PREPARE {name} AS {sql}")
+            conn.prepared_statements.add(name)
+
+        placeholders = ", ".join(["%s"] * len(params))
+        statement = f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}"
+        cursor.execute(statement, tuple(params))  # nosec B608
+
+
+def get_postgres_session() -> PostgresSession:
+    """
+    Returns a session carrying the current user's claims, or anon claims
+    when the request is unauthenticated.
+    """
+    user_id = g.get("user_id", None) if has_request_context() else None
+    if user_id:
+        claims = {"sub": str(user_id), "role": "authenticated", "aud": "authenticated"}
+    else:
+        claims = {"role": "anon"}
+    return PostgresSession(claims)
@@ -3,5 +3,11 @@
 from .base_repository import BaseRepository
 from .books_repository import BooksRepository
 from .categories_repository import Categories
+from .in_memory_books_repository import InMemoryBooksRepository
+from .postgres_books_repository import PostgresBooksRepository
+from .postgres_preferences_repository import PostgresPreferencesRepository
+from .postgres_user_reading_progress_repository import (
+    PostgresUserReadingProgressRepository,
+)
 from .user_reading_progress_repository import UserReadingProgressRepository
 from .users_repository import UsersRepository
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Sequence
 from .base_repository import BaseRepository
 
 
@@ -54,3 +54,266 @@ class BooksRepository(BaseRepository):
             return self._handle_supabase_error(
                 e, f"fetch_paginated_books (page={page}, limit={limit})"
             )
+
+    def fetch_discover_books(
+        self, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches a page of the discover feed via the `get_discover_books_for_user`
+        RPC, including whether each book is in the current user's library.
+
+        Args:
+            page (int): The page number to fetch (1-indexed).
+            limit (int): The number of books per page.
+
+        Returns:
+            A list of book dictionaries with `is_in_library`, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized. Cannot fetch books.")
+            return None
+
+        try:
+            params = {"page_num": page, "page_size": limit}
+            result = self.client.rpc("get_discover_books_for_user", params).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_discover_books (page={page}, limit={limit})"
+            )
+
+    def fetch_discover_books_after(
+        self,
+        cursor_created_at: Optional[str],
+        cursor_id: Optional[str],
+        limit: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the discover feed with keyset pagination via the
+        `get_discover_books_for_user_after` RPC. Every page costs the same
+        regardless of depth, and inserts do not shift later pages.
+
+        Args:
+            cursor_created_at: `created_at` of the last book already seen, or None for the first page.
+            cursor_id: `id` of the last book already seen, or None for the first page.
+            limit (int): The number of books to return.
+
+        Returns:
+            A list of book dictionaries with `is_in_library` and `created_at`,
+            or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized. Cannot fetch books.")
+            return None
+
+        try:
+            params = {
+                "cursor_created_at": cursor_created_at,
+                "cursor_id": cursor_id,
+                "page_size": limit,
+            }
+            result = self.client.rpc(
+                "get_discover_books_for_user_after", params
+            ).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_discover_books_after (cursor_id={cursor_id}, limit={limit})"
+            )
+
+    def fetch_category_books_after(
+        self,
+        category_id: str,
+        cursor_created_at: Optional[str],
+        cursor_id: Optional[str],
+        limit: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the discover feed restricted to a category and all of its
+        subcategories via the `get_discover_books_in_category_after` RPC,
+        with the same keyset pagination as `fetch_discover_books_after`.
+
+        Args:
+            category_id: The category whose books (including descendants) to return.
+            cursor_created_at: `created_at` of the last book already seen, or None for the first page.
+            cursor_id: `id` of the last book already seen, or None for the first page.
+            limit (int): The number of books to return.
+
+        Returns:
+            A list of book dictionaries with `is_in_library` and `created_at`,
+            or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized. Cannot fetch books.")
+            return None
+
+        try:
+            params = {
+                "filter_category_id": str(category_id),
+                "cursor_created_at": cursor_created_at,
+                "cursor_id": cursor_id,
+                "page_size": limit,
+            }
+            result = self.client.rpc(
+                "get_discover_books_in_category_after", params
+            ).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e,
+                f"fetch_category_books_after (category_id={category_id}, limit={limit})",
+            )
+
+    def fetch_content_versions(
+        self, scopes: Sequence[str] = ("catalog", "library")
+    ) -> Optional[Dict[str, str]]:
+        """
+        Fetches cheap version strings for the catalog and/or the current
+        user's library via the `get_user_content_versions` RPC, without
+        reading any book rows. Used to build ETags for conditional GETs.
+
+        Args:
+            scopes: The versions to compute, "catalog" and/or "library".
+
+        Returns:
+            {scope: str} for the requested scopes, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Supabase client is not initialized. Cannot fetch content versions."
+            )
+            return None
+
+        try:
+            result = self.client.rpc(
+                "get_user_content_versions", {"scopes": list(scopes)}
+            ).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(e, "fetch_content_versions")
+
+    def search_books(
+        self, query: str, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Full-text searches the catalog via the `search_books_for_user` RPC,
+        best match first, including whether each book is in the current
+        user's library.
+
+        Args:
+            query (str): The user's search text (websearch syntax).
+            page (int): The page number to fetch (1-indexed).
+            limit (int): The number of books per page.
+
+        Returns:
+            A list of book dictionaries with `is_in_library`, `rank` and
+            `total_count` (matches across all pages), or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Supabase client is not initialized. Cannot search books."
+            )
+            return None
+
+        try:
+            params = {"search_query": query, "page_num": page, "page_size": limit}
+            result = self.client.rpc("search_books_for_user", params).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"search_books (page={page}, limit={limit})"
+            )
+
+    def fetch_recommendation_inputs(
+        self, category_limit: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches what the current user's recommendations are ranked from via
+        the `get_recommendation_inputs` RPC: their `category_limit` highest
+        preference scores and the ids of the books already in their library.
+
+        Returns:
+            {"categories": [{"category_id", "score"}], "library_book_ids": [...]},
+            or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Supabase client is not initialized. Cannot fetch recommendation inputs."
+            )
+            return None
+
+        try:
+            params = {"category_limit": category_limit}
+            result = self.client.rpc("get_recommendation_inputs", params).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_recommendation_inputs (category_limit={category_limit})"
+            )
+
+    def fetch_category_candidates(
+        self, category_ids: List[str], per_category: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the precomputed candidate books of several categories via the
+        `get_category_candidates` RPC, best candidate first per category.
+
+        Returns:
+            A list of book dictionaries with `category_id` and
+            `candidate_score`, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Supabase client is not initialized. Cannot fetch category candidates."
+            )
+            return None
+
+        try:
+            params = {
+                "category_ids": [str(category_id) for category_id in category_ids],
+                "per_category": per_category,
+            }
+            result = self.client.rpc("get_category_candidates", params).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_category_candidates (categories={len(category_ids)})"
+            )
+
+    def fetch_epub_storage_paths(
+        self, book_ids: List[str]
+    ) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Fetches the `epub_storage_path` of several books in one query.
+        Reading the column bypasses RLS, so pass the admin client.
+
+        Returns:
+            {book_id: storage path or None}; unknown books are omitted.
+            None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Supabase client is not initialized. Cannot fetch storage paths."
+            )
+            return None
+
+        try:
+            result = (
+                self.client.table(self.table_name)
+                .select("id, epub_storage_path")
+                .in_("id", [str(book_id) for book_id in book_ids])
+                .execute()
+            )
+            return {str(row["id"]): row.get("epub_storage_path") for row in result.data}
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_epub_storage_paths (books={len(book_ids)})"
+            )
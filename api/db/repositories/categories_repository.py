@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
 from .base_repository import BaseRepository
@@ -8,8 +8,11 @@ class Categories(BaseRepository):
     def __init__(self, db_client):
         super().__init__("categories", db_client)
 
-    def fetch_all(self) -> Optional[Dict[str, Any]]:
-        """Fetch all available categories."""
+    def fetch_all(self) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Fetch all available categories as ("data", records); records is empty
+        when there are none. Returns None if an error occurs.
+        """
         if not self.client:
             self.logger.error(
                 "Supabase client is not initialized. Cannot fetch categories."
@@ -26,11 +29,10 @@ class Categories(BaseRepository):
             records = data[1] if data and len(data) > 1 else []
             if records:
                 self.logger.info(f"Retrieved {len(records)} categories.")
-                self.logger.debug(f"RECORDS data: {records}")
-                return data
-
-            self.logger.warning("No categories found.")
-            return None
+            else:
+                self.logger.warning("No categories found.")
+            # An empty table is a successful read; None is kept for errors.
+            return ("data", records)
 
         except Exception as e:
             return self._handle_supabase_error(e, "fetch_all")
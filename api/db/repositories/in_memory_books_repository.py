@@ -0,0 +1,74 @@
+# api/db/repositories/in_memory_books_repository.py
+
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from .base_repository import BaseRepository
+
+# Field weights mirror the A/B/C weights of books.search_vector.
+_SEARCH_WEIGHTS = {"title": 1.0, "author": 0.4, "description": 0.1}
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InMemoryBooksRepository(BaseRepository):
+    """
+    BooksRepository backend over a list of book dicts, for offline tests and
+    local development without a database.
+
+    Search approximates `search_books_for_user`: every query term must match
+    a word prefix in the title, author or description, and matches are
+    ranked by the field they hit.
+    """
+
+    def __init__(
+        self,
+        books: List[Dict[str, Any]],
+        library_book_ids: Iterable[str] = (),
+    ):
+        super().__init__("books", books)
+        self.library_book_ids = {str(book_id) for book_id in library_book_ids}
+
+    def _with_library_flag(self, book: Dict[str, Any]) -> Dict[str, Any]:
+        return {**book, "is_in_library": str(book["id"]) in self.library_book_ids}
+
+    def fetch_discover_books(
+        self, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        ordered = sorted(
+            self.client, key=lambda b: (b["created_at"], str(b["id"])), reverse=True
+        )
+        offset = (page - 1) * limit
+        return [self._with_library_flag(b) for b in ordered[offset : offset + limit]]
+
+    def search_books(
+        self, query: str, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        terms = _tokens(query)
+        if not terms:
+            return []
+
+        scored = []
+        for book in self.client:
+            fields = {field: _tokens(book.get(field)) for field in _SEARCH_WEIGHTS}
+            rank = 0.0
+            for term in terms:
+                term_rank = sum(
+                    weight * sum(1 for word in fields[field] if word.startswith(term))
+                    for field, weight in _SEARCH_WEIGHTS.items()
+                )
+                if term_rank == 0:
+                    break
+                rank += term_rank
+            else:
+                scored.append((rank, book))
+
+        scored.sort(key=lambda item: (-item[0], str(item[1]["id"])))
+        offset = (page - 1) * limit
+        return [
+            {**self._with_library_flag(book), "rank": rank, "total_count": len(scored)}
+            for rank, book in scored[offset : offset + limit]
+        ]
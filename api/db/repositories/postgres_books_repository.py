@@ -0,0 +1,289 @@
+# api/db/repositories/postgres_books_repository.py
+
+from typing import Any, Dict, Optional, List, Sequence
+from .base_repository import BaseRepository
+
+
+class PostgresBooksRepository(BaseRepository):
+    """
+    BooksRepository backend that queries Postgres directly through a
+    PostgresSession instead of the PostgREST HTTP API.
+    """
+
+    def __init__(self, db_session):
+        super().__init__("books", db_session)
+
+    def fetch_discover_books(
+        self, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches a page of the discover feed via `get_discover_books_for_user`.
+
+        Args:
+            page (int): The page number to fetch (1-indexed).
+            limit (int): The number of books per page.
+
+        Returns:
+            A list of book dictionaries with `is_in_library`, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch books."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "discover_books",
+                    "SELECT * FROM public.get_discover_books_for_user($1::int, $2::int)",
+                    (page, limit),
+                )
+                records = [dict(row) for row in cursor.fetchall()]
+
+            self.logger.info(
+                f"Retrieved {len(records)} discover books for page {page}."
+            )
+            return records
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_discover_books (page={page}, limit={limit})"
+            )
+
+    def fetch_discover_books_after(
+        self,
+        cursor_created_at: Optional[str],
+        cursor_id: Optional[str],
+        limit: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the discover feed with keyset pagination via
+        `get_discover_books_for_user_after`.
+
+        Returns:
+            A list of book dictionaries with `is_in_library` and `created_at`,
+            or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch books."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "discover_books_after",
+                    """
+                    SELECT
+                        id, title, author, cover_image_url, description, total_pages,
+                        is_in_library,
+                        to_json(created_at) #>> '{}' AS created_at
+                    FROM public.get_discover_books_for_user_after(
+                        $1::timestamptz, $2::uuid, $3::int
+                    )
+                    """,
+                    (cursor_created_at, cursor_id, limit),
+                )
+                records = [dict(row) for row in cursor.fetchall()]
+
+            self.logger.info(f"Retrieved {len(records)} discover books after cursor.")
+            return records
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_discover_books_after (cursor_id={cursor_id}, limit={limit})"
+            )
+
+    def fetch_category_books_after(
+        self,
+        category_id: str,
+        cursor_created_at: Optional[str],
+        cursor_id: Optional[str],
+        limit: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the discover feed restricted to a category and its
+        subcategories via `get_discover_books_in_category_after`.
+
+        Returns:
+            A list of book dictionaries with `is_in_library` and `created_at`,
+            or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch books."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "category_books_after",
+                    """
+                    SELECT
+                        id, title, author, cover_image_url, description, total_pages,
+                        is_in_library,
+                        to_json(created_at) #>> '{}' AS created_at
+                    FROM public.get_discover_books_in_category_after(
+                        $1::uuid, $2::timestamptz, $3::uuid, $4::int
+                    )
+                    """,
+                    (str(category_id), cursor_created_at, cursor_id, limit),
+                )
+                records = [dict(row) for row in cursor.fetchall()]
+
+            self.logger.info(
+                f"Retrieved {len(records)} books in category '{str(category_id)[:8]}'."
+            )
+            return records
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e,
+                f"fetch_category_books_after (category_id={category_id}, limit={limit})",
+            )
+
+    def fetch_content_versions(
+        self, scopes: Sequence[str] = ("catalog", "library")
+    ) -> Optional[Dict[str, str]]:
+        """
+        Fetches version strings for the catalog and/or the current user's
+        library via `get_user_content_versions`.
+
+        Returns:
+            {scope: str} for the requested scopes, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch content versions."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "content_versions_by_scope",
+                    "SELECT public.get_user_content_versions($1::text[]) AS versions",
+                    (list(scopes),),
+                )
+                row = cursor.fetchone()
+
+            return row["versions"] if row else None
+
+        except Exception as e:
+            return self._handle_supabase_error(e, "fetch_content_versions")
+
+    def search_books(
+        self, query: str, page: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Full-text searches the catalog via `search_books_for_user`.
+
+        Returns:
+            A list of book dictionaries with `is_in_library`, `rank` and
+            `total_count` (matches across all pages), or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot search books."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "search_books",
+                    """
+                    SELECT
+                        id, title, author, cover_image_url, description, total_pages,
+                        is_in_library, rank, total_count
+                    FROM public.search_books_for_user($1::text, $2::int, $3::int)
+                    """,
+                    (query, page, limit),
+                )
+                records = [dict(row) for row in cursor.fetchall()]
+
+            self.logger.info(f"Search returned {len(records)} books for page {page}.")
+            return records
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"search_books (page={page}, limit={limit})"
+            )
+
+    def fetch_recommendation_inputs(
+        self, category_limit: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the current user's top preference categories and library
+        book ids via `get_recommendation_inputs`.
+
+        Returns:
+            {"categories": [...], "library_book_ids": [...]}, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch recommendation inputs."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "recommendation_inputs",
+                    "SELECT public.get_recommendation_inputs($1::int) AS inputs",
+                    (category_limit,),
+                )
+                row = cursor.fetchone()
+
+            return row["inputs"] if row else None
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_recommendation_inputs (category_limit={category_limit})"
+            )
+
+    def fetch_category_candidates(
+        self, category_ids: List[str], per_category: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the precomputed candidate books of several categories via
+        `get_category_candidates`.
+
+        Returns:
+            A list of book dictionaries with `category_id` and
+            `candidate_score`, or None if an error occurs.
+        """
+        if not self.client:
+            self.logger.error(
+                "Postgres session is not initialized. Cannot fetch category candidates."
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "category_candidates",
+                    """
+                    SELECT
+                        category_id::text AS category_id, id, title, author,
+                        cover_image_url, description, total_pages, candidate_score
+                    FROM public.get_category_candidates($1::uuid[], $2::int)
+                    """,
+                    ([str(category_id) for category_id in category_ids], per_category),
+                )
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_category_candidates (categories={len(category_ids)})"
+            )
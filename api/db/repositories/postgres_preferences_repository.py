@@ -0,0 +1,235 @@
+# api/db/repositories/postgres_preferences_repository.py
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from psycopg2.extras import execute_values
+
+from .base_repository import BaseRepository
+
+
+class PostgresPreferencesRepository(BaseRepository):
+    """
+    Bulk access to `user_category_preferences` and the reading signals it is
+    computed from, for the batch personalization engine.
+
+    The session must run as `service_role`: the engine reads and writes
+    every user's rows, which RLS would otherwise restrict to `auth.uid()`.
+    """
+
+    def __init__(self, db_session):
+        super().__init__("user_category_preferences", db_session)
+
+    def fetch_interaction_chunk(
+        self, after_user_id: Optional[str], user_limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches one signal row per (library book, book category) for the next
+        `user_limit` users after `after_user_id`, in user_id order. Users are
+        those with reading progress or with implicit preferences, so users
+        whose library emptied are still visited and cleared. Books without a
+        category, and users without books, yield a row with category_id None,
+        so every user in the chunk appears at least once and the caller can
+        advance past them.
+
+        Returns:
+            A list of dicts with user_id, category_id, status, progress_percentage
+            and age_days, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "preference_interaction_chunk",
+                    """
+                    WITH chunk AS (
+                        SELECT user_id
+                        FROM (
+                            SELECT urp.user_id FROM public.user_reading_progress urp
+                            UNION
+                            SELECT ucp.user_id FROM public.user_category_preferences ucp
+                            WHERE ucp.source = 'implicit_interaction'
+                        ) users
+                        WHERE $1::uuid IS NULL OR user_id > $1::uuid
+                        ORDER BY user_id
+                        LIMIT $2::int
+                    )
+                    SELECT
+                        chunk.user_id::text AS user_id,
+                        bc.category_id::text AS category_id,
+                        urp.status::text AS status,
+                        urp.progress_percentage,
+                        EXTRACT(EPOCH FROM now() - urp.last_progress_update_at)
+                            / 86400.0 AS age_days
+                    FROM chunk
+                    LEFT JOIN public.user_reading_progress urp
+                        ON urp.user_id = chunk.user_id
+                    LEFT JOIN public.book_categories bc ON bc.book_id = urp.book_id
+                    ORDER BY chunk.user_id
+                    """,
+                    (after_user_id, user_limit),
+                )
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_interaction_chunk (after_user_id={after_user_id})"
+            )
+
+    def fetch_signals_for_changes(
+        self, changes: Sequence[Tuple[str, str]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches the signal rows needed to rescore only the categories touched
+        by changed (user_id, book_id) pairs: every library book of that user
+        in any category of the changed book. A touched (user, category) pair
+        without any remaining signal yields one row with status None, so the
+        caller can clear its score.
+
+        Returns:
+            A list of dicts shaped like fetch_interaction_chunk rows, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "preference_signals_for_changes",
+                    """
+                    WITH changed AS (
+                        SELECT DISTINCT c.user_id, bc.category_id
+                        FROM unnest($1::uuid[], $2::uuid[]) AS c(user_id, book_id)
+                        JOIN public.book_categories bc ON bc.book_id = c.book_id
+                    )
+                    SELECT
+                        changed.user_id::text AS user_id,
+                        changed.category_id::text AS category_id,
+                        signal.status::text AS status,
+                        signal.progress_percentage,
+                        EXTRACT(EPOCH FROM now() - signal.last_progress_update_at)
+                            / 86400.0 AS age_days
+                    FROM changed
+                    LEFT JOIN LATERAL (
+                        SELECT urp.status, urp.progress_percentage,
+                            urp.last_progress_update_at
+                        FROM public.user_reading_progress urp
+                        JOIN public.book_categories bc
+                            ON bc.book_id = urp.book_id
+                            AND bc.category_id = changed.category_id
+                        WHERE urp.user_id = changed.user_id
+                    ) signal ON true
+                    """,
+                    (
+                        [str(user_id) for user_id, _ in changes],
+                        [str(book_id) for _, book_id in changes],
+                    ),
+                )
+                return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_signals_for_changes (changes={len(changes)})"
+            )
+
+    def upsert_implicit_preferences(
+        self,
+        rows: Sequence[Tuple[str, str, float]],
+        replace_user_ids: Sequence[str] = (),
+        replace_pairs: Sequence[Tuple[str, str]] = (),
+        page_size: int = 5000,
+    ) -> Optional[int]:
+        """
+        Bulk-upserts (user_id, category_id, preference_score) rows with source
+        'implicit_interaction'. Scores the user set themselves (onboarding or
+        explicit follows) are never overwritten.
+
+        In the same transaction, implicit rows of `replace_user_ids` (all their
+        categories) and of `replace_pairs` ((user_id, category_id)) are deleted
+        first, so scores whose signals went away do not linger.
+
+        Returns:
+            The number of rows sent, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                if replace_user_ids:
+                    cursor.execute(
+                        """
+                        DELETE FROM public.user_category_preferences
+                        WHERE source = 'implicit_interaction'
+                            AND user_id = ANY(%s::uuid[])
+                        """,
+                        (list(replace_user_ids),),
+                    )
+                if replace_pairs:
+                    cursor.execute(
+                        """
+                        DELETE FROM public.user_category_preferences ucp
+                        USING unnest(%s::uuid[], %s::uuid[]) AS p(user_id, category_id)
+                        WHERE ucp.source = 'implicit_interaction'
+                            AND ucp.user_id = p.user_id
+                            AND ucp.category_id = p.category_id
+                        """,
+                        (
+                            [user_id for user_id, _ in replace_pairs],
+                            [category_id for _, category_id in replace_pairs],
+                        ),
+                    )
+                if not rows:
+                    return 0
+                execute_values(
+                    cursor,
+                    """
+                    INSERT INTO public.user_category_preferences AS ucp
+                        (user_id, category_id, preference_score, source, updated_at)
+                    VALUES %s
+                    ON CONFLICT (user_id, category_id) DO UPDATE
+                    SET preference_score = EXCLUDED.preference_score,
+                        updated_at = EXCLUDED.updated_at
+                    WHERE ucp.source = 'implicit_interaction'
+                    """,
+                    rows,
+                    template=(
+                        "(%s::uuid, %s::uuid, %s, "
+                        "'implicit_interaction'::preference_source, now())"
+                    ),
+                    page_size=page_size,
+                )
+            return len(rows)
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"upsert_implicit_preferences (rows={len(rows)})"
+            )
+
+    def refresh_recommendation_candidates(self) -> Optional[bool]:
+        """
+        Refreshes the `category_book_candidates` materialized view that
+        /api/recommendations reads. CONCURRENTLY keeps it readable meanwhile.
+
+        Returns:
+            True on success, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                cursor.execute(
+                    "REFRESH MATERIALIZED VIEW CONCURRENTLY public.category_book_candidates"
+                )
+            return True
+
+        except Exception as e:
+            return self._handle_supabase_error(e, "refresh_recommendation_candidates")
@@ -0,0 +1,292 @@
+# api/db/repositories/postgres_user_reading_progress_repository.py
+
+from typing import Optional, List, Dict, Any
+from uuid import UUID
+from .base_repository import BaseRepository
+
+
+class PostgresUserReadingProgressRepository(BaseRepository):
+    """
+    UserReadingProgressRepository backend that queries Postgres directly through
+    a PostgresSession instead of the PostgREST HTTP API.
+
+    Timestamps are rendered with to_json() so they match PostgREST's ISO 8601 output.
+    """
+
+    def __init__(self, db_session):
+        super().__init__("user_reading_progress", db_session)
+
+    def add_book_for_user(self, user_id: UUID, book_id: UUID) -> Optional[dict]:
+        """
+        Adds a book to a user's reading list.
+        Defaults the status to 'to_read'.
+
+        Returns:
+            The created record, None on generic error, or {"error": "already_exists"}
+            when the book is already in the user's library.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "add_book_for_user",
+                    """
+                    INSERT INTO public.user_reading_progress AS urp (user_id, book_id, status)
+                    VALUES ($1::uuid, $2::uuid, 'to_read')
+                    ON CONFLICT (user_id, book_id) DO NOTHING
+                    RETURNING
+                        urp.user_id,
+                        urp.book_id,
+                        urp.status,
+                        urp.progress_percentage,
+                        to_json(urp.started_reading_at) #>> '{}' AS started_reading_at,
+                        to_json(urp.finished_reading_at) #>> '{}' AS finished_reading_at,
+                        to_json(urp.last_progress_update_at) #>> '{}'
+                            AS last_progress_update_at
+                    """,
+                    (str(user_id), str(book_id)),
+                )
+                row = cursor.fetchone()
+
+            if row is None:
+                self.logger.warning(
+                    f"User '{str(user_id)[:8]}' already has book '{str(book_id)[:8]}'."
+                )
+                return {"error": "already_exists"}
+
+            self.logger.info(
+                f"User '{str(user_id)[:8]}' added book '{str(book_id)[:8]}' to their library."
+            )
+            return dict(row)
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"add_book_for_user (user_id={user_id}, book_id={book_id})"
+            )
+
+    def add_books_for_user(
+        self, user_id: UUID, book_ids: List[UUID]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Adds several books to a user's reading list in one statement via
+        `add_books_to_library`.
+
+        Returns:
+            A list of {"book_id", "outcome"} dicts in request order, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "add_books_for_user",
+                    """
+                    SELECT book_id::text AS book_id, outcome
+                    FROM public.add_books_to_library($1::uuid[])
+                    """,
+                    ([str(b) for b in book_ids],),
+                )
+                outcomes = [dict(row) for row in cursor.fetchall()]
+
+            created = sum(1 for o in outcomes if o["outcome"] == "created")
+            self.logger.info(
+                f"User '{str(user_id)[:8]}' bulk-added {created} of {len(book_ids)} books to their library."
+            )
+            return outcomes
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"add_books_for_user (user_id={user_id}, books={len(book_ids)})"
+            )
+
+    def fetch_books_for_user(self, user_id: UUID) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetches all books in a user's library, joined with the books table
+        into a flat row per book.
+
+        Returns:
+            A list of flattened dictionaries, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "fetch_books_for_user",
+                    """
+                    SELECT
+                        urp.status,
+                        urp.progress_percentage,
+                        to_json(urp.started_reading_at) #>> '{}' AS started_reading_at,
+                        to_json(urp.finished_reading_at) #>> '{}' AS finished_reading_at,
+                        urp.book_id,
+                        b.id,
+                        b.title,
+                        b.author,
+                        b.cover_image_url,
+                        b.description,
+                        b.total_pages
+                    FROM public.user_reading_progress urp
+                    JOIN public.books b ON b.id = urp.book_id
+                    WHERE urp.user_id = $1::uuid
+                    ORDER BY urp.last_progress_update_at DESC
+                    """,
+                    (str(user_id),),
+                )
+                records = [dict(row) for row in cursor.fetchall()]
+
+            self.logger.info(
+                f"Fetched {len(records)} books for user '{str(user_id)[:8]}'."
+            )
+            return records
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_books_for_user (user_id={user_id})"
+            )
+
+    def has_book(self, user_id: UUID, book_id: UUID) -> Optional[bool]:
+        """
+        Checks whether a book is in a user's library.
+
+        Returns:
+            True or False, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "has_library_book",
+                    """
+                    SELECT 1
+                    FROM public.user_reading_progress
+                    WHERE user_id = $1::uuid AND book_id = $2::uuid
+                    """,
+                    (str(user_id), str(book_id)),
+                )
+                return cursor.fetchone() is not None
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"has_book (user_id={user_id}, book_id={book_id})"
+            )
+
+    def update_book_progress(
+        self, user_id: UUID, book_id: UUID, updates: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Updates a user's reading progress for a specific book.
+        Only `status` and `progress_percentage` can be updated, which keeps the
+        statement shape fixed so it can be prepared once per connection.
+
+        Returns:
+            The updated record dictionary, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        unsupported = set(updates) - {"status", "progress_percentage"}
+        if unsupported:
+            self.logger.error(
+                f"update_book_progress does not support fields: {sorted(unsupported)}"
+            )
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "update_book_progress",
+                    """
+                    UPDATE public.user_reading_progress AS urp
+                    SET status = COALESCE($3::reading_status, urp.status),
+                        progress_percentage = COALESCE($4::real, urp.progress_percentage)
+                    WHERE urp.user_id = $1::uuid AND urp.book_id = $2::uuid
+                    RETURNING
+                        urp.user_id,
+                        urp.book_id,
+                        urp.status,
+                        urp.progress_percentage,
+                        to_json(urp.started_reading_at) #>> '{}' AS started_reading_at,
+                        to_json(urp.finished_reading_at) #>> '{}' AS finished_reading_at,
+                        to_json(urp.last_progress_update_at) #>> '{}'
+                            AS last_progress_update_at
+                    """,
+                    (
+                        str(user_id),
+                        str(book_id),
+                        updates.get("status"),
+                        updates.get("progress_percentage"),
+                    ),
+                )
+                row = cursor.fetchone()
+
+            if row:
+                self.logger.info(
+                    f"Updated progress for book '{str(book_id)[:8]}' for user '{str(user_id)[:8]}'."
+                )
+                return dict(row)
+
+            self.logger.warning(
+                f"Attempted to update a book that does not exist in user's library. User: {user_id}, Book: {book_id}"
+            )
+            return None
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"update_book_progress (user_id={user_id}, book_id={book_id})"
+            )
+
+    def fetch_library_shelves(
+        self,
+        shelf_limit: Optional[int],
+        status: Optional[str] = None,
+        cursor_updated_at: Optional[str] = None,
+        cursor_book_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the current user's library grouped by status via
+        `get_user_library_shelves`.
+
+        Returns:
+            A dict of status -> {"count": int, "books": [...]}, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Postgres session is not initialized.")
+            return None
+
+        try:
+            with self.client.transaction() as cursor:
+                self.client.execute_prepared(
+                    cursor,
+                    "fetch_library_shelves",
+                    """
+                    SELECT public.get_user_library_shelves(
+                        $1::int, $2::reading_status, $3::timestamptz, $4::uuid
+                    ) AS shelves
+                    """,
+                    (shelf_limit, status, cursor_updated_at, cursor_book_id),
+                )
+                row = cursor.fetchone()
+
+            return row["shelves"] if row else {}
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_library_shelves (status={status}, limit={shelf_limit})"
+            )
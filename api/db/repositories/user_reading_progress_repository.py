@@ -7,6 +7,34 @@ from psycopg2 import errors
 
 UniqueViolation = errors.lookup("23505")
 
+# Columns selected for a user's library, with the book embedded via PostgREST.
+LIBRARY_SELECT = """
+    status,
+    progress_percentage,
+    started_reading_at,
+    finished_reading_at,
+    book_id: book_id,
+    books (
+        id,
+        title,
+        author,
+        cover_image_url,
+        description,
+        total_pages
+    )
+"""
+
+
+def flatten_library_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merges each row's nested 'books' object into the row itself."""
+    records = []
+    for item in rows:
+        book_details = item.pop("books")  # Remove the nested 'books' object
+        if book_details:  # Ensure it's not null
+            # Merge the two dictionaries
+            records.append({**item, **book_details})
+    return records
+
 
 class UserReadingProgressRepository(BaseRepository):
     def __init__(self, db_client):
@@ -66,6 +94,41 @@ class UserReadingProgressRepository(BaseRepository):
                 e, f"add_book_for_user (user_id={user_id}, book_id={book_id})"
             )
 
+    def add_books_for_user(
+        self, user_id: UUID, book_ids: List[UUID]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Adds several books to a user's reading list in one statement via the
+        `add_books_to_library` RPC. Defaults the status to 'to_read'.
+
+        Args:
+            user_id: The ID of the user (the RPC itself uses auth.uid()).
+            book_ids: The IDs of the books to add.
+
+        Returns:
+            A list of {"book_id", "outcome"} dicts in request order, where outcome
+            is 'created', 'already_exists' or 'not_found'; None on error.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized.")
+            return None
+
+        try:
+            result = self.client.rpc(
+                "add_books_to_library", {"book_ids": [str(b) for b in book_ids]}
+            ).execute()
+            outcomes = result.data or []
+            created = sum(1 for o in outcomes if o["outcome"] == "created")
+            self.logger.info(
+                f"User '{str(user_id)[:8]}' bulk-added {created} of {len(book_ids)} books to their library."
+            )
+            return outcomes
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"add_books_for_user (user_id={user_id}, books={len(book_ids)})"
+            )
+
     def fetch_books_for_user(self, user_id: UUID) -> Optional[List[Dict[str, Any]]]:
         """
         Fetches all books in a user's library, joining with the books table
@@ -86,23 +149,7 @@ class UserReadingProgressRepository(BaseRepository):
             # The select statement now pulls columns from both tables into a single flat object.
             data, count = (
                 self.client.table(self.table_name)
-                .select(
-                    """
-                status,
-                progress_percentage,
-                started_reading_at,
-                finished_reading_at,
-                book_id: book_id,
-                books (
-                    id,
-                    title,
-                    author,
-                    cover_image_url,
-                    description,
-                    total_pages
-                )
-            """
-                )
+                .select(LIBRARY_SELECT)
                 .eq("user_id", str(user_id))
                 .order("last_progress_update_at", desc=True)
                 .execute()
@@ -111,12 +158,7 @@ class UserReadingProgressRepository(BaseRepository):
             # Now we need to flatten the data structure
             records = []
             if data and len(data[1]) > 1:
-                for item in data[1]:
-                    book_details = item.pop("books")  # Remove the nested 'books' object
-                    if book_details:  # Ensure it's not null
-                        # Merge the two dictionaries
-                        flat_item = {**item, **book_details}
-                        records.append(flat_item)
+                records = flatten_library_rows(data[1])
 
             self.logger.info(
                 f"Fetched and flattened {len(records)} books for user '{str(user_id)[:8]}'."
@@ -128,6 +170,33 @@ class UserReadingProgressRepository(BaseRepository):
                 e, f"fetch_books_for_user (user_id={user_id})"
             )
 
+    def has_book(self, user_id: UUID, book_id: UUID) -> Optional[bool]:
+        """
+        Checks whether a book is in a user's library.
+
+        Returns:
+            True or False, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized.")
+            return None
+
+        try:
+            data, count = (
+                self.client.table(self.table_name)
+                .select("book_id")
+                .eq("user_id", str(user_id))
+                .eq("book_id", str(book_id))
+                .limit(1)
+                .execute()
+            )
+            return bool(data and data[1])
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"has_book (user_id={user_id}, book_id={book_id})"
+            )
+
     def update_book_progress(
         self, user_id: UUID, book_id: UUID, updates: Dict[str, Any]
     ) -> Optional[Dict[str, Any]]:
@@ -172,3 +241,74 @@ class UserReadingProgressRepository(BaseRepository):
             return self._handle_supabase_error(
                 e, f"update_book_progress (user_id={user_id}, book_id={book_id})"
             )
+
+    def fetch_library_shelves(
+        self,
+        shelf_limit: Optional[int],
+        status: Optional[str] = None,
+        cursor_updated_at: Optional[str] = None,
+        cursor_book_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches the current user's library already flattened and grouped by
+        status via the `get_user_library_shelves` RPC.
+
+        Args:
+            shelf_limit: Maximum books per shelf, or None for whole shelves. The
+                RPC returns one extra row per shelf so the caller can tell whether
+                more exist.
+            status: Restrict the result to a single shelf.
+            cursor_updated_at: `last_progress_update_at` of the last book already seen on that shelf.
+            cursor_book_id: `book_id` of the last book already seen on that shelf.
+
+        Returns:
+            A dict of status -> {"count": int, "books": [...]}, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized.")
+            return None
+
+        try:
+            params = {
+                "shelf_limit": shelf_limit,
+                "shelf_status": status,
+                "cursor_updated_at": cursor_updated_at,
+                "cursor_book_id": cursor_book_id,
+            }
+            result = self.client.rpc("get_user_library_shelves", params).execute()
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"fetch_library_shelves (status={status}, limit={shelf_limit})"
+            )
+
+    def apply_progress_batch(self, rows: List[Dict[str, Any]]) -> Optional[int]:
+        """
+        Applies many progress updates in one statement via the
+        `apply_reading_progress_batch` RPC. Rows for books that are not in
+        the user's library are ignored.
+
+        Args:
+            rows: Dicts with `user_id`, `book_id` and optional `status` / `progress_percentage`.
+
+        Returns:
+            The number of rows updated, or None on error.
+        """
+        if not self.client:
+            self.logger.error("Supabase client is not initialized.")
+            return None
+
+        try:
+            result = self.client.rpc(
+                "apply_reading_progress_batch", {"updates": rows}
+            ).execute()
+            self.logger.info(
+                f"Applied {result.data} of {len(rows)} batched progress updates."
+            )
+            return result.data
+
+        except Exception as e:
+            return self._handle_supabase_error(
+                e, f"apply_progress_batch (rows={len(rows)})"
+            )
@@ -0,0 +1,86 @@
+# api/db/request_scope.py
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from flask import copy_current_request_context, g, has_request_context
+from api.utils.logger_config import logger
+
+T = TypeVar("T")
+
+_Registry = Dict[str, Tuple[Any, Optional[Callable[[Any], None]]]]
+
+# Request attributes the database clients read to act as the current user.
+_IDENTITY_ATTRS = ("request_id", "user_id", "user_jwt", "refresh_token")
+
+
+def get_request_scoped(
+    key: str,
+    factory: Callable[[], T],
+    close: Optional[Callable[[T], None]] = None,
+) -> T:
+    """
+    Returns the object registered under `key` for the current request,
+    creating it with `factory` on first use. `close` is called on it in
+    teardown_request. Outside a request the factory is called every time.
+    """
+    if not has_request_context():
+        return factory()
+
+    registry: _Registry = g.setdefault("_request_scope", {})
+    if key in registry:
+        return registry[key][0]
+
+    value = factory()
+    registry[key] = (value, close)
+    return value
+
+
+def teardown_request_scope(exc: Optional[BaseException] = None) -> None:
+    """
+    Closes every object created for the current request, newest first.
+    To be called via @app.teardown_request.
+    """
+    registry: _Registry = g.pop("_request_scope", {})
+    if not registry:
+        return
+
+    for key, (value, close) in reversed(list(registry.items())):
+        if close is None:
+            continue
+        try:
+            close(value)
+        except Exception as e:
+            logger.error(f"Error closing a request-scoped {type(value).__name__}: {e}")
+
+    # Keys are not logged: they may be derived from credentials.
+    logger.debug(
+        f"Request scope created {len(registry)} objects | Request ID: {getattr(g, 'request_id', None)}"
+    )
+
+
+def spawn_with_request_context(fn: Callable[[], None]) -> None:
+    """
+    Runs `fn` in a daemon thread inside a copy of the current request, with
+    the same user credentials on `g`, so request-scoped clients act as that
+    user. They are released when the copy is torn down. Outside a request
+    `fn` runs in a plain thread.
+    """
+    if not has_request_context():
+        threading.Thread(target=fn, daemon=True).start()
+        return
+
+    identity = {attr: g.get(attr) for attr in _IDENTITY_ATTRS}
+
+    @copy_current_request_context
+    def run():
+        for attr, value in identity.items():
+            setattr(g, attr, value)
+        try:
+            fn()
+        except Exception as e:
+            logger.error(
+                f"Background task failed: {e} | Request ID: {identity['request_id']}"
+            )
+
+    threading.Thread(target=run, daemon=True).start()
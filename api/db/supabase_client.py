@@ -1,11 +1,16 @@
 # api/db/supabase_client.py
 
+import hashlib
 import os
-from typing import Optional
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
 
-from flask import g
-from supabase import create_client, Client
+from flask import g, has_request_context
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
+from api.db.request_scope import get_request_scoped
 from api.utils.logger_config import logger
 
 load_dotenv()
@@ -14,44 +19,225 @@ SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+# Pool sizing is per worker process. Each pooled client keeps its own
+# keep-alive PostgREST and storage connections open between requests.
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "10"))
+SUPABASE_POOL_ACQUIRE_TIMEOUT = float(os.getenv("SUPABASE_POOL_ACQUIRE_TIMEOUT", "5"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+
+# "session" confirms every user JWT with GoTrue and needs the refresh token.
+# "stateless" forwards the locally verified JWT as-is; RLS still applies.
+SUPABASE_CLIENT_MODE = os.getenv("SUPABASE_CLIENT_MODE", "session").lower()
+
+# When to open the admin client's connections: "import", "first_request" or "off".
+SUPABASE_ADMIN_WARMUP = os.getenv("SUPABASE_ADMIN_WARMUP", "first_request").lower()
+
+
+class SupabaseClientPool:
+    """
+    A bounded, thread-safe pool of anon-key Supabase clients.
+
+    Borrowed clients are scoped to the caller's JWT by setting the Authorization
+    header on their PostgREST and storage sessions, and are reset to the anon key
+    when released. Reusing a client reuses its open HTTP connections.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Client],
+        max_size: int = SUPABASE_POOL_SIZE,
+        acquire_timeout: float = SUPABASE_POOL_ACQUIRE_TIMEOUT,
+    ):
+        self._factory = factory
+        self.max_size = max(1, max_size)
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[Client]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._borrowed = 0
+        self._waits = 0
+        self._timeouts = 0
+
+    def acquire(self) -> Client:
+        """Borrows an idle client, creating one if the pool is not yet full."""
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            client = self._create_or_wait()
+
+        with self._lock:
+            self._in_use += 1
+            self._borrowed += 1
+        return client
+
+    def release(self, client: Client) -> None:
+        """Resets a borrowed client to the anon key and returns it to the pool."""
+        try:
+            _scope_client(client, SUPABASE_ANON_KEY)
+        except Exception as e:
+            # A client we cannot reset must not be handed to another user.
+            logger.error(f"Discarding pooled Supabase client after reset error: {e}")
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+            return
+
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(client)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns counters used to size the pool per worker."""
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "borrowed_total": self._borrowed,
+                "waits_total": self._waits,
+                "timeouts_total": self._timeouts,
+            }
+
+    def _create_or_wait(self) -> Client:
+        with self._lock:
+            can_create = self._created < self.max_size
+            if can_create:
+                self._created += 1
+            else:
+                self._waits += 1
+
+        if can_create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            logger.error(
+                f"Timed out after {self.acquire_timeout}s waiting for a pooled Supabase client."
+            )
+            raise TimeoutError("No Supabase client available in the pool.")
+
+
+def _scope_client(client: Client, token: Optional[str]) -> None:
+    """Points the client's PostgREST and storage sessions at the given bearer token."""
+    authorization = f"Bearer {token}"
+    client.options.headers["Authorization"] = authorization
+    client.postgrest.session.headers["Authorization"] = authorization
+    client.storage.session.headers["Authorization"] = authorization
+
+
+def _create_pooled_client() -> Client:
+    options = ClientOptions(
+        auto_refresh_token=False,
+        persist_session=False,
+        postgrest_client_timeout=SUPABASE_HTTP_TIMEOUT,
+        storage_client_timeout=int(SUPABASE_HTTP_TIMEOUT),
+    )
+    client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY, options)
+    logger.info("Supabase client created for the connection pool.")
+    return client
+
+
+_client_pool = SupabaseClientPool(_create_pooled_client)
+
+_admin_client: Optional[Client] = None
+_admin_lock = threading.Lock()
+_admin_state: Dict[str, Any] = {
+    "created_at": None,
+    "warmup_attempted": False,
+    "warmed_up": False,
+    "last_warmup_at": None,
+    "last_warmup_ms": None,
+    "last_error": None,
+}
+
+
+def is_stateless_mode() -> bool:
+    return SUPABASE_CLIENT_MODE == "stateless"
+
+
+def get_supabase_pool_stats() -> Dict[str, int]:
+    return _client_pool.stats()
+
+
+def _authenticate_client(
+    supabase_client: Client, user_jwt: Optional[str], refresh_token: Optional[str]
+) -> Client:
+    if user_jwt and is_stateless_mode():
+        _scope_client(supabase_client, user_jwt)
+        logger.info("Supabase client scoped to the verified user JWT.")
+    elif user_jwt and refresh_token:
+        # Confirm the session with GoTrue without touching the client's
+        # stored session, which would rebuild its pooled HTTP sessions.
+        supabase_client.auth.get_user(user_jwt)
+        _scope_client(supabase_client, user_jwt)
+        logger.info("Supabase client scoped to the user JWT.")
+    else:
+        logger.info(
+            "No user JWT found. Supabase client created without authentication."
+        )
+    return supabase_client
+
+
+def _borrow_client(user_jwt: Optional[str], refresh_token: Optional[str]) -> Client:
+    supabase_client = _client_pool.acquire()
+    try:
+        return _authenticate_client(supabase_client, user_jwt, refresh_token)
+    except Exception:
+        _client_pool.release(supabase_client)
+        raise
+
 
 def get_supabase_client(
     user_jwt: Optional[str] = None, refresh_token: Optional[str] = None
 ) -> Client:
+    """
+    Returns a Supabase client scoped to the user's JWT.
 
+    Within a request the client is borrowed from the pool on first use, shared
+    by every later call with the same credentials, and released in teardown_request.
+    """
     if not SUPABASE_URL or not SUPABASE_ANON_KEY:
         logger.error("Supabase URL or Anon Key not found in environment variables.")
         raise ValueError("Supabase URL or Anon Key not found in environment variables.")
 
     try:
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-        logger.info("Supabase client created successfully.")
-
-        try:
-            if user_jwt is None:
-                user_jwt = g.get("user_jwt", None)
-
-            if refresh_token is None:
-                refresh_token = g.get("refresh_token", None)
-
-        except RuntimeError:
+        if not has_request_context():
+            # Outside a request nothing would release a borrowed client,
+            # so scripts and background jobs get a dedicated one.
             logger.warning(
-                "Flask g context not available. User JWT and refresh token will not be set."
-            )
-
-        if user_jwt and refresh_token:
-            supabase_client.auth.set_session(
-                access_token=user_jwt, refresh_token=refresh_token
+                "Flask g context not available. Creating an unpooled Supabase client."
             )
-            logger.info(
-                "Supabase client authenticated with user JWT and refresh token."
-            )
-        else:
-            logger.info(
-                "No user JWT found. Supabase client created without authentication."
+            return _authenticate_client(
+                _create_pooled_client(), user_jwt, refresh_token
             )
 
-        return supabase_client
+        if user_jwt is None and (not is_stateless_mode() or g.get("user_id", None)):
+            # In stateless mode only a JWT that passed local verification
+            # is forwarded, since GoTrue will not see it.
+            user_jwt = g.get("user_jwt", None)
+
+        if refresh_token is None:
+            refresh_token = g.get("refresh_token", None)
+
+        # Keyed by a digest so the token never ends up in keys or logs.
+        identity = (
+            hashlib.sha256(user_jwt.encode()).hexdigest()[:16] if user_jwt else "anon"
+        )
+        return get_request_scoped(
+            f"supabase_client:{identity}",
+            lambda: _borrow_client(user_jwt, refresh_token),
+            close=_client_pool.release,
+        )
 
     except Exception as e:
         logger.error(f"Error creating Supabase client: {e}")
@@ -60,11 +246,19 @@ def get_supabase_client(
 
 def get_supabase_admin_client() -> Client:
     """
-    Creates a Supabase client with full admin privileges using the service role key.
+    Returns the Supabase client with full admin privileges using the service role key.
     This client BYPASSES all Row-Level Security policies.
     Use with caution and only for trusted server-side operations like creating signed URLs
     or performing administrative tasks.
+
+    The client is created lazily once per worker process and reused, so its
+    HTTP connections stay open between requests.
     """
+    global _admin_client
+
+    if _admin_client is not None:
+        return _admin_client
+
     if not SUPABASE_SERVICE_KEY:
         logger.error(
             "SUPABASE_SERVICE_ROLE_KEY is not configured. Cannot create admin client."
@@ -75,10 +269,88 @@ def get_supabase_admin_client() -> Client:
         logger.error("Supabase URL or Anon Key not found in environment variables.")
         raise ValueError("Supabase URL or Anon Key not found in environment variables.")
 
+    with _admin_lock:
+        if _admin_client is not None:
+            return _admin_client
+        try:
+            options = ClientOptions(
+                auto_refresh_token=False,
+                persist_session=False,
+                postgrest_client_timeout=SUPABASE_HTTP_TIMEOUT,
+                storage_client_timeout=int(SUPABASE_HTTP_TIMEOUT),
+            )
+            _admin_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY, options)
+            _admin_state["created_at"] = time.time()
+            logger.info("Supabase admin client created successfully.")
+            return _admin_client
+        except Exception as e:
+            # Only the error class is reported; the message is in the logs.
+            _admin_state["last_error"] = type(e).__name__
+            logger.error(f"Error creating Supabase admin client: {e}")
+            raise
+
+
+def warm_up_admin_client() -> bool:
+    """
+    Creates the admin client if needed and opens its PostgREST and storage
+    connections (DNS, TLS, keep-alive) ahead of the first real query.
+    Returns True on success. Errors are logged and recorded, never raised.
+    """
+    _admin_state["warmup_attempted"] = True
+    started = time.perf_counter()
     try:
-        supabase_admin_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-        logger.info("Supabase admin client created successfully.")
-        return supabase_admin_client
+        client = get_supabase_admin_client()
+        client.postgrest.session.head("/")
+        client.storage.session.head("/bucket")
     except Exception as e:
-        logger.error(f"Error creating Supabase admin client: {e}")
-        raise
+        _admin_state["warmed_up"] = False
+        _admin_state["last_error"] = type(e).__name__
+        logger.error(f"Supabase admin client warm-up failed: {e}")
+        return False
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    _admin_state["warmed_up"] = True
+    _admin_state["last_warmup_at"] = time.time()
+    _admin_state["last_warmup_ms"] = elapsed_ms
+    _admin_state["last_error"] = None
+    logger.info(f"Supabase admin client warmed up in {elapsed_ms} ms.")
+    return True
+
+
+def warm_up_admin_client_on_first_request() -> None:
+    """
+    Runs the admin warm-up once per process when SUPABASE_ADMIN_WARMUP is
+    'first_request'. To be called via @app.before_request.
+    """
+    if SUPABASE_ADMIN_WARMUP != "first_request" or _admin_state["warmup_attempted"]:
+        return
+    with _admin_lock:
+        if _admin_state["warmup_attempted"]:
+            return
+        _admin_state["warmup_attempted"] = True
+    warm_up_admin_client()
+
+
+def get_admin_client_health(probe: bool = False) -> Dict[str, Any]:
+    """
+    Reports the admin client's connection state. With probe=True a lightweight
+    request is sent to PostgREST and its latency is included.
+    """
+    health: Dict[str, Any] = {
+        "initialized": _admin_client is not None,
+        **_admin_state,
+    }
+    if not probe:
+        return health
+
+    started = time.perf_counter()
+    try:
+        response = get_supabase_admin_client().postgrest.session.head("/")
+        health["reachable"] = response.status_code < 500
+        health["status_code"] = response.status_code
+    except Exception as e:
+        health["reachable"] = False
+        health["probe_error"] = type(e).__name__
+        logger.error(f"Supabase admin client probe failed: {e}")
+    health["probe_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return health
@@ -4,12 +4,26 @@ import uuid
 import traceback
 
 from api.utils.authentication import auth_context_processor
+from api.db.request_scope import teardown_request_scope
+from api.db.supabase_client import (
+    SUPABASE_ADMIN_WARMUP,
+    warm_up_admin_client,
+    warm_up_admin_client_on_first_request,
+)
+from api.utils.compression import compress_response
+from api.utils.http_cache import add_stale_header
+from api.utils.json_provider import FastJSONProvider
 from api.routes.home_routes import register_home_routes
 from api.routes.stripe_routes import register_stripe_routes
 
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.before_request(auth_context_processor)
+app.before_request(warm_up_admin_client_on_first_request)
+app.after_request(compress_response)
+app.after_request(add_stale_header)  # hooks run in reverse: before compression
+app.teardown_request(teardown_request_scope)
 
 
 @app.before_request
@@ -39,6 +53,9 @@ def handle_global_exception(e):
 register_home_routes(app)
 register_stripe_routes(app)
 
+if SUPABASE_ADMIN_WARMUP == "import":
+    warm_up_admin_client()
+
 if __name__ == "__main__":
     debug_mode = os.environ.get("FLASK_DEBUG", "0") == "1"
     app.run(debug=debug_mode)
@@ -0,0 +1 @@
+# api/jobs/__init__.py
@@ -0,0 +1,225 @@
+# api/jobs/preference_engine.py
+"""
+Batch personalization engine: recomputes the implicit `user_category_preferences`
+scores from `user_reading_progress` joined with `book_categories`, then
+refreshes the per-category recommendation candidates.
+
+Run periodically (e.g. nightly from cron) with:
+    python -m api.jobs.preference_engine
+"""
+
+import argparse
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.db.cache import get_shared_cache
+from api.db.postgres_client import PostgresSession
+from api.db.repositories.postgres_preferences_repository import (
+    PostgresPreferencesRepository,
+)
+from api.utils.logger_config import logger
+
+PREFERENCE_HALF_LIFE_DAYS = float(os.getenv("PREFERENCE_HALF_LIFE_DAYS", "90"))
+PREFERENCE_CHUNK_USERS = int(os.getenv("PREFERENCE_CHUNK_USERS", "5000"))
+
+STATUS_CODES = {"to_read": 0, "reading": 1, "finished": 2, "abandoned": 3}
+
+# Signal weight of one book per status, as base + slope * progress (0..1).
+# Abandoning a book early is negative evidence; late abandonment much less so.
+_STATUS_BASE = np.array([0.25, 0.5, 1.0, -0.5])
+_STATUS_SLOPE = np.array([0.0, 0.5, 0.0, 0.4])
+
+# Raw scores are squashed into (0, 1) around the table's neutral 0.5;
+# a raw score of SCORE_SCALE (two recent finished books) maps to ~0.88.
+SCORE_SCALE = 2.0
+
+
+def compute_preference_scores(
+    user_idx: np.ndarray,
+    category_idx: np.ndarray,
+    status: np.ndarray,
+    progress: np.ndarray,
+    age_days: np.ndarray,
+    half_life_days: float = PREFERENCE_HALF_LIFE_DAYS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes one decayed interest score per (user, category) pair.
+
+    Each input array has one entry per (library book, book category) signal:
+    dense user and category indexes, a STATUS_CODES code, progress_percentage
+    (0..100) and the age of the last update in days. A signal's weight halves
+    every `half_life_days`, and all signals of a pair are summed.
+
+    Returns:
+        (user_idx, category_idx, score) arrays with one entry per pair.
+    """
+    if len(user_idx) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+
+    weight = _STATUS_BASE[status] + _STATUS_SLOPE[status] * (progress / 100.0)
+    decay = np.exp2(-np.maximum(age_days, 0.0) / half_life_days)
+
+    n_categories = int(category_idx.max()) + 1
+    pair_keys = user_idx.astype(np.int64) * n_categories + category_idx
+    unique_keys, inverse = np.unique(pair_keys, return_inverse=True)
+    raw = np.bincount(inverse, weights=weight * decay)
+
+    scores = 0.5 + 0.5 * np.tanh(raw / SCORE_SCALE)
+    return (
+        unique_keys // n_categories,
+        unique_keys % n_categories,
+        scores.astype(np.float32),
+    )
+
+
+def score_signal_rows(
+    rows: List[Dict[str, Any]], half_life_days: float = PREFERENCE_HALF_LIFE_DAYS
+) -> List[Tuple[str, str, float]]:
+    """
+    Turns signal rows (as returned by PostgresPreferencesRepository) into
+    (user_id, category_id, score) upsert rows. Rows without a category or
+    without a signal (status None) are ignored.
+    """
+    rows = [
+        row
+        for row in rows
+        if row["category_id"] is not None and row["status"] is not None
+    ]
+    if not rows:
+        return []
+
+    user_ids, user_idx = np.unique(
+        np.array([row["user_id"] for row in rows]), return_inverse=True
+    )
+    category_ids, category_idx = np.unique(
+        np.array([row["category_id"] for row in rows]), return_inverse=True
+    )
+    status = np.fromiter(
+        (STATUS_CODES[row["status"]] for row in rows), dtype=np.int8, count=len(rows)
+    )
+    progress = np.fromiter(
+        (row["progress_percentage"] for row in rows), dtype=np.float64, count=len(rows)
+    )
+    age_days = np.fromiter(
+        (row["age_days"] for row in rows), dtype=np.float64, count=len(rows)
+    )
+
+    pair_users, pair_categories, scores = compute_preference_scores(
+        user_idx, category_idx, status, progress, age_days, half_life_days
+    )
+    return list(
+        zip(
+            user_ids[pair_users].tolist(),
+            category_ids[pair_categories].tolist(),
+            scores.tolist(),
+        )
+    )
+
+
+class PreferenceEngine:
+    """
+    Walks all users with reading activity or implicit preferences in user_id
+    order, `chunk_users` at a time. Each chunk is fetched in one query,
+    scored with NumPy and written in one transaction that replaces the
+    chunk's implicit rows, so memory stays bounded by the chunk size.
+    """
+
+    def __init__(
+        self,
+        repository: PostgresPreferencesRepository,
+        chunk_users: int = PREFERENCE_CHUNK_USERS,
+        half_life_days: float = PREFERENCE_HALF_LIFE_DAYS,
+    ):
+        self.repository = repository
+        self.chunk_users = chunk_users
+        self.half_life_days = half_life_days
+
+    def run(self) -> Dict[str, Any]:
+        """Recomputes every user's implicit preferences and returns throughput stats."""
+        started = time.perf_counter()
+        stats = {"users": 0, "signals": 0, "preferences": 0, "chunks": 0}
+        after_user_id: Optional[str] = None
+
+        while True:
+            rows = self.repository.fetch_interaction_chunk(
+                after_user_id, self.chunk_users
+            )
+            if rows is None:
+                raise RuntimeError(f"Failed to fetch chunk after user {after_user_id}.")
+            if not rows:
+                break
+
+            upserts = score_signal_rows(rows, self.half_life_days)
+            user_ids = list(dict.fromkeys(row["user_id"] for row in rows))
+            if (
+                self.repository.upsert_implicit_preferences(
+                    upserts, replace_user_ids=user_ids
+                )
+                is None
+            ):
+                raise RuntimeError(
+                    f"Failed to upsert chunk after user {after_user_id}."
+                )
+
+            chunk_users = len(user_ids)
+            stats["users"] += chunk_users
+            stats["signals"] += len(rows)
+            stats["preferences"] += len(upserts)
+            stats["chunks"] += 1
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Preference engine chunk {stats['chunks']}: {chunk_users} users, "
+                f"{len(upserts)} preferences ({stats['users'] / elapsed:.0f} users/s overall)."
+            )
+
+            if chunk_users < self.chunk_users:
+                break
+            after_user_id = rows[-1]["user_id"]
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["users_per_second"] = (
+            round(stats["users"] / elapsed, 1) if elapsed else 0.0
+        )
+        logger.info(f"Preference engine finished: {stats}")
+        return stats
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-users", type=int, default=PREFERENCE_CHUNK_USERS)
+    parser.add_argument(
+        "--half-life-days", type=float, default=PREFERENCE_HALF_LIFE_DAYS
+    )
+    parser.add_argument(
+        "--skip-candidates",
+        action="store_true",
+        help="do not refresh the recommendation candidate lists afterwards",
+    )
+    args = parser.parse_args(argv)
+
+    # service_role bypasses RLS so the job can read and write every user's rows.
+    session = PostgresSession({"role": "service_role"})
+    repository = PostgresPreferencesRepository(session)
+    engine = PreferenceEngine(
+        repository,
+        chunk_users=args.chunk_users,
+        half_life_days=args.half_life_days,
+    )
+    stats = engine.run()
+
+    if not args.skip_candidates:
+        if repository.refresh_recommendation_candidates() is None:
+            raise RuntimeError("Failed to refresh recommendation candidates.")
+        # Instances see the new version within CACHE_VERSION_TTL and reload.
+        get_shared_cache().invalidate("candidates")
+        logger.info("Refreshed recommendation candidates.")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,38 @@
-from flask import request, jsonify, g
-from api.services import book_service, categories_service
+import hmac
+import os
+
+from flask import Response, request, jsonify, g, send_file, stream_with_context
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from api.services import (
+    book_content_service,
+    book_service,
+    categories_service,
+    dashboard_service,
+    read_url_service,
+)
 from api.utils.logger_config import logger
 from api.utils.authentication import login_required
+from typing import Optional
 from uuid import UUID
 
-from api.db.supabase_client import get_supabase_admin_client
+from api.db.cache import get_shared_cache
+from api.db.supabase_client import (
+    get_admin_client_health,
+    get_supabase_pool_stats,
+)
+from api.services.preference_updates import preference_updates
+from api.services.progress_buffer import progress_buffer
+from api.utils.compression import get_compression_stats
+from api.utils.http_cache import (
+    json_with_etag,
+    make_etag,
+    not_modified,
+    raw_json_with_etag,
+)
+
+# Shared secret for /api/health/supabase?probe=1 (sent as X-Health-Token);
+# probing is disabled while it is unset.
+HEALTH_PROBE_TOKEN = os.getenv("HEALTH_PROBE_TOKEN", "")
 
 
 def register_home_routes(app):
@@ -15,6 +43,64 @@ def register_home_routes(app):
         logger.debug("api/health route accessed")
         return jsonify({"message": "API is running", "request_id": g.request_id}), 200
 
+    @app.route("/api/health/supabase", methods=["GET"])
+    def supabase_health():
+        logger.debug("api/health/supabase route accessed")
+        probe = request.args.get("probe", "0") == "1"
+        if probe and not (
+            HEALTH_PROBE_TOKEN
+            and hmac.compare_digest(
+                request.headers.get("X-Health-Token", ""), HEALTH_PROBE_TOKEN
+            )
+        ):
+            # The probe sends a live service-role request; keep it internal.
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "AuthorizationError",
+                            "message": "Probing requires a valid X-Health-Token.",
+                            "code": "forbidden",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                403,
+            )
+        return (
+            jsonify(
+                {
+                    "pool": get_supabase_pool_stats(),
+                    "admin": get_admin_client_health(probe=probe),
+                    "progress_buffer": progress_buffer.stats(),
+                    "category_cache": categories_service.category_cache.stats(),
+                    "candidate_cache": book_service.candidate_cache.stats(),
+                    "shared_cache": get_shared_cache().stats(),
+                    "epub_disk_cache": (
+                        book_content_service.get_disk_cache().stats()
+                        if book_content_service.EPUB_CACHE_DIR
+                        else None
+                    ),
+                    "preference_updates": preference_updates.stats(),
+                    "request_id": g.request_id,
+                }
+            ),
+            200,
+        )
+
+    @app.route("/api/health/compression", methods=["GET"])
+    def compression_health():
+        logger.debug("api/health/compression route accessed")
+        return (
+            jsonify(
+                {
+                    "routes": get_compression_stats(),
+                    "request_id": g.request_id,
+                }
+            ),
+            200,
+        )
+
     @app.route("/api/me", methods=["GET"])
     @login_required
     def me():
@@ -62,8 +148,19 @@ def register_home_routes(app):
     def get_categories():
         logger.debug(f"Get categories route accessed | Request ID: {g.request_id}")
         try:
-            categories = categories_service.get_categories()
-            return jsonify({"categories": categories, "request_id": g.request_id}), 200
+            view = request.args.get("view", "flat")
+            version = categories_service.get_categories_version()
+            etag = make_etag("categories", view, version) if version else None
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            if view == "tree":
+                categories = categories_service.get_category_tree()
+                return json_with_etag({"categories": categories}, etag)
+            # The flat list is sent as cached, without re-encoding it.
+            raw = categories_service.get_categories_json()
+            return raw_json_with_etag("categories", raw or b"null", etag)
         except Exception as e:
             logger.error(
                 f"Error fetching categories: {str(e)} | Request ID: {g.request_id}"
@@ -82,6 +179,39 @@ def register_home_routes(app):
                 500,
             )
 
+    @app.route("/api/categories/<uuid:category_id>/subtree", methods=["GET"])
+    def get_category_subtree(category_id):
+        logger.debug(
+            f"Get category subtree route accessed | Request ID: {g.request_id}"
+        )
+        subtree = categories_service.get_category_subtree(category_id)
+        if subtree is None:
+            return _category_not_found()
+        return jsonify({"category": subtree, "request_id": g.request_id}), 200
+
+    @app.route("/api/categories/<uuid:category_id>/path", methods=["GET"])
+    def get_category_path(category_id):
+        logger.debug(f"Get category path route accessed | Request ID: {g.request_id}")
+        path = categories_service.get_category_path(category_id)
+        if path is None:
+            return _category_not_found()
+        return jsonify({"path": path, "request_id": g.request_id}), 200
+
+    def _category_not_found():
+        return (
+            jsonify(
+                {
+                    "error": {
+                        "type": "NotFoundError",
+                        "message": "Category not found.",
+                        "code": "category_not_found",
+                        "request_id": g.request_id,
+                    }
+                }
+            ),
+            404,
+        )
+
     @app.route("/api/books", methods=["GET"])
     @login_required  # Protect this route so only logged-in users can see books
     def get_books():
@@ -90,11 +220,66 @@ def register_home_routes(app):
             # Get pagination parameters from the query string with defaults
             page = request.args.get("page", 1, type=int)
             limit = request.args.get("limit", 20, type=int)
+            cursor = request.args.get("cursor")
+            category_id = request.args.get("category_id")
+            if category_id is not None:
+                try:
+                    category_id = UUID(category_id)
+                except ValueError:
+                    return (
+                        jsonify(
+                            {
+                                "error": {
+                                    "type": "ValidationError",
+                                    "message": "Invalid category_id format.",
+                                    "code": "invalid_category_id",
+                                    "request_id": g.request_id,
+                                }
+                            }
+                        ),
+                        400,
+                    )
+                # Category browsing is always keyset-paginated.
+                if "page" in request.args:
+                    return (
+                        jsonify(
+                            {
+                                "error": {
+                                    "type": "ValidationError",
+                                    "message": "Use cursor, not page, to paginate a category.",
+                                    "code": "invalid_pagination",
+                                    "request_id": g.request_id,
+                                }
+                            }
+                        ),
+                        400,
+                    )
+                cursor = cursor or ""
+
+            # The discover feed marks books already in the user's library, so
+            # its version covers both the catalog and the library.
+            versions = book_service.get_content_versions()
+            etag = (
+                make_etag(
+                    "books", g.user_id, page, limit, cursor, category_id, versions
+                )
+                if versions
+                else None
+            )
+            cached = not_modified(etag)
+            if cached:
+                return cached
 
-            books = book_service.get_discover_books(page=page, limit=limit)
+            # A `cursor` param (empty for the first page) selects keyset pagination.
+            if cursor is not None:
+                return _get_books_by_cursor(cursor, limit, etag, category_id)
+
+            books = book_service.get_discover_books_json(
+                page=page, limit=limit, versions=versions
+            )
 
             if books is not None:
-                return jsonify({"books": books, "request_id": g.request_id}), 200
+                return raw_json_with_etag("books", books, etag)
             else:
                 # Differentiate between "no books found" (an empty list) and an actual error
                 return jsonify({"books": [], "request_id": g.request_id}), 200
@@ -115,100 +300,294 @@ def register_home_routes(app):
                 500,
             )
 
-    # --- SYNTH-STACK: NEW ROUTE FOR FETCHING BOOK CONTENT URL ---
-    @app.route("/api/books/<uuid:book_id>/read", methods=["GET"])
+    @app.route("/api/dashboard", methods=["GET"])
     @login_required
-    def get_book_read_url(book_id: UUID):
+    async def get_dashboard():
+        """Subscription status, library, categories and discover page in one call."""
+        logger.debug(f"Get dashboard route accessed | Request ID: {g.request_id}")
         try:
-            # SYNTH-STACK: Use the new admin client to bypass RLS for this system task
-            supabase_admin = get_supabase_admin_client()
+            page = request.args.get("page", 1, type=int)
+            limit = request.args.get("limit", 20, type=int)
 
-            # 1. Fetch the book record to get its storage path
-            book_record_req = (
-                supabase_admin.table("books")
-                .select("epub_storage_path")
-                .eq("id", str(book_id))
-                .single()
-                .execute()
+            dashboard = await dashboard_service.get_dashboard(
+                user_id=g.user_id, page=page, limit=limit
             )
+            return jsonify({**dashboard, "request_id": g.request_id}), 200
 
-            # The response object from supabase-py v1 is different, access data attribute
-            book_record = book_record_req.data
+        except Exception as e:
+            logger.error(
+                f"Error fetching dashboard: {str(e)} | Request ID: {g.request_id}"
+            )
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "FetchError",
+                            "message": "Internal server error fetching dashboard",
+                            "code": "fetch_dashboard_error",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                500,
+            )
 
-            if not book_record or not book_record.get("epub_storage_path"):
-                logger.warning(
-                    f"Book content path not found for book_id: {book_id} | Request ID: {g.request_id}"
-                )
-                return (
-                    jsonify(
-                        {
-                            "error": {
-                                "type": "NotFoundError",
-                                "message": "Book content not available.",
-                                "code": "book_content_not_found",
-                                "request_id": g.request_id,
-                            }
+    def _get_books_by_cursor(
+        cursor: str,
+        limit: int,
+        etag: Optional[str],
+        category_id: Optional[UUID] = None,
+    ):
+        try:
+            result = book_service.get_discover_books_page(
+                cursor=cursor, limit=limit, category_id=category_id
+            )
+        except ValueError:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": "Invalid cursor.",
+                            "code": "invalid_cursor",
+                            "request_id": g.request_id,
                         }
-                    ),
-                    404,
-                )
+                    }
+                ),
+                400,
+            )
 
-            storage_path = book_record.get("epub_storage_path")
-            # Assuming storage_path is like 'public-epubs/filename.epub'
-            # We need to extract the bucket name and the file path within the bucket
-            path_parts = storage_path.split("/", 1)
-            bucket_name = path_parts[0]
-            file_path = path_parts[1] if len(path_parts) > 1 else ""
-
-            # 2. Generate a signed URL valid for 1 hour (3600 seconds)
-            signed_url_response = supabase_admin.storage.from_(
-                bucket_name
-            ).create_signed_url(file_path, 3600)
-
-            # The response is now a dictionary, not an object with attributes
-            if (
-                "error" in signed_url_response
-                and signed_url_response["error"] is not None
-            ):
-                logger.error(
-                    f"Error creating signed URL: {signed_url_response['error']} | Request ID: {g.request_id}"
+        if result is None:
+            return (
+                jsonify({"books": [], "next_cursor": None, "request_id": g.request_id}),
+                200,
+            )
+        return json_with_etag(result, etag)
+
+    @app.route("/api/books/search", methods=["GET"])
+    @login_required
+    def search_books():
+        logger.debug(f"Search books route accessed | Request ID: {g.request_id}")
+        page = request.args.get("page", 1, type=int)
+        limit = request.args.get("limit", 20, type=int)
+        try:
+            result = book_service.search_books(
+                request.args.get("q", ""), page=page, limit=limit
+            )
+        except ValueError as ve:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": str(ve),
+                            "code": "invalid_search_query",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
+            )
+
+        if result is None:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "FetchError",
+                            "message": "Internal server error searching books",
+                            "code": "search_books_error",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                500,
+            )
+        return jsonify({**result, "request_id": g.request_id}), 200
+
+    @app.route("/api/recommendations", methods=["GET"])
+    @login_required
+    def get_recommendations():
+        logger.debug(f"Get recommendations route accessed | Request ID: {g.request_id}")
+        page = request.args.get("page", 1, type=int)
+        limit = request.args.get("limit", 20, type=int)
+        result = book_service.get_recommendations(page=page, limit=limit)
+
+        if result is None:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "FetchError",
+                            "message": "Internal server error fetching recommendations",
+                            "code": "fetch_recommendations_error",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                500,
+            )
+        return jsonify({**result, "request_id": g.request_id}), 200
+
+    @app.route("/api/books/export", methods=["GET"])
+    @login_required
+    def export_books():
+        logger.debug(f"Export books route accessed | Request ID: {g.request_id}")
+        return _ndjson_export(book_service.iter_catalog_export(), "books.ndjson")
+
+    @app.route("/api/my-books/export", methods=["GET"])
+    @login_required
+    def export_my_books():
+        logger.debug(f"Export my-books route accessed | Request ID: {g.request_id}")
+        return _ndjson_export(
+            book_service.iter_library_export(g.user_id), "my-books.ndjson"
+        )
+
+    def _ndjson_export(records, filename: str):
+        """
+        Streams `records` as newline-delimited JSON. The first record is read
+        up front so a failing first batch still returns a 500; a failure later
+        in the stream ends it with a final {"error": ...} line.
+        """
+        error = {
+            "type": "ExportError",
+            "message": "Export failed.",
+            "code": "export_error",
+            "request_id": g.request_id,
+        }
+        try:
+            first = next(records, None)
+        except Exception as e:
+            logger.error(f"Error starting export: {e} | Request ID: {g.request_id}")
+            return jsonify({"error": error}), 500
+
+        def generate():
+            if first is None:
+                return
+            yield app.json.dumps(first) + "\n"
+            try:
+                for record in records:
+                    yield app.json.dumps(record) + "\n"
+            except Exception as e:
+                logger.error(f"Error during export: {e} | Request ID: {g.request_id}")
+                yield app.json.dumps({"error": error}) + "\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    # --- SYNTH-STACK: NEW ROUTE FOR FETCHING BOOK CONTENT URL ---
+    @app.route("/api/books/<uuid:book_id>/read", methods=["GET"])
+    @login_required
+    def get_book_read_url(book_id: UUID):
+        result = read_url_service.get_read_url(book_id)
+        if result["success"]:
+            return jsonify({**result["data"], "request_id": g.request_id}), 200
+
+        logger.warning(
+            f"No read URL for book_id {book_id}: {result['error']['code']} | Request ID: {g.request_id}"
+        )
+        return jsonify({"error": result["error"]}), result["status_code"]
+
+    @app.route("/api/books/<uuid:book_id>/content", methods=["GET"])
+    @login_required
+    def get_book_content(book_id: UUID):
+        """
+        Streams the EPUB of a book from the local disk cache, honoring Range
+        requests so readers can fetch the container and first chapter first.
+        """
+        with book_content_service.local_book_content(book_id) as result:
+            if not result["success"]:
+                return jsonify({"error": result["error"]}), result["status_code"]
+
+            path = result["data"]["path"]
+            try:
+                # send_file opens the file before returning, so it stays
+                # readable even if the cache evicts it mid-response.
+                response = send_file(
+                    path, mimetype="application/epub+zip", conditional=True
                 )
-                return (
-                    jsonify(
-                        {
-                            "error": {
-                                "type": "StorageError",
-                                "message": "Could not retrieve book content.",
-                                "code": "signed_url_error",
-                                "request_id": g.request_id,
-                            }
+            except RequestedRangeNotSatisfiable:
+                response = jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": "Requested range is not satisfiable.",
+                            "code": "range_not_satisfiable",
+                            "request_id": g.request_id,
                         }
-                    ),
-                    500,
+                    }
                 )
+                response.status_code = 416
+                response.headers["Content-Range"] = f"bytes */{os.path.getsize(path)}"
+                return response
 
-            signed_url = signed_url_response.get("signedURL")
-            return jsonify({"signed_url": signed_url, "request_id": g.request_id}), 200
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
 
-        except Exception as e:
-            logger.error(
-                f"Unexpected error in get_book_read_url: {e} | Request ID: {g.request_id}",
-                exc_info=True,
+    @app.route("/api/books/read-urls", methods=["POST"])
+    @login_required
+    def get_book_read_urls():
+        """Signs read links for several books at once, e.g. to prefetch a library page."""
+        logger.debug(
+            f"POST /api/books/read-urls route accessed | Request ID: {g.request_id}"
+        )
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get("book_ids"), list):
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": "book_ids must be a list of book IDs.",
+                            "code": "missing_book_ids",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
             )
+
+        try:
+            book_ids = [UUID(str(book_id)) for book_id in data["book_ids"]]
+        except (ValueError, TypeError):
             return (
                 jsonify(
                     {
                         "error": {
-                            "type": "InternalServerError",
-                            "message": "Internal server error.",
-                            "code": "internal_error",
+                            "type": "ValidationError",
+                            "message": "Invalid book_id format.",
+                            "code": "invalid_book_id_format",
                             "request_id": g.request_id,
                         }
                     }
                 ),
-                500,
+                400,
+            )
+
+        try:
+            result = read_url_service.get_read_urls(book_ids)
+        except ValueError as ve:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": str(ve),
+                            "code": "invalid_book_ids",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
             )
 
+        if result["success"]:
+            return jsonify({"data": result["data"], "request_id": g.request_id}), 200
+        return jsonify({"error": result["error"]}), result["status_code"]
+
     @app.route("/api/my-books", methods=["GET", "POST"])
     @login_required
     def my_books():
@@ -280,12 +659,52 @@ def register_home_routes(app):
                 f"GET /api/my-books route accessed | Request ID: {g.request_id}"
             )
             try:
-                library_data = book_service.get_user_library(user_id)
-                if library_data is not None:
+                # Whole shelves unless the client asks for a page of them.
+                shelf_limit = request.args.get("shelf_limit", type=int)
+                status = request.args.get("status")
+                cursor = request.args.get("cursor")
+
+                versions = book_service.get_content_versions(("library",))
+                etag = (
+                    make_etag(
+                        "my-books",
+                        user_id,
+                        shelf_limit,
+                        status,
+                        cursor,
+                        versions["library"],
+                    )
+                    if versions
+                    else None
+                )
+                cached = not_modified(etag)
+                if cached:
+                    return cached
+
+                try:
+                    library_data = book_service.get_user_library_shelves(
+                        user_id,
+                        shelf_limit=shelf_limit,
+                        status=status,
+                        cursor=cursor,
+                    )
+                except ValueError as ve:
                     return (
-                        jsonify({"library": library_data, "request_id": g.request_id}),
-                        200,
+                        jsonify(
+                            {
+                                "error": {
+                                    "type": "ValidationError",
+                                    "message": str(ve),
+                                    "code": "invalid_library_query",
+                                    "request_id": g.request_id,
+                                }
+                            }
+                        ),
+                        400,
                     )
+
+                if "error" not in library_data:
+                    return json_with_etag(library_data, etag)
                 else:
                     return (
                         jsonify(
@@ -318,6 +737,83 @@ def register_home_routes(app):
                     500,
                 )
 
+    @app.route("/api/my-books/bulk", methods=["POST"])
+    @login_required
+    def add_my_books_bulk():
+        logger.debug(
+            f"POST /api/my-books/bulk route accessed | Request ID: {g.request_id}"
+        )
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data.get("book_ids"), list):
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": "book_ids must be a list of book IDs.",
+                            "code": "missing_book_ids",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
+            )
+
+        try:
+            book_ids = [UUID(str(book_id)) for book_id in data["book_ids"]]
+        except (ValueError, TypeError):
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": "Invalid book_id format.",
+                            "code": "invalid_book_id_format",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
+            )
+
+        try:
+            result = book_service.add_books_to_user_library(
+                user_id=g.user_id, book_ids=book_ids
+            )
+        except ValueError as ve:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": str(ve),
+                            "code": "invalid_book_ids",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
+            )
+
+        if result["success"]:
+            return (
+                jsonify({"data": result["data"], "request_id": g.request_id}),
+                result["status_code"],
+            )
+        return (
+            jsonify(
+                {
+                    "error": {
+                        "type": "ServiceError",
+                        "message": result["message"],
+                        "code": "add_books_error",
+                        "request_id": g.request_id,
+                    }
+                }
+            ),
+            result["status_code"],
+        )
+
     @app.route("/api/my-books/<uuid:book_id>", methods=["PATCH"])
     @login_required
     def update_my_book(book_id: UUID):
@@ -342,9 +838,24 @@ def register_home_routes(app):
         status = data.get("status")
         progress = data.get("progress")
 
-        result = book_service.update_user_book_progress(
-            user_id=user_id, book_id=book_id, status=status, progress=progress
-        )
+        try:
+            result = book_service.update_user_book_progress(
+                user_id=user_id, book_id=book_id, status=status, progress=progress
+            )
+        except ValueError as ve:
+            return (
+                jsonify(
+                    {
+                        "error": {
+                            "type": "ValidationError",
+                            "message": str(ve),
+                            "code": "validation_error",
+                            "request_id": g.request_id,
+                        }
+                    }
+                ),
+                400,
+            )
 
         if result["success"]:
             return (
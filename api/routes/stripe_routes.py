@@ -2,6 +2,7 @@ from flask import request, jsonify, g
 from api.utils.logger_config import logger
 from api.utils.authentication import login_required
 from api.services import stripe_service
+from api.utils.http_cache import content_etag, json_with_etag, not_modified
 
 
 def register_stripe_routes(app):
@@ -188,15 +189,9 @@ def register_stripe_routes(app):
             result = stripe_service.get_user_subscription_status(user_id=user_id)
 
             if result["success"]:
-                return (
-                    jsonify(
-                        {
-                            "subscription_status": result["subscription_status"],
-                            "request_id": g.request_id,
-                        }
-                    ),
-                    200,
-                )
+                payload = {"subscription_status": result["subscription_status"]}
+                etag = content_etag(payload)
+                return not_modified(etag) or json_with_etag(payload, etag)
             else:
                 return jsonify(result["error"]), 500
 
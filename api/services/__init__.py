@@ -2,4 +2,7 @@
 
 from . import book_service
 from . import categories_service
+from . import dashboard_service
+from . import read_url_service
+from . import book_content_service
 from . import stripe_service
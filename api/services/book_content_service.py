@@ -0,0 +1,110 @@
+# api/services/book_content_service.py
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, Optional
+from uuid import UUID
+
+import requests
+from flask import g
+
+from api.services import read_url_service
+from api.services.epub_disk_cache import EpubDiskCache
+from api.utils.logger_config import logger
+
+# Opt-in: serve EPUBs from a local disk cache at /api/books/<id>/content.
+# Leave unset on hosts without a persistent local disk (e.g. serverless).
+EPUB_CACHE_DIR = os.getenv("EPUB_CACHE_DIR", "")
+EPUB_CACHE_MAX_BYTES = int(os.getenv("EPUB_CACHE_MAX_BYTES", str(2 * 1024**3)))
+EPUB_DOWNLOAD_TIMEOUT = float(os.getenv("EPUB_DOWNLOAD_TIMEOUT", "30"))
+
+_disk_cache: Optional[EpubDiskCache] = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[EpubDiskCache]:
+    """Returns the process-wide EPUB disk cache, or None if EPUB_CACHE_DIR is unset."""
+    global _disk_cache
+    if not EPUB_CACHE_DIR:
+        return None
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                _disk_cache = EpubDiskCache(EPUB_CACHE_DIR, EPUB_CACHE_MAX_BYTES)
+    return _disk_cache
+
+
+def _error(
+    status_code: int, error_type: str, message: str, code: str
+) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "status_code": status_code,
+        "message": message,
+        "error": {
+            "type": error_type,
+            "message": message,
+            "code": code,
+            "request_id": getattr(g, "request_id", None),
+        },
+    }
+
+
+def _download_to(signed_url: str, out: IO[bytes]) -> bool:
+    try:
+        with requests.get(
+            signed_url, stream=True, timeout=EPUB_DOWNLOAD_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                out.write(chunk)
+        return True
+    except requests.RequestException as e:
+        logger.error(f"Error downloading EPUB from storage: {e}")
+        return False
+
+
+@contextmanager
+def local_book_content(book_id: UUID) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the local EPUB file of a book as {"path": ...} in the standard
+    service format, downloading it from storage (through the cached signed
+    URL) on the first request. The file stays on disk until the block exits.
+
+    Errors: 404 `content_proxy_disabled` when EPUB_CACHE_DIR is unset, the
+    get_read_url errors (404 `book_content_not_found`, 500 `signed_url_error`),
+    and 502 `content_download_error` if storage could not be read.
+    """
+    cache = get_disk_cache()
+    if cache is None:
+        yield _error(
+            404,
+            "NotFoundError",
+            "Book content streaming is not enabled.",
+            "content_proxy_disabled",
+        )
+        return
+
+    failure: Dict[str, Any] = {}
+
+    def download(out: IO[bytes]) -> bool:
+        # Only called on a miss, so cached books never touch storage.
+        result = read_url_service.get_read_url(book_id)
+        if not result["success"]:
+            failure.update(result)
+            return False
+        return _download_to(result["data"]["signed_url"], out)
+
+    with cache.pinned(str(book_id), download) as path:
+        if path is not None:
+            yield {"success": True, "status_code": 200, "data": {"path": path}}
+        elif failure:
+            yield failure
+        else:
+            yield _error(
+                502,
+                "StorageError",
+                "Could not download book content.",
+                "content_download_error",
+            )
@@ -1,11 +1,127 @@
+from api.db.cache import CachedJSON, get_shared_cache
 from api.db.supabase_client import get_supabase_client
+from api.db.postgres_client import get_postgres_session, is_postgres_backend
+from api.db.request_scope import get_request_scoped, spawn_with_request_context
+from api.utils.http_cache import note_stale
 from api.utils.logger_config import logger
-from typing import Optional, List, Dict, Any
+from api.utils.pagination import decode_cursor, encode_cursor
+from api.services.preference_updates import notify_library_change
+from api.services.progress_buffer import PROGRESS_WRITE_BEHIND, progress_buffer
+from api.services.recommendation_cache import CandidateCache
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence, Tuple
+import heapq
+import os
+from api.db.repositories.books_repository import BooksRepository
+from api.db.repositories.postgres_books_repository import PostgresBooksRepository
 from api.db.repositories.user_reading_progress_repository import (
     UserReadingProgressRepository,
 )
+from api.db.repositories.postgres_user_reading_progress_repository import (
+    PostgresUserReadingProgressRepository,
+)
 from uuid import UUID
-from flask import g
+from flask import g, has_app_context
+
+READING_STATUSES = ("reading", "to_read", "finished", "abandoned")
+DEFAULT_SHELF_LIMIT = 20
+MAX_SHELF_LIMIT = 100
+MAX_BULK_ADD = 50
+EXPORT_BATCH_SIZE = 500
+MAX_SEARCH_QUERY_LENGTH = 200
+RECOMMENDATION_TOP_CATEGORIES = int(os.getenv("RECOMMENDATION_TOP_CATEGORIES", "10"))
+# The `category_book_candidates` view keeps this many books per category
+# (`WHERE rank <= 200` in Database.md); change both together.
+CATEGORY_CANDIDATES_VIEW_LIMIT = 200
+RECOMMENDATION_CANDIDATES_PER_CATEGORY = int(
+    os.getenv(
+        "RECOMMENDATION_CANDIDATES_PER_CATEGORY", str(CATEGORY_CANDIDATES_VIEW_LIMIT)
+    )
+)
+if not 0 < RECOMMENDATION_CANDIDATES_PER_CATEGORY <= CATEGORY_CANDIDATES_VIEW_LIMIT:
+    raise ValueError(
+        "RECOMMENDATION_CANDIDATES_PER_CATEGORY must be between 1 and "
+        f"{CATEGORY_CANDIDATES_VIEW_LIMIT}, the size of category_book_candidates."
+    )
+
+
+def _books_repository():
+    """Returns the books repository for the configured REPOSITORY_BACKEND."""
+    if is_postgres_backend():
+        return get_request_scoped(
+            "books_repository",
+            lambda: PostgresBooksRepository(get_postgres_session()),
+        )
+    return get_request_scoped(
+        "books_repository", lambda: BooksRepository(get_supabase_client())
+    )
+
+
+def _progress_repository():
+    """Returns the reading progress repository for the configured REPOSITORY_BACKEND."""
+    if is_postgres_backend():
+        return get_request_scoped(
+            "progress_repository",
+            lambda: PostgresUserReadingProgressRepository(get_postgres_session()),
+        )
+    return get_request_scoped(
+        "progress_repository",
+        lambda: UserReadingProgressRepository(get_supabase_client()),
+    )
+
+
+def get_content_versions(
+    scopes: Sequence[str] = ("catalog", "library")
+) -> Optional[Dict[str, str]]:
+    """
+    Returns cheap version strings for the catalog and/or the current user's
+    library, {scope: str}, or None if they cannot be read. A version changes
+    whenever the data behind the matching endpoint changes.
+    """
+    try:
+        return _books_repository().fetch_content_versions(scopes)
+    except Exception as e:
+        logger.error(f"Error fetching content versions: {e}")
+        return None
+
+
+def _get_discover_page(
+    page: int, limit: int, versions: Optional[Dict[str, str]] = None
+) -> Optional[CachedJSON]:
+    if page < 1:
+        page = 1
+    if limit < 1:
+        limit = 10
+    if limit > 50:  # Set a max limit to prevent abuse
+        limit = 50
+
+    def fetch():
+        books_data = _books_repository().fetch_discover_books(page, limit)
+        if books_data is not None:
+            logger.info(f"Fetched {len(books_data)} books via RPC for page {page}.")
+        return books_data
+
+    user_id = g.get("user_id") if has_app_context() else None
+    if user_id is None:
+        books = fetch()
+        return CachedJSON.encode(books) if books is not None else None
+
+    # Past its TTL a page is served at once and refreshed in the
+    # background as the same user, or kept while the database errors.
+    # Keying on the content versions the caller built its ETag from means a
+    # catalog change is never answered with a page cached before it.
+    params: Tuple[Any, ...] = (page, limit)
+    if versions:
+        params += (versions.get("catalog"), versions.get("library"))
+    cached = get_shared_cache().get_or_load(
+        "discover",
+        params,
+        fetch,
+        scope=str(user_id),
+        background=spawn_with_request_context,
+    )
+    if cached is not None:
+        note_stale(cached.stale_for, cached.stale_reason)
+    return cached
 
 
 def get_discover_books(page: int, limit: int) -> Optional[List[Dict[str, Any]]]:
@@ -18,38 +134,343 @@ def get_discover_books(page: int, limit: int) -> Optional[List[Dict[str, Any]]]:
         limit (int): The number of books per page.
 
     Returns:
-        A list of books or None if an error occurs.
+        A list of books or None if an error occurs. Pages are cached per
+        user (is_in_library differs between users) and must not be mutated.
+    """
+    try:
+        cached = _get_discover_page(page, limit)
+        return cached.data if cached is not None else None
+    except Exception as e:
+        logger.error(f"Error in book service while calling RPC for discover books: {e}")
+        return None
+
+
+def get_discover_books_json(
+    page: int, limit: int, versions: Optional[Dict[str, str]] = None
+) -> Optional[bytes]:
+    """
+    Same as get_discover_books, but returns the page as encoded JSON bytes,
+    straight from the shared cache on a hit, so it is sent without re-encoding.
+    Pass the get_content_versions() result an ETag was built from, so the
+    page cannot predate the versions.
+    """
+    try:
+        cached = _get_discover_page(page, limit, versions)
+        return cached.raw if cached is not None else None
+    except Exception as e:
+        logger.error(f"Error in book service while calling RPC for discover books: {e}")
+        return None
+
+
+def search_books(query: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
+    """
+    Full-text searches the catalog, best match first, including whether each
+    book is in the current user's library.
+
+    Returns:
+        A dict with `books`, `page`, `total` and `has_more`, or None if an error occurs.
+        `total` is None for an empty page past the first, where it is unknown.
+
+    Raises:
+        ValueError: If the query is empty or too long.
+    """
+    query = (query or "").strip()
+    if not query:
+        raise ValueError("Search query is required.")
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        raise ValueError(
+            f"Search query must be at most {MAX_SEARCH_QUERY_LENGTH} characters."
+        )
+    page = max(page, 1)
+    limit = min(max(limit, 1), 50)
+
+    try:
+        books_data = _books_repository().search_books(query, page, limit)
+        if books_data is None:
+            return None
+
+        # Every row carries the total number of matches. A page past the end
+        # has no rows to read it from, so the total is unknown there.
+        if books_data:
+            total: Optional[int] = books_data[0]["total_count"]
+        else:
+            total = 0 if page == 1 else None
+        for book in books_data:
+            book.pop("total_count", None)
+
+        logger.info(
+            f"Search returned {len(books_data)} of {total} books for page {page}."
+        )
+        return {
+            "books": books_data,
+            "page": page,
+            "total": total,
+            "has_more": total is not None and page * limit < total,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in book service while searching books: {e}")
+        return None
+
+
+def _load_category_candidates(
+    category_ids: List[str],
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Loads the candidate lists of several categories for CandidateCache, from
+    the shared cache or, for the misses, in one query.
+    """
+
+    def fetch(missing: List[str]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        rows = _books_repository().fetch_category_candidates(
+            missing, RECOMMENDATION_CANDIDATES_PER_CATEGORY
+        )
+        if rows is None:
+            return None
+        candidates: Dict[str, List[Dict[str, Any]]] = {
+            category_id: [] for category_id in missing
+        }
+        for row in rows:
+            category_id = str(row.pop("category_id"))
+            candidates.setdefault(category_id, []).append(row)
+        return candidates
+
+    cached = get_shared_cache().get_or_load_many("candidates", category_ids, fetch)
+    if cached is None:
+        return None
+    return {category_id: entry.data for category_id, entry in cached.items()}
+
+
+candidate_cache = CandidateCache(
+    _load_category_candidates,
+    version=lambda: get_shared_cache().version("candidates"),
+)
+
+
+def rank_recommendations(
+    categories: List[Dict[str, Any]],
+    candidates_by_category: Dict[str, List[Dict[str, Any]]],
+    library_book_ids: Iterable[str],
+    count: int,
+) -> List[Dict[str, Any]]:
+    """
+    Ranks candidate books for one user and returns the best `count`.
+
+    A book's score is the sum over the user's top categories of
+    preference score x candidate score, so a book that is a strong candidate
+    in several liked categories ranks highest. Books in `library_book_ids`
+    are skipped. Each result carries `score` and `because_category_id`, the
+    category that contributed most.
+    """
+    excluded = {str(book_id) for book_id in library_book_ids}
+    scores: Dict[str, float] = {}
+    best: Dict[str, tuple] = {}
+    for category in categories:
+        category_id = str(category["category_id"])
+        preference = category["score"]
+        for candidate in candidates_by_category.get(category_id, ()):
+            book_id = str(candidate["id"])
+            if book_id in excluded:
+                continue
+            contribution = preference * candidate["candidate_score"]
+            scores[book_id] = scores.get(book_id, 0.0) + contribution
+            if book_id not in best or contribution > best[book_id][0]:
+                best[book_id] = (contribution, category_id, candidate)
+
+    top = heapq.nlargest(count, scores.items(), key=lambda item: (item[1], item[0]))
+    ranked = []
+    for book_id, score in top:
+        _, category_id, candidate = best[book_id]
+        book = {k: v for k, v in candidate.items() if k != "candidate_score"}
+        ranked.append(
+            {
+                **book,
+                "is_in_library": False,
+                "score": round(score, 4),
+                "because_category_id": category_id,
+            }
+        )
+    return ranked
+
+
+def get_recommendations(page: int, limit: int) -> Optional[Dict[str, Any]]:
+    """
+    Returns a ranked page of books for the current user, built from their top
+    `user_category_preferences` and the cached per-category candidate lists.
+    Books already in the library are never recommended.
+
+    Returns:
+        A dict with `books`, `page` and `has_more`, or None if an error occurs.
+        Users without preferences get an empty page.
+    """
+    page = max(page, 1)
+    limit = min(max(limit, 1), 50)
+
+    try:
+        inputs = _books_repository().fetch_recommendation_inputs(
+            RECOMMENDATION_TOP_CATEGORIES
+        )
+        if inputs is None:
+            return None
+
+        categories = inputs.get("categories") or []
+        candidates = candidate_cache.get_many(
+            category["category_id"] for category in categories
+        )
+        offset = (page - 1) * limit
+        # One extra book tells whether another page exists.
+        ranked = rank_recommendations(
+            categories,
+            candidates,
+            inputs.get("library_book_ids") or [],
+            offset + limit + 1,
+        )
+
+        books = ranked[offset : offset + limit]
+        logger.info(
+            f"Recommended {len(books)} books from {len(categories)} categories for page {page}."
+        )
+        return {
+            "books": books,
+            "page": page,
+            "has_more": len(ranked) > offset + limit,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in book service while fetching recommendations: {e}")
+        return None
+
+
+def get_discover_books_page(
+    cursor: Optional[str], limit: int, category_id: Optional[UUID] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetches a page of the discover feed using keyset pagination.
+
+    Args:
+        cursor: Opaque cursor from a previous page's `next_cursor`, or None/"" for the first page.
+        limit (int): The number of books per page.
+        category_id: Only return books in this category or any of its subcategories.
+
+    Returns:
+        A dict with `books` and `next_cursor` (None on the last page), or None if an error occurs.
+
+    Raises:
+        ValueError: If the cursor is malformed.
     """
-    if page < 1:
-        page = 1
     if limit < 1:
         limit = 10
     if limit > 50:  # Set a max limit to prevent abuse
         limit = 50
 
+    cursor_created_at, cursor_id = decode_cursor(cursor) if cursor else (None, None)
+
     try:
-        supabase_client = get_supabase_client()
-        params = {"page_num": page, "page_size": limit}
-        result = supabase_client.rpc("get_discover_books_for_user", params).execute()
+        # Ask for one extra row to learn whether another page exists.
+        books_repo = _books_repository()
+        if category_id is not None:
+            books_data = books_repo.fetch_category_books_after(
+                category_id, cursor_created_at, cursor_id, limit + 1
+            )
+        else:
+            books_data = books_repo.fetch_discover_books_after(
+                cursor_created_at, cursor_id, limit + 1
+            )
+        if books_data is None:
+            return None
 
-        books_data = result.data
+        books = books_data[:limit]
+        next_cursor = None
+        if len(books_data) > limit:
+            last = books[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        for book in books:
+            book.pop("created_at", None)
 
-        logger.info(f"Fetched {len(books_data)} books via RPC for page {page}.")
-        return books_data
+        logger.info(f"Fetched {len(books)} books via keyset RPC.")
+        return {"books": books, "next_cursor": next_cursor}
 
     except Exception as e:
-        logger.error(f"Error in book service while calling RPC for discover books: {e}")
+        logger.error(f"Error in book service while fetching keyset discover books: {e}")
         return None
 
 
+def iter_catalog_export(
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every book in the catalog, newest first, fetching `batch_size` rows
+    at a time with keyset pagination so memory use does not grow with the
+    catalog. Each book includes `is_in_library` and `created_at`.
+
+    Raises:
+        RuntimeError: If a batch cannot be fetched.
+    """
+    books_repo = _books_repository()
+    cursor_created_at, cursor_id = None, None
+    exported = 0
+    while True:
+        batch = books_repo.fetch_discover_books_after(
+            cursor_created_at, cursor_id, batch_size
+        )
+        if batch is None:
+            raise RuntimeError(f"Catalog export failed after {exported} books.")
+        yield from batch
+        exported += len(batch)
+        if len(batch) < batch_size:
+            break
+        cursor_created_at, cursor_id = batch[-1]["created_at"], batch[-1]["id"]
+    logger.info(f"Exported {exported} catalog books.")
+
+
+def iter_library_export(
+    user_id: UUID, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields every book in the user's library, shelf by shelf, fetching
+    `batch_size` rows at a time with the shelf keyset cursor.
+
+    Raises:
+        RuntimeError: If a batch cannot be fetched.
+    """
+    progress_repo = _progress_repository()
+    exported = 0
+    for status in READING_STATUSES:
+        cursor_updated_at, cursor_book_id = None, None
+        while True:
+            shelves = progress_repo.fetch_library_shelves(
+                batch_size, status, cursor_updated_at, cursor_book_id
+            )
+            if shelves is None:
+                raise RuntimeError(f"Library export failed after {exported} books.")
+            # The RPC returns one extra row when more books follow.
+            books = (shelves.get(status) or {}).get("books", [])
+            batch = books[:batch_size]
+            yield from batch
+            exported += len(batch)
+            if len(books) <= batch_size:
+                break
+            cursor_updated_at = batch[-1]["last_progress_update_at"]
+            cursor_book_id = batch[-1]["book_id"]
+    logger.info(f"Exported {exported} library books for user '{str(user_id)[:8]}'.")
+
+
+def _library_changed(user_id: UUID, book_ids: List[UUID]) -> None:
+    """Refreshes what depends on which books are in a user's library."""
+    if not book_ids:
+        return
+    # Cached discover pages carry is_in_library for this user.
+    get_shared_cache().invalidate("discover", scope=str(user_id))
+    notify_library_change(user_id, book_ids)
+
+
 def add_book_to_user_library(user_id: UUID, book_id: UUID) -> Dict[str, Any]:
     """
     Service layer logic to add a book to a user's library.
     Returns a dict with standardized error format on failure.
     """
     try:
-        supabase_client = get_supabase_client()
-        progress_repo = UserReadingProgressRepository(supabase_client)
+        progress_repo = _progress_repository()
         result = progress_repo.add_book_for_user(user_id, book_id)
         if result is None:
             return {
@@ -75,6 +496,7 @@ def add_book_to_user_library(user_id: UUID, book_id: UUID) -> Dict[str, Any]:
                     "request_id": getattr(g, "request_id", None),
                 },
             }
+        _library_changed(user_id, [book_id])
         return {"success": True, "status_code": 201, "data": result}
     except Exception as e:
         logger.error(
@@ -93,14 +515,89 @@ def add_book_to_user_library(user_id: UUID, book_id: UUID) -> Dict[str, Any]:
         }
 
 
+def add_books_to_user_library(user_id: UUID, book_ids: List[UUID]) -> Dict[str, Any]:
+    """
+    Adds several books to a user's library in one database round-trip.
+    Duplicate IDs are collapsed, keeping the first occurrence.
+
+    Returns a dict with per-book outcomes ('created', 'already_exists',
+    'not_found') and their counts, or the standardized error format on failure.
+    Raises ValueError if more than MAX_BULK_ADD distinct books are given.
+    """
+    book_ids = list(dict.fromkeys(book_ids))
+    if not book_ids:
+        raise ValueError("book_ids must contain at least one book.")
+    if len(book_ids) > MAX_BULK_ADD:
+        raise ValueError(f"At most {MAX_BULK_ADD} books can be added at once.")
+
+    try:
+        progress_repo = _progress_repository()
+        outcomes = progress_repo.add_books_for_user(user_id, book_ids)
+        if outcomes is None:
+            return {
+                "success": False,
+                "status_code": 500,
+                "message": "An internal error occurred.",
+                "error": {
+                    "type": "ServiceError",
+                    "message": "An internal error occurred.",
+                    "code": "add_books_error",
+                    "request_id": getattr(g, "request_id", None),
+                },
+            }
+
+        counts = {"created": 0, "already_exists": 0, "not_found": 0}
+        for outcome in outcomes:
+            counts[outcome["outcome"]] += 1
+        _library_changed(
+            user_id, [o["book_id"] for o in outcomes if o["outcome"] == "created"]
+        )
+        return {
+            "success": True,
+            "status_code": 201 if counts["created"] else 200,
+            "data": {"results": outcomes, "counts": counts},
+        }
+    except Exception as e:
+        logger.error(
+            f"Unexpected error in add_books_to_user_library service: {e} | Request ID: {getattr(g, 'request_id', None)}"
+        )
+        return {
+            "success": False,
+            "status_code": 500,
+            "message": "An unexpected server error occurred.",
+            "error": {
+                "type": "InternalServerError",
+                "message": "An unexpected server error occurred.",
+                "code": "internal_error",
+                "request_id": getattr(g, "request_id", None),
+            },
+        }
+
+
+def group_library_by_status(
+    all_books: List[Dict[str, Any]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Groups flattened library rows into shelves keyed by reading status."""
+    library: Dict[str, List[Dict[str, Any]]] = {
+        "reading": [],
+        "to_read": [],
+        "finished": [],
+        "abandoned": [],
+    }
+    for book in all_books:
+        status = book.get("status")
+        if status:
+            library.get(status, []).append(book)
+    return library
+
+
 def get_user_library(user_id: UUID) -> Optional[Dict[str, List[Dict[str, Any]]]]:
     """
     Retrieves and organizes all books in a user's library by their reading status.
     Returns None or a dict with standardized error format on failure.
     """
     try:
-        supabase_client = get_supabase_client()
-        progress_repo = UserReadingProgressRepository(supabase_client)
+        progress_repo = _progress_repository()
         all_books = progress_repo.fetch_books_for_user(user_id)
         if all_books is None:
             return {
@@ -111,17 +608,7 @@ def get_user_library(user_id: UUID) -> Optional[Dict[str, List[Dict[str, Any]]]]
                     "request_id": getattr(g, "request_id", None),
                 }
             }
-        library: Dict[str, List[Dict[str, Any]]] = {
-            "reading": [],
-            "to_read": [],
-            "finished": [],
-            "abandoned": [],
-        }
-        for book in all_books:
-            status = book.get("status")
-            if status:
-                library.get(status, []).append(book)
-        return library
+        return group_library_by_status(all_books)
     except Exception as e:
         logger.error(
             f"Unexpected error in get_user_library service: {e} | Request ID: {getattr(g, 'request_id', None)}"
@@ -136,6 +623,86 @@ def get_user_library(user_id: UUID) -> Optional[Dict[str, List[Dict[str, Any]]]]
         }
 
 
+def get_user_library_shelves(
+    user_id: UUID,
+    shelf_limit: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Retrieves the first `shelf_limit` books of each reading-status shelf, with
+    per-shelf counts and a cursor for fetching more of a shelf.
+    Passing `status` (and `cursor`) returns only that shelf.
+    Without `shelf_limit` the shelves are complete, unless a cursor is given,
+    in which case DEFAULT_SHELF_LIMIT books are returned.
+    Returns a dict with standardized error format on failure.
+
+    Raises:
+        ValueError: If the status or cursor is invalid.
+    """
+    if status is not None and status not in READING_STATUSES:
+        raise ValueError("Invalid status.")
+    if cursor and status is None:
+        raise ValueError("A cursor requires a status.")
+    if shelf_limit is None and cursor:
+        shelf_limit = DEFAULT_SHELF_LIMIT
+    if shelf_limit is not None:
+        shelf_limit = min(max(shelf_limit, 1), MAX_SHELF_LIMIT)
+    cursor_updated_at, cursor_book_id = (
+        decode_cursor(cursor) if cursor else (None, None)
+    )
+
+    try:
+        progress_repo = _progress_repository()
+        shelves = progress_repo.fetch_library_shelves(
+            shelf_limit, status, cursor_updated_at, cursor_book_id
+        )
+        if shelves is None:
+            return {
+                "error": {
+                    "type": "ServiceError",
+                    "message": "Failed to retrieve user library.",
+                    "code": "get_library_error",
+                    "request_id": getattr(g, "request_id", None),
+                }
+            }
+
+        library: Dict[str, List[Dict[str, Any]]] = {}
+        counts: Dict[str, int] = {}
+        next_cursors: Dict[str, Optional[str]] = {}
+        for shelf_status in READING_STATUSES:
+            if status is not None and shelf_status != status:
+                continue
+            shelf = shelves.get(shelf_status) or {"count": 0, "books": []}
+            books = shelf["books"][:shelf_limit]
+            library[shelf_status] = books
+            counts[shelf_status] = shelf["count"]
+            next_cursors[shelf_status] = (
+                encode_cursor(
+                    books[-1]["last_progress_update_at"], books[-1]["book_id"]
+                )
+                if shelf_limit is not None and len(shelf["books"]) > shelf_limit
+                else None
+            )
+
+        logger.info(
+            f"Fetched library shelves for user '{str(user_id)[:8]}' (limit {shelf_limit or 'none'})."
+        )
+        return {"library": library, "counts": counts, "next_cursors": next_cursors}
+    except Exception as e:
+        logger.error(
+            f"Unexpected error in get_user_library_shelves service: {e} | Request ID: {getattr(g, 'request_id', None)}"
+        )
+        return {
+            "error": {
+                "type": "InternalServerError",
+                "message": "An unexpected server error occurred.",
+                "code": "internal_error",
+                "request_id": getattr(g, "request_id", None),
+            }
+        }
+
+
 def update_user_book_progress(
     user_id: UUID,
     book_id: UUID,
@@ -145,19 +712,57 @@ def update_user_book_progress(
     """
     Updates a user's reading progress for a specific book.
     Returns a dict with standardized error format on failure.
+
+    Raises:
+        ValueError: If the status is unknown or progress is not a number from 0 to 100.
     """
+    if status is not None and status not in READING_STATUSES:
+        raise ValueError("Invalid status.")
+    if progress is not None and (
+        isinstance(progress, bool)
+        or not isinstance(progress, (int, float))
+        or not 0 <= progress <= 100
+    ):
+        raise ValueError("Progress must be a number from 0 to 100.")
+
+    # Buffered updates taken to be written through; put back if that write fails.
+    taken: Dict[str, Any] = {}
     try:
-        supabase_client = get_supabase_client()
-        progress_repo = UserReadingProgressRepository(supabase_client)
         updates = {}
         if status is not None:
             updates["status"] = status
         if progress is not None:
             updates["progress_percentage"] = progress
+
+        if PROGRESS_WRITE_BEHIND:
+            if status is not None:
+                # Status changes move books between shelves; write them through
+                # (with anything still buffered for the book) so the library the
+                # client refetches next is up to date and errors are reported.
+                taken = progress_buffer.take(user_id, book_id)
+                updates = {**taken, **updates}
+            elif (
+                # Only books in the library are buffered; a book already pending
+                # was checked when it was queued. Otherwise (or if the check
+                # fails) the write below reports the 404 or error.
+                progress_buffer.is_pending(user_id, book_id)
+                or _progress_repository().has_book(user_id, book_id)
+            ) and progress_buffer.add(user_id, book_id, updates):
+                # The preference rescore is queued by the flush that writes it.
+                return {
+                    "success": True,
+                    "status_code": 202,
+                    "data": {"book_id": str(book_id), **updates, "queued": True},
+                }
+
+        progress_repo = _progress_repository()
         result = progress_repo.update_book_progress(user_id, book_id, updates)
         if result:
+            notify_library_change(user_id, [book_id])
             return {"success": True, "status_code": 200, "data": result}
         else:
+            if taken:
+                progress_buffer.restore(user_id, book_id, taken)
             return {
                 "success": False,
                 "status_code": 404,
@@ -170,6 +775,8 @@ def update_user_book_progress(
                 },
             }
     except Exception as e:
+        if taken:
+            progress_buffer.restore(user_id, book_id, taken)
         logger.error(
             f"Unexpected error in update_user_book_progress service: {e} | Request ID: {getattr(g, 'request_id', None)}"
         )
@@ -1,37 +1,115 @@
 from dotenv import load_dotenv
 
 
+from api.db.cache import get_shared_cache
 from api.db.supabase_client import get_supabase_client
+from api.db.request_scope import get_request_scoped, spawn_with_request_context
 from api.db.repositories.categories_repository import Categories
+from api.services.category_cache import CategoryTreeCache
 
 
+from api.utils.http_cache import note_stale
 from api.utils.logger_config import logger
 
-
 load_dotenv()
 
 
-def get_categories():
+def _fetch_categories():
     """
     Fetches all categories from the database.
-    Returns a dictionary with categories or None if an error occurs.
+    Returns the list of categories (empty if there are none) or None if an error occurs.
     """
     try:
-        supabase_client = get_supabase_client()
-        categories_repo = Categories(supabase_client)
+        categories_repo = get_request_scoped(
+            "categories_repository", lambda: Categories(get_supabase_client())
+        )
         data = categories_repo.fetch_all()
-        if data:
-            logger.info(f"Fetched {len(data[1])} categories.")
-            logger.debug(f"Categories data: {data}")
-            return data[1]
-        else:
-            logger.warning("No categories found.")
+        if data is None:
             return None
+        logger.info(f"Fetched {len(data[1])} categories.")
+        return data[1]
     except Exception as e:
         logger.error(f"Error fetching categories: {str(e)}")
         return None
 
 
+def _load_categories():
+    """
+    Loads all categories through the shared cache, so a cold instance reads
+    them from Redis instead of the database when another instance already has.
+    Past the TTL the last good list is served while it is refreshed in the
+    background, and kept while the database errors.
+    """
+    return get_shared_cache().get_or_load(
+        "categories",
+        ("all",),
+        _fetch_categories,
+        background=spawn_with_request_context,
+    )
+
+
+category_cache = CategoryTreeCache(_load_categories)
+
+
+def _note_staleness():
+    stale = category_cache.stale()
+    if stale is not None:
+        note_stale(*stale)
+
+
+def get_categories():
+    """
+    Returns all categories ordered by name, from the process-level cache.
+    Returns None if they cannot be loaded.
+    """
+    categories = category_cache.get_all()
+    _note_staleness()
+    return categories
+
+
+def get_categories_json():
+    """
+    Returns all categories as encoded JSON bytes, exactly as cached, so the
+    route can send them without re-encoding. Returns None if they cannot be loaded.
+    """
+    raw = category_cache.get_all_raw()
+    _note_staleness()
+    return raw
+
+
+def get_categories_version():
+    """Returns a version string that changes whenever the category set changes."""
+    return category_cache.get_version()
+
+
+def get_category_tree():
+    """Returns the root categories, each with its nested `children`."""
+    tree = category_cache.get_tree()
+    _note_staleness()
+    return tree
+
+
+def get_category_subtree(category_id):
+    """Returns the category with its nested `children`, or None if unknown."""
+    subtree = category_cache.get_subtree(category_id)
+    _note_staleness()
+    return subtree
+
+
+def get_category_path(category_id):
+    """Returns the breadcrumb from the root category down to `category_id`, or None."""
+    path = category_cache.get_path(category_id)
+    _note_staleness()
+    return path
+
+
+def invalidate_categories_cache():
+    """Drops the cached categories on every instance so the next read reloads them."""
+    get_shared_cache().invalidate("categories")
+    category_cache.invalidate()
+    logger.info("Category cache invalidated.")
+
+
 # def process_job_background_task(job_description_id_str: str):
 #     """
 #     The actual background task: fetches job, calls LLM, saves questions.
@@ -0,0 +1,198 @@
+# api/services/category_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from api.db.cache import CachedJSON
+from api.utils.json_provider import dumps_bytes
+
+from api.utils.logger_config import logger
+
+# Categories change only when someone edits them in the database; a stale
+# entry is fixed by invalidate() or by waiting out the TTL.
+CATEGORY_CACHE_TTL = float(os.getenv("CATEGORY_CACHE_TTL", "300"))
+# How soon a snapshot loaded from stale data is re-checked.
+CATEGORY_STALE_RECHECK = float(os.getenv("CATEGORY_STALE_RECHECK", "5"))
+
+
+class _CategoryIndex:
+    """Immutable indexes built once per load of the category table."""
+
+    def __init__(self, categories: List[Dict[str, Any]], raw: Optional[bytes] = None):
+        self.flat = categories
+        # The flat list as encoded JSON, so it is sent without re-encoding.
+        self.raw = raw if raw is not None else dumps_bytes(categories)
+        self.version = hashlib.sha1(
+            json.dumps(categories, sort_keys=True, default=str).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        self.by_id: Dict[str, Dict[str, Any]] = {str(c["id"]): c for c in categories}
+        self.by_parent: Dict[Optional[str], List[str]] = {}
+        for category in categories:
+            parent_id = category.get("parent_id")
+            parent_key = str(parent_id) if parent_id is not None else None
+            self.by_parent.setdefault(parent_key, []).append(str(category["id"]))
+
+        # Nodes are shared between the tree and the subtree lookup, so each
+        # subtree is built exactly once. Children keep the flat list's order.
+        self.nodes: Dict[str, Dict[str, Any]] = {
+            category_id: {**category, "children": []}
+            for category_id, category in self.by_id.items()
+        }
+        self.tree: List[Dict[str, Any]] = []
+        for category_id, node in self.nodes.items():
+            parent_id = node.get("parent_id")
+            parent = self.nodes.get(str(parent_id)) if parent_id is not None else None
+            if parent is None:
+                # Orphans (parent missing from the table) are shown as roots.
+                self.tree.append(node)
+            else:
+                parent["children"].append(node)
+
+    def path(self, category_id: str) -> Optional[List[Dict[str, Any]]]:
+        if category_id not in self.by_id:
+            return None
+        path: List[Dict[str, Any]] = []
+        seen = set()
+        current: Optional[str] = category_id
+        while current is not None and current in self.by_id and current not in seen:
+            seen.add(current)
+            category = self.by_id[current]
+            path.append(category)
+            parent_id = category.get("parent_id")
+            current = str(parent_id) if parent_id is not None else None
+        path.reverse()
+        return path
+
+
+class CategoryTreeCache:
+    """
+    Process-level cache of the category table, pre-indexed by id, by parent_id
+    and into a nested tree, so the flat list, the tree, a subtree or a
+    breadcrumb path can be served without a database call.
+
+    `loader` returns the flat category list (ordered by name) or None on
+    error, or a CachedJSON holding it. If a reload fails while an expired
+    snapshot exists, the expired snapshot keeps being served until a reload
+    succeeds. Both that and a stale CachedJSON are reported by stale().
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Union[None, List[Dict[str, Any]], CachedJSON]],
+        ttl: float = CATEGORY_CACHE_TTL,
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self._index: Optional[_CategoryIndex] = None
+        self._raw: Optional[bytes] = None
+        self._loaded_at = 0.0
+        # (monotonic time the data went stale, reason) while serving stale data
+        self._stale: Optional[Tuple[float, str]] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_errors": 0}
+
+    def _get_index(self) -> Optional[_CategoryIndex]:
+        index = self._index
+        if index is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self._stats["hits"] += 1
+            return index
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock.
+            if (
+                self._index is not None
+                and time.monotonic() - self._loaded_at < self.ttl
+            ):
+                self._stats["hits"] += 1
+                return self._index
+
+            self._stats["misses"] += 1
+            loaded = self._loader()
+            stale_for, reason, raw = None, None, None
+            if isinstance(loaded, CachedJSON):
+                stale_for, reason, raw = (
+                    loaded.stale_for,
+                    loaded.stale_reason,
+                    loaded.raw,
+                )
+                loaded = loaded.data
+            now = time.monotonic()
+
+            if loaded is None:
+                self._stats["load_errors"] += 1
+                if self._index is not None:
+                    logger.warning("Category reload failed; serving expired cache.")
+                    if self._stale is None:
+                        self._stale = (self._loaded_at + self.ttl, "error")
+                return self._index
+
+            if raw is None or raw != self._raw or self._index is None:
+                self._index = _CategoryIndex(loaded, raw)
+                self._raw = raw
+                self._stats["loads"] += 1
+                logger.info(f"Category cache loaded {len(loaded)} categories.")
+            if stale_for is None:
+                self._loaded_at = now
+                self._stale = None
+            else:
+                # Re-check soon rather than holding stale data for a full TTL.
+                self._loaded_at = now - self.ttl + CATEGORY_STALE_RECHECK
+                self._stale = (now - stale_for, reason)
+            return self._index
+
+    def get_all(self) -> Optional[List[Dict[str, Any]]]:
+        index = self._get_index()
+        return index.flat if index else None
+
+    def get_all_raw(self) -> Optional[bytes]:
+        """Returns the flat list as encoded JSON bytes."""
+        index = self._get_index()
+        return index.raw if index else None
+
+    def get_tree(self) -> Optional[List[Dict[str, Any]]]:
+        index = self._get_index()
+        return index.tree if index else None
+
+    def get_version(self) -> Optional[str]:
+        """Returns a hash of the cached category set, for use as an ETag."""
+        index = self._get_index()
+        return index.version if index else None
+
+    def get_subtree(self, category_id: str) -> Optional[Dict[str, Any]]:
+        index = self._get_index()
+        return index.nodes.get(str(category_id)) if index else None
+
+    def get_path(self, category_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Returns the categories from the root down to `category_id`."""
+        index = self._get_index()
+        return index.path(str(category_id)) if index else None
+
+    def stale(self) -> Optional[Tuple[float, str]]:
+        """Returns (seconds past TTL, reason) while stale data is served, else None."""
+        stale = self._stale
+        if stale is None:
+            return None
+        return time.monotonic() - stale[0], stale[1]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+            self._raw = None
+            self._loaded_at = 0.0
+            self._stale = None
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            **self._stats,
+            "size": len(index.flat) if index else 0,
+            "age_seconds": (
+                round(time.monotonic() - self._loaded_at, 1) if index else None
+            ),
+            "ttl_seconds": self.ttl,
+        }
@@ -0,0 +1,138 @@
+# api/services/dashboard_service.py
+
+import asyncio
+import stripe
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from flask import g
+
+from api.db.async_supabase_client import (
+    close_async_client,
+    get_async_supabase_admin_client,
+    get_async_supabase_client,
+)
+from api.db.repositories.user_reading_progress_repository import (
+    LIBRARY_SELECT,
+    flatten_library_rows,
+)
+from api.services.book_service import group_library_by_status
+from api.services.stripe_service import (
+    reconcile_subscription_status,
+    subscription_needs_verification,
+)
+from api.utils.logger_config import logger
+
+
+async def get_discover_books_async(
+    supabase_client, page: int, limit: int
+) -> List[Dict[str, Any]]:
+    """Async counterpart of book_service.get_discover_books."""
+    page = max(page, 1)
+    limit = min(max(limit, 1), 50)
+    params = {"page_num": page, "page_size": limit}
+    result = await supabase_client.rpc("get_discover_books_for_user", params).execute()
+    return result.data
+
+
+async def get_user_library_async(
+    supabase_client, user_id: UUID
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Async counterpart of book_service.get_user_library."""
+    result = await (
+        supabase_client.table("user_reading_progress")
+        .select(LIBRARY_SELECT)
+        .eq("user_id", str(user_id))
+        .order("last_progress_update_at", desc=True)
+        .execute()
+    )
+    return group_library_by_status(flatten_library_rows(result.data or []))
+
+
+async def get_categories_async(supabase_client) -> List[Dict[str, Any]]:
+    """Async counterpart of categories_service.get_categories."""
+    result = await (
+        supabase_client.table("categories")
+        .select("*")
+        .order("name", desc=False)
+        .execute()
+    )
+    return result.data
+
+
+async def get_user_subscription_status_async(user_id: UUID) -> str:
+    """
+    Async counterpart of stripe_service.get_user_subscription_status.
+    Returns the subscription status, verifying active subscriptions with Stripe.
+    """
+    supabase_admin = await get_async_supabase_admin_client()
+    try:
+        result = await (
+            supabase_admin.table("profiles")
+            .select("subscription_status, stripe_subscription_id")
+            .eq("id", str(user_id))
+            .maybe_single()
+            .execute()
+        )
+        profile = result.data if result else None
+        if not profile:
+            return "inactive"
+
+        status = profile.get("subscription_status") or "inactive"
+        subscription_id = profile.get("stripe_subscription_id")
+        if not subscription_needs_verification(status, subscription_id):
+            return status
+
+        try:
+            subscription = await stripe.Subscription.retrieve_async(subscription_id)
+        except stripe.error.StripeError:
+            subscription = None
+        status, deactivate = reconcile_subscription_status(subscription)
+        if deactivate:
+            # Update database if subscription is no longer active
+            await (
+                supabase_admin.table("profiles")
+                .update(
+                    {
+                        "subscription_status": "inactive",
+                        "subscription_updated_at": "now()",
+                    }
+                )
+                .eq("id", str(user_id))
+                .execute()
+            )
+        return status
+    finally:
+        await close_async_client(supabase_admin)
+
+
+async def get_dashboard(
+    user_id: UUID, page: int = 1, limit: int = 20
+) -> Dict[str, Optional[Any]]:
+    """
+    Fetches the subscription status, library, categories and first discover page
+    concurrently. A section that fails is returned as None and logged, so one
+    slow or failing upstream does not fail the whole response.
+    """
+    supabase_client = await get_async_supabase_client()
+    try:
+        sections = {
+            "subscription_status": get_user_subscription_status_async(user_id),
+            "library": get_user_library_async(supabase_client, user_id),
+            "categories": get_categories_async(supabase_client),
+            "books": get_discover_books_async(supabase_client, page, limit),
+        }
+        results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    finally:
+        # The client's connections belong to this request's event loop.
+        await close_async_client(supabase_client)
+
+    dashboard: Dict[str, Optional[Any]] = {}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            logger.error(
+                f"Error fetching dashboard section '{name}': {result} | Request ID: {getattr(g, 'request_id', None)}"
+            )
+            dashboard[name] = None
+        else:
+            dashboard[name] = result
+    return dashboard
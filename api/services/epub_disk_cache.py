@@ -0,0 +1,168 @@
+# api/services/epub_disk_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator, Optional
+
+from api.utils.logger_config import logger
+
+# Writes the file's bytes into the given binary file object; False on failure.
+EpubDownloader = Callable[[IO[bytes]], bool]
+
+
+class EpubDiskCache:
+    """
+    Local disk cache of EPUB files, bounded by total size with LRU eviction.
+
+    Files are downloaded once per process into `directory` (to a temporary
+    name, then renamed, so a half-written file is never served) and handed
+    out by path. A file is pinned while a caller uses it and pinned files
+    are never evicted; files evicted after they were opened stay readable
+    through the open descriptor. Concurrent misses of the same book wait
+    for a single download. After a restart, files already on disk are
+    reused, oldest download first in eviction order.
+
+    The LRU index and the size bound are per process. Several workers may
+    share `directory`, but each evicts by its own view, so disk use can reach
+    workers x `max_bytes`, and a file another worker evicted is re-downloaded
+    on the next hit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # key -> file size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._pins: Dict[str, int] = {}
+        self._downloads: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "downloads": 0,
+            "download_errors": 0,
+            "evictions": 0,
+            "vanished": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.epub")
+
+    @contextmanager
+    def pinned(self, key: str, download: EpubDownloader) -> Iterator[Optional[str]]:
+        """
+        Yields the local path of `key`, calling `download` on a miss, or None
+        if the download failed. The file is not evicted until the block exits.
+        """
+        if not self._pin(key, download):
+            yield None
+            return
+        try:
+            yield self.path(key)
+        finally:
+            with self._lock:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+                self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "files": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _pin(self, key: str, download: EpubDownloader) -> bool:
+        with self._lock:
+            if self._hit(key):
+                return True
+            flight = self._downloads.setdefault(key, threading.Lock())
+
+        with flight:
+            with self._lock:
+                # Another caller may have finished the download while we waited.
+                if self._hit(key):
+                    return True
+                self._stats["misses"] += 1
+
+            size = self._download(key, download)
+            with self._lock:
+                self._downloads.pop(key, None)
+                if size is None:
+                    self._stats["download_errors"] += 1
+                    return False
+                self._stats["downloads"] += 1
+                self._entries[key] = size
+                self._size += size
+                self._pins[key] = self._pins.get(key, 0) + 1
+                self._evict()
+                return True
+
+    def _hit(self, key: str) -> bool:
+        # Called with self._lock held.
+        if key not in self._entries:
+            return False
+        if not os.path.exists(self.path(key)):
+            # Evicted by another process sharing the directory.
+            self._size -= self._entries.pop(key)
+            self._stats["vanished"] += 1
+            return False
+        self._entries.move_to_end(key)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        self._stats["hits"] += 1
+        return True
+
+    def _download(self, key: str, download: EpubDownloader) -> Optional[int]:
+        target = self.path(key)
+        partial = f"{target}.{threading.get_ident()}.part"
+        try:
+            with open(partial, "wb") as out:
+                if not download(out):
+                    raise RuntimeError("download failed")
+            os.replace(partial, target)
+            return os.path.getsize(target)
+        except Exception as e:
+            logger.error(f"Could not cache EPUB {key}: {e}")
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            return None
+
+    def _evict(self) -> None:
+        # Called with self._lock held.
+        for key in list(self._entries):
+            if self._size <= self.max_bytes:
+                return
+            if self._pins.get(key):
+                continue
+            self._size -= self._entries.pop(key)
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass  # Already evicted by another process.
+            except OSError as e:
+                logger.warning(f"Could not remove evicted EPUB {key}: {e}")
+
+    def _scan(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".part"):
+                # Left behind by a download interrupted by a restart.
+                os.remove(entry.path)
+            elif entry.name.endswith(".epub"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[: -len(".epub")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
@@ -0,0 +1,199 @@
+# api/services/preference_updates.py
+
+import atexit
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from api.db.postgres_client import PostgresSession
+from api.db.repositories.postgres_preferences_repository import (
+    PostgresPreferencesRepository,
+)
+from api.jobs.preference_engine import score_signal_rows
+from api.utils.logger_config import logger
+
+# Opt-in: rescore a reader's categories seconds after their library changes.
+# Requires DATABASE_URL (see REPOSITORY_BACKEND) with a role that may SET ROLE service_role.
+PREFERENCE_INCREMENTAL = os.getenv("PREFERENCE_INCREMENTAL", "0") == "1"
+PREFERENCE_DEBOUNCE_SECONDS = float(os.getenv("PREFERENCE_DEBOUNCE_SECONDS", "5"))
+PREFERENCE_MAX_DELAY_SECONDS = float(os.getenv("PREFERENCE_MAX_DELAY_SECONDS", "30"))
+PREFERENCE_MAX_RETRIES = int(os.getenv("PREFERENCE_MAX_RETRIES", "3"))
+
+
+class PreferenceUpdateQueue:
+    """
+    Debounces library changes per user and rescores them in batches.
+
+    A user is processed once they have been quiet for `debounce` seconds, or
+    `max_delay` seconds after their first pending change, whichever comes
+    first, so a reader sending progress ticks every few seconds is rescored
+    at most once per `max_delay` instead of once per tick. Failed batches are
+    re-queued and retried. After `max_retries` consecutive failed batches the
+    users are rescored one by one, and users that still fail are logged and
+    dropped (the nightly job rescores them anyway).
+    """
+
+    def __init__(
+        self,
+        apply_fn: Callable[[List[Tuple[str, str]]], None],
+        debounce: float = PREFERENCE_DEBOUNCE_SECONDS,
+        max_delay: float = PREFERENCE_MAX_DELAY_SECONDS,
+        max_retries: int = PREFERENCE_MAX_RETRIES,
+    ):
+        self._apply_fn = apply_fn
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self._failures = 0
+        # user_id -> (first_change_at, last_change_at, changed book_ids)
+        self._pending: Dict[str, Tuple[float, float, Set[str]]] = {}
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "enqueued": 0,
+            "debounced": 0,
+            "batches": 0,
+            "users_rescored": 0,
+            "failed_batches": 0,
+            "dropped_users": 0,
+        }
+
+    def enqueue(self, user_id: UUID, book_ids: List[UUID]) -> None:
+        """Marks the given books of a user as changed."""
+        now = time.monotonic()
+        key = str(user_id)
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if key in self._pending:
+                self._stats["debounced"] += 1
+                first, _, books = self._pending[key]
+            else:
+                first, books = now, set()
+            books.update(str(book_id) for book_id in book_ids)
+            self._pending[key] = (first, now, books)
+        self._ensure_worker()
+
+    def process_due(self, force: bool = False) -> int:
+        """Rescores every user whose changes are due (or all, if `force`). Returns the user count."""
+        with self._apply_lock:
+            now = time.monotonic()
+            with self._lock:
+                due = {
+                    user_id: entry
+                    for user_id, entry in self._pending.items()
+                    if force
+                    or now - entry[1] >= self.debounce
+                    or now - entry[0] >= self.max_delay
+                }
+                for user_id in due:
+                    del self._pending[user_id]
+            if not due:
+                return 0
+
+            changes = [
+                (user_id, book_id)
+                for user_id, (_, _, books) in due.items()
+                for book_id in books
+            ]
+            try:
+                self._apply_fn(changes)
+            except Exception as e:
+                self._failures += 1
+                with self._lock:
+                    self._stats["failed_batches"] += 1
+                logger.error(f"Failed to rescore preferences for {len(due)} users: {e}")
+                if self._failures > self.max_retries:
+                    return self._process_users_individually(due)
+                with self._lock:
+                    for user_id, (first, last, books) in due.items():
+                        if user_id in self._pending:
+                            _, last, newer = self._pending[user_id]
+                            books = books | newer
+                        self._pending[user_id] = (first, last, books)
+                return 0
+
+            self._failures = 0
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["users_rescored"] += len(due)
+            logger.info(f"Rescored preferences for {len(due)} users.")
+            return len(due)
+
+    def _process_users_individually(
+        self, due: Dict[str, Tuple[float, float, Set[str]]]
+    ) -> int:
+        # Called with self._apply_lock held, after repeated batch failures.
+        rescored = 0
+        for user_id, (_, _, books) in due.items():
+            try:
+                self._apply_fn([(user_id, book_id) for book_id in books])
+                rescored += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats["dropped_users"] += 1
+                logger.error(
+                    f"Dropping preference rescore of {len(books)} books for user '{user_id[:8]}': {e}"
+                )
+
+        self._failures = 0
+        with self._lock:
+            self._stats["users_rescored"] += rescored
+        logger.warning(f"Rescored {rescored} of {len(due)} users one by one.")
+        return rescored
+
+    def shutdown(self) -> None:
+        """Stops the background worker and processes everything still pending."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.debounce + 5)
+        self.process_due(force=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending_users": len(self._pending)}
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="preference-updates", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        # Checking twice per debounce window keeps the added latency small.
+        while not self._stopped.wait(self.debounce / 2):
+            self.process_due()
+
+
+def _rescore_changes(changes: List[Tuple[str, str]]) -> None:
+    # Runs outside any request; service_role reads and writes every user's rows.
+    repo = PostgresPreferencesRepository(PostgresSession({"role": "service_role"}))
+    rows = repo.fetch_signals_for_changes(changes)
+    if rows is None:
+        raise RuntimeError("fetch_signals_for_changes failed")
+    # Every touched (user, category) pair is replaced, so a category the
+    # user no longer has any signal for loses its implicit score.
+    touched = list({(row["user_id"], row["category_id"]) for row in rows})
+    upserts = score_signal_rows(rows)
+    if (
+        touched
+        and repo.upsert_implicit_preferences(upserts, replace_pairs=touched) is None
+    ):
+        raise RuntimeError("upsert_implicit_preferences failed")
+
+
+preference_updates = PreferenceUpdateQueue(_rescore_changes)
+atexit.register(preference_updates.shutdown)
+
+
+def notify_library_change(user_id: UUID, book_ids: List[UUID]) -> None:
+    """Queues an incremental preference update when PREFERENCE_INCREMENTAL is enabled."""
+    if PREFERENCE_INCREMENTAL and book_ids:
+        preference_updates.enqueue(user_id, book_ids)
@@ -0,0 +1,211 @@
+# api/services/progress_buffer.py
+
+import atexit
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from api.db.supabase_client import get_supabase_admin_client
+from api.db.repositories.user_reading_progress_repository import (
+    UserReadingProgressRepository,
+)
+from api.services.preference_updates import notify_library_change
+from api.utils.logger_config import logger
+
+# Opt-in: acknowledge PATCH /api/my-books/<id> immediately and write in batches.
+PROGRESS_WRITE_BEHIND = os.getenv("PROGRESS_WRITE_BEHIND", "0") == "1"
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "2"))
+PROGRESS_BUFFER_MAX_PENDING = int(os.getenv("PROGRESS_BUFFER_MAX_PENDING", "1000"))
+PROGRESS_FLUSH_MAX_RETRIES = int(os.getenv("PROGRESS_FLUSH_MAX_RETRIES", "3"))
+
+
+class ProgressWriteBuffer:
+    """
+    Coalesces reading-progress updates per (user_id, book_id) in memory and
+    writes them with `flush_fn` in one batch per interval.
+
+    Later updates for the same book overwrite earlier ones, so a reader that
+    sends twenty progress ticks between flushes costs a single row write.
+    Rows that fail to flush are kept and retried on the next flush. After
+    `max_retries` consecutive failed flushes the batch is written row by
+    row, so one bad row cannot hold back everyone else's updates; rows that
+    still fail on their own are logged and dropped. At most `max_pending`
+    books are buffered; add() refuses new ones beyond that.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Dict[str, Any]]], None],
+        interval: float = PROGRESS_FLUSH_INTERVAL,
+        max_pending: int = PROGRESS_BUFFER_MAX_PENDING,
+        max_retries: int = PROGRESS_FLUSH_MAX_RETRIES,
+    ):
+        self._flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self._failures = 0
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "failed_flushes": 0,
+            "rejected": 0,
+            "dropped_rows": 0,
+        }
+
+    def add(self, user_id: UUID, book_id: UUID, updates: Dict[str, Any]) -> bool:
+        """
+        Queues an update, merging it into any pending update for the same book.
+        Returns False, without queuing, if the buffer is full; the caller
+        should then write the update itself.
+        """
+        key = (str(user_id), str(book_id))
+        with self._lock:
+            if key in self._pending:
+                self._stats["coalesced"] += 1
+                self._pending[key].update(updates)
+            elif len(self._pending) >= self.max_pending:
+                self._stats["rejected"] += 1
+                self._wake.set()
+                return False
+            else:
+                self._pending[key] = dict(updates)
+            self._stats["enqueued"] += 1
+            pending_count = len(self._pending)
+
+        self._ensure_worker()
+        if pending_count >= self.max_pending:
+            self._wake.set()
+        return True
+
+    def is_pending(self, user_id: UUID, book_id: UUID) -> bool:
+        with self._lock:
+            return (str(user_id), str(book_id)) in self._pending
+
+    def take(self, user_id: UUID, book_id: UUID) -> Dict[str, Any]:
+        """Removes and returns the pending update of a book ({} if none), to write it through."""
+        with self._lock:
+            return self._pending.pop((str(user_id), str(book_id)), {})
+
+    def restore(self, user_id: UUID, book_id: UUID, updates: Dict[str, Any]) -> None:
+        """
+        Puts back updates removed with take() whose write failed. Updates that
+        arrived since then win; the max_pending bound does not apply.
+        """
+        key = (str(user_id), str(book_id))
+        with self._lock:
+            self._pending[key] = {**updates, **self._pending.get(key, {})}
+        self._ensure_worker()
+
+    def flush(self) -> int:
+        """Writes every pending update in one batch. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = [
+                {"user_id": user_id, "book_id": book_id, **updates}
+                for (user_id, book_id), updates in batch.items()
+            ]
+            try:
+                self._flush_fn(rows)
+            except Exception as e:
+                self._failures += 1
+                with self._lock:
+                    self._stats["failed_flushes"] += 1
+                logger.error(
+                    f"Failed to flush {len(rows)} buffered progress updates: {e}"
+                )
+                if self._failures > self.max_retries:
+                    return self._flush_rows_individually(rows)
+                with self._lock:
+                    # Keep anything that arrived during the flush on top of the retried rows.
+                    for key, updates in batch.items():
+                        self._pending[key] = {**updates, **self._pending.get(key, {})}
+                return 0
+
+            self._failures = 0
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += len(rows)
+            logger.info(f"Flushed {len(rows)} buffered progress updates.")
+            return len(rows)
+
+    def _flush_rows_individually(self, rows: List[Dict[str, Any]]) -> int:
+        # Called with self._flush_lock held, after repeated batch failures.
+        written = 0
+        for row in rows:
+            try:
+                self._flush_fn([row])
+                written += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats["dropped_rows"] += 1
+                logger.error(f"Dropping buffered progress update {row}: {e}")
+
+        self._failures = 0
+        with self._lock:
+            self._stats["rows_written"] += written
+        logger.warning(
+            f"Wrote {written} of {len(rows)} buffered progress updates row by row."
+        )
+        return written
+
+    def shutdown(self) -> None:
+        """Stops the background worker and flushes whatever is still pending."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "pending": len(self._pending)}
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="progress-write-behind", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _write_progress_batch(rows: List[Dict[str, Any]]) -> None:
+    # The flush runs outside any request, so it cannot use the user's JWT.
+    # user_id in each row comes from a verified JWT, and the RPC only updates
+    # rows that already exist.
+    repo = UserReadingProgressRepository(get_supabase_admin_client())
+    if repo.apply_progress_batch(rows) is None:
+        raise RuntimeError("apply_reading_progress_batch failed")
+
+    # Rescores read the database, so they are queued only once the rows are in it.
+    books_by_user: Dict[str, List[str]] = {}
+    for row in rows:
+        books_by_user.setdefault(row["user_id"], []).append(row["book_id"])
+    for user_id, book_ids in books_by_user.items():
+        notify_library_change(user_id, book_ids)
+
+
+progress_buffer = ProgressWriteBuffer(_write_progress_batch)
+atexit.register(progress_buffer.shutdown)
@@ -0,0 +1,189 @@
+# api/services/read_url_service.py
+
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from flask import g
+
+from api.db.cache import get_shared_cache
+from api.db.repositories.books_repository import BooksRepository
+from api.db.supabase_client import get_supabase_admin_client
+from api.utils.logger_config import logger
+
+# Signed URLs are the same for every reader of a book, so one signature is
+# shared until SIGNED_URL_SAFETY_MARGIN seconds before it expires; a reader
+# who opens a link just before that still has the margin to start the download.
+SIGNED_URL_EXPIRES_IN = int(os.getenv("SIGNED_URL_EXPIRES_IN", "3600"))
+SIGNED_URL_SAFETY_MARGIN = int(os.getenv("SIGNED_URL_SAFETY_MARGIN", "300"))
+MAX_READ_URL_BATCH = 50
+
+
+def _split_storage_path(storage_path: str):
+    # Stored as '<bucket>/<path within the bucket>', e.g. 'public-epubs/dune.epub'.
+    bucket, _, file_path = storage_path.partition("/")
+    return bucket, file_path
+
+
+def _storage_paths(book_ids: List[str]) -> Optional[Dict[str, str]]:
+    """
+    Returns {book_id: epub_storage_path} from the shared cache or one query.
+    Books without content are omitted and never cached, so an upload is
+    picked up on the next request.
+    """
+
+    def fetch(missing: List[str]) -> Optional[Dict[str, str]]:
+        paths = BooksRepository(get_supabase_admin_client()).fetch_epub_storage_paths(
+            missing
+        )
+        if paths is None:
+            return None
+        return {book_id: path for book_id, path in paths.items() if path}
+
+    cached = get_shared_cache().get_or_load_many("epub_paths", book_ids, fetch)
+    if cached is None:
+        return None
+    return {book_id: entry.data for book_id, entry in cached.items()}
+
+
+def _sign(book_ids: List[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Signs the EPUBs of the given books with one storage call per bucket.
+    Books without content, or whose signing failed, are omitted.
+    """
+    paths = _storage_paths(book_ids)
+    if paths is None:
+        return None
+
+    by_bucket: Dict[str, Dict[str, str]] = defaultdict(dict)
+    for book_id in book_ids:
+        storage_path = paths.get(book_id)
+        if storage_path:
+            bucket, file_path = _split_storage_path(storage_path)
+            by_bucket[bucket][file_path] = book_id
+
+    storage = get_supabase_admin_client().storage
+    expires_at = (
+        datetime.now(timezone.utc) + timedelta(seconds=SIGNED_URL_EXPIRES_IN)
+    ).isoformat()
+    signed: Dict[str, Dict[str, str]] = {}
+    for bucket, book_by_path in by_bucket.items():
+        try:
+            items = storage.from_(bucket).create_signed_urls(
+                list(book_by_path), SIGNED_URL_EXPIRES_IN
+            )
+        except Exception as e:
+            logger.error(f"Error signing {len(book_by_path)} EPUBs in {bucket}: {e}")
+            continue
+        for item in items:
+            book_id = book_by_path.get(item.get("path"))
+            if book_id is None or item.get("error"):
+                logger.warning(
+                    f"Could not sign {item.get('path')}: {item.get('error')}"
+                )
+                continue
+            signed[book_id] = {
+                "signed_url": item["signedURL"],
+                "expires_at": expires_at,
+            }
+    return signed
+
+
+def get_read_urls(book_ids: List[UUID]) -> Dict[str, Any]:
+    """
+    Returns signed EPUB URLs for several books, reusing cached signatures.
+
+    Returns a dict with `urls` ({book_id: {signed_url, expires_at}}),
+    `unavailable` (books without content) and `failed` (books that could
+    not be signed right now), or the standardized error format on failure.
+    Raises ValueError for an empty list or more than MAX_READ_URL_BATCH books.
+    """
+    book_ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+    if not book_ids:
+        raise ValueError("book_ids must contain at least one book.")
+    if len(book_ids) > MAX_READ_URL_BATCH:
+        raise ValueError(f"At most {MAX_READ_URL_BATCH} books can be signed at once.")
+
+    try:
+        cached = get_shared_cache().get_or_load_many(
+            "signed_urls",
+            book_ids,
+            _sign,
+            ttl=max(SIGNED_URL_EXPIRES_IN - SIGNED_URL_SAFETY_MARGIN, 1),
+        )
+        urls = {book_id: entry.data for book_id, entry in (cached or {}).items()}
+
+        # Storage paths were cached while signing, so this is usually no query.
+        missing = [book_id for book_id in book_ids if book_id not in urls]
+        paths = _storage_paths(missing) if missing else {}
+        unavailable, failed = [], []
+        for book_id in missing:
+            if paths is not None and not paths.get(book_id):
+                unavailable.append(book_id)
+            else:
+                failed.append(book_id)
+
+        logger.info(
+            f"Read URLs: {len(urls)} signed, {len(unavailable)} unavailable, {len(failed)} failed."
+        )
+        return {
+            "success": True,
+            "status_code": 200,
+            "data": {"urls": urls, "unavailable": unavailable, "failed": failed},
+        }
+    except Exception as e:
+        logger.error(
+            f"Unexpected error in get_read_urls service: {e} | Request ID: {getattr(g, 'request_id', None)}"
+        )
+        return {
+            "success": False,
+            "status_code": 500,
+            "message": "An unexpected server error occurred.",
+            "error": {
+                "type": "InternalServerError",
+                "message": "An unexpected server error occurred.",
+                "code": "internal_error",
+                "request_id": getattr(g, "request_id", None),
+            },
+        }
+
+
+def get_read_url(book_id: UUID) -> Dict[str, Any]:
+    """
+    Returns the signed EPUB URL of one book as {signed_url, expires_at},
+    or the standardized error format: 404 if the book has no content,
+    500 if it could not be signed.
+    """
+    result = get_read_urls([book_id])
+    if not result["success"]:
+        return result
+
+    data = result["data"]
+    book_id = str(book_id)
+    if book_id in data["urls"]:
+        return {"success": True, "status_code": 200, "data": data["urls"][book_id]}
+    if book_id in data["unavailable"]:
+        return {
+            "success": False,
+            "status_code": 404,
+            "message": "Book content not available.",
+            "error": {
+                "type": "NotFoundError",
+                "message": "Book content not available.",
+                "code": "book_content_not_found",
+                "request_id": getattr(g, "request_id", None),
+            },
+        }
+    return {
+        "success": False,
+        "status_code": 500,
+        "message": "Could not retrieve book content.",
+        "error": {
+            "type": "StorageError",
+            "message": "Could not retrieve book content.",
+            "code": "signed_url_error",
+            "request_id": getattr(g, "request_id", None),
+        },
+    }
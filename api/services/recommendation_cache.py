@@ -0,0 +1,105 @@
+# api/services/recommendation_cache.py
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from api.utils.logger_config import logger
+
+# Candidate lists come from the `category_book_candidates` materialized view,
+# which the preference engine refreshes; a stale list only lags that refresh.
+RECOMMENDATION_CANDIDATE_TTL = float(os.getenv("RECOMMENDATION_CANDIDATE_TTL", "600"))
+
+CandidateLoader = Callable[[List[str]], Optional[Dict[str, List[Dict[str, Any]]]]]
+
+
+class CandidateCache:
+    """
+    Process-level cache of the ranked candidate books of each category.
+
+    Candidate lists are the same for every user, so one load serves all
+    readers of a category. `loader` receives the category ids that are
+    missing or expired and returns {category_id: [book, ...]} in a single
+    query, or None on error. If a reload fails, expired lists keep being
+    served until a reload succeeds.
+
+    `version` returns the shared cache's invalidation version of the lists;
+    when it changes (the preference job refreshed them), entries loaded under
+    an older version count as expired. None (unknown) keeps them.
+    """
+
+    def __init__(
+        self,
+        loader: CandidateLoader,
+        ttl: float = RECOMMENDATION_CANDIDATE_TTL,
+        version: Optional[Callable[[], Optional[int]]] = None,
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self._version = version
+        # category_id -> (loaded_at, version, candidates)
+        self._entries: Dict[str, Tuple[float, Optional[int], List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_errors": 0}
+
+    def get_many(self, category_ids: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the candidate lists of the given categories, loading misses in one batch."""
+        category_ids = [str(category_id) for category_id in category_ids]
+        now = time.monotonic()
+        version = self._version() if self._version is not None else None
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        missing: List[str] = []
+        for category_id in category_ids:
+            entry = self._entries.get(category_id)
+            if (
+                entry is not None
+                and now - entry[0] < self.ttl
+                and (version is None or entry[1] == version)
+            ):
+                found[category_id] = entry[2]
+            else:
+                missing.append(category_id)
+
+        with self._lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(missing)
+        if not missing:
+            return found
+
+        loaded = self._loader(missing)
+        with self._lock:
+            if loaded is None:
+                self._stats["load_errors"] += 1
+                stale = {
+                    category_id: self._entries[category_id][2]
+                    for category_id in missing
+                    if category_id in self._entries
+                }
+                if stale:
+                    logger.warning(
+                        f"Candidate reload failed; serving {len(stale)} expired lists."
+                    )
+                found.update(stale)
+                return found
+
+            self._stats["loads"] += 1
+            loaded_at = time.monotonic()
+            for category_id in missing:
+                # Categories without candidates are cached as empty lists too.
+                candidates = loaded.get(category_id, [])
+                self._entries[category_id] = (loaded_at, version, candidates)
+                found[category_id] = candidates
+        return found
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "categories": len(self._entries),
+                "ttl_seconds": self.ttl,
+            }
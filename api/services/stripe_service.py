@@ -2,11 +2,12 @@
 
 import os
 import stripe
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from uuid import UUID
 from flask import g
 from api.utils.logger_config import logger
 from api.db.supabase_client import get_supabase_admin_client
+from api.db.request_scope import get_request_scoped
 from api.db.repositories.users_repository import UsersRepository
 
 # Initialize Stripe with secret key
@@ -14,6 +15,29 @@ stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
 stripe_price_id = os.environ.get("STRIPE_PRICE_ID")
 
 
+def subscription_needs_verification(
+    status: Optional[str], subscription_id: Optional[str]
+) -> bool:
+    """Only profiles marked active with a Stripe subscription are checked against Stripe."""
+    return status == "active" and bool(subscription_id)
+
+
+def reconcile_subscription_status(
+    subscription: Optional[Any],
+) -> Tuple[str, bool]:
+    """
+    Maps the Stripe subscription of an active profile to the status to report
+    and whether the profile must be marked inactive. `subscription` is None
+    when Stripe could not be reached; the user is then reported inactive
+    without touching the profile.
+    """
+    if subscription is None:
+        return "inactive", False
+    if subscription.status == "active":
+        return "active", False
+    return "inactive", True
+
+
 def create_checkout_session(
     user_id: UUID, price_id: str, base_url: str, user_email: str
 ) -> Dict[str, Any]:
@@ -121,8 +145,10 @@ def verify_payment_and_update_subscription(
             }
 
         # Update user subscription status in database
-        supabase_admin = get_supabase_admin_client()
-        users_repo = UsersRepository(supabase_admin)
+        users_repo = get_request_scoped(
+            "admin_users_repository",
+            lambda: UsersRepository(get_supabase_admin_client()),
+        )
 
         update_result = users_repo.update_user_subscription(
             user_id=user_id,
@@ -195,27 +221,29 @@ def get_user_subscription_status(user_id: UUID) -> Dict[str, Any]:
     """
     try:
         # Get user's subscription status from database
-        supabase_admin = get_supabase_admin_client()
-        users_repo = UsersRepository(supabase_admin)
+        users_repo = get_request_scoped(
+            "admin_users_repository",
+            lambda: UsersRepository(get_supabase_admin_client()),
+        )
 
         subscription_data = users_repo.get_user_subscription_status(user_id)
 
         if subscription_data:
             # If user has an active subscription, verify with Stripe
-            if subscription_data[0] == "active" and subscription_data[1]:
+            if subscription_needs_verification(
+                subscription_data[0], subscription_data[1]
+            ):
                 try:
                     subscription = stripe.Subscription.retrieve(subscription_data[1])
-                    is_active = subscription.status == "active"
-
-                    if not is_active:
-                        # Update database if subscription is no longer active
-                        users_repo.update_user_subscription(
-                            user_id=user_id, subscription_status="inactive"
-                        )
-                        subscription_data[0] = "inactive"
                 except stripe.error.StripeError:
-                    # If we can't verify with Stripe, assume inactive
-                    subscription_data[0] = "inactive"
+                    subscription = None
+                status, deactivate = reconcile_subscription_status(subscription)
+                if deactivate:
+                    # Update database if subscription is no longer active
+                    users_repo.update_user_subscription(
+                        user_id=user_id, subscription_status="inactive"
+                    )
+                subscription_data[0] = status
 
             return {"success": True, "subscription_status": subscription_data[0]}
         else:
@@ -0,0 +1,61 @@
+# api/tests/benchmarks/bench_json_provider.py
+"""
+Compares Flask's default JSON provider with FastJSONProvider on a 50-book
+/api/books payload.
+
+Run from the repository root:
+    python -m api.tests.benchmarks.bench_json_provider
+"""
+
+import timeit
+import uuid
+
+from flask import Flask, g
+from flask.json.provider import DefaultJSONProvider
+
+from api.utils.json_provider import FastJSONProvider, orjson
+
+ROUNDS = 2000
+
+
+def _books_payload(count: int = 50):
+    return {
+        "books": [
+            {
+                "id": str(uuid.uuid4()),
+                "title": f"Book {i}",
+                "author": "Jane Doe",
+                "cover_image_url": f"https://example.com/covers/{i}.jpg",
+                "description": "A long description of the book. " * 20,
+                "total_pages": 300 + i,
+                "is_in_library": i % 3 == 0,
+                "created_at": "2025-01-01T00:00:00+00:00",
+            }
+            for i in range(count)
+        ],
+        "next_cursor": "WyIyMDI1LTAxLTAxIiwiYjEiXQ",
+        "user_id": uuid.uuid4(),
+    }
+
+
+def _bench(provider_cls) -> float:
+    app = Flask(__name__)
+    app.json = provider_cls(app)
+    payload = _books_payload()
+    with app.test_request_context():
+        g.request_id = "bench"
+        seconds = timeit.timeit(lambda: app.json.response(payload), number=ROUNDS)
+    return seconds / ROUNDS * 1e6
+
+
+def main():
+    default_us = _bench(DefaultJSONProvider)
+    fast_us = _bench(FastJSONProvider)
+    print(f"orjson available: {orjson is not None}")
+    print(f"DefaultJSONProvider: {default_us:8.1f} us/response")
+    print(f"FastJSONProvider:    {fast_us:8.1f} us/response")
+    print(f"Speedup:             {default_us / fast_us:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
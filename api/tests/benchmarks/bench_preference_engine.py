@@ -0,0 +1,44 @@
+# api/tests/benchmarks/bench_preference_engine.py
+"""
+Times the preference engine's scoring on synthetic data shaped like 100k
+users with ~40 categorized library books each. Database I/O is excluded.
+
+Run from the repository root:
+    python -m api.tests.benchmarks.bench_preference_engine
+"""
+
+import time
+
+import numpy as np
+
+from api.jobs.preference_engine import compute_preference_scores
+
+USERS = 100_000
+SIGNALS_PER_USER = 40
+CATEGORIES = 300
+CHUNK_USERS = 5000
+
+
+def main():
+    rng = np.random.default_rng(0)
+    signals = CHUNK_USERS * SIGNALS_PER_USER
+    started = time.perf_counter()
+    pairs = 0
+    for _ in range(USERS // CHUNK_USERS):
+        user_idx = rng.integers(0, CHUNK_USERS, signals)
+        category_idx = rng.integers(0, CATEGORIES, signals)
+        status = rng.integers(0, 4, signals)
+        progress = rng.uniform(0, 100, signals)
+        age_days = rng.exponential(120, signals)
+        pairs += len(
+            compute_preference_scores(
+                user_idx, category_idx, status, progress, age_days
+            )[2]
+        )
+    elapsed = time.perf_counter() - started
+    print(f"Scored {USERS * SIGNALS_PER_USER:,} signals into {pairs:,} preferences")
+    print(f"Elapsed: {elapsed:.2f}s ({USERS / elapsed:,.0f} users/s, compute only)")
+
+
+if __name__ == "__main__":
+    main()
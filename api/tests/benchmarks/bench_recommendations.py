@@ -0,0 +1,86 @@
+# api/tests/benchmarks/bench_recommendations.py
+"""
+Measures the latency of the warm /api/recommendations path: candidate lists
+are read from the CandidateCache and ranked for a user with 10 top
+categories and 500 library books. The single get_recommendation_inputs
+query is excluded. Exits non-zero if the p99 exceeds the budget.
+
+Run from the repository root:
+    python -m api.tests.benchmarks.bench_recommendations [--budget-ms 5]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from api.services.book_service import (
+    RECOMMENDATION_CANDIDATES_PER_CATEGORY,
+    RECOMMENDATION_TOP_CATEGORIES,
+    rank_recommendations,
+)
+from api.services.recommendation_cache import CandidateCache
+
+ROUNDS = 5000
+CATALOG_SIZE = 20_000
+LIBRARY_SIZE = 500
+PAGE_SIZE = 20
+
+
+def _candidates(category_ids):
+    rng = random.Random(0)
+    return {
+        category_id: [
+            {
+                "id": f"book-{book}",
+                "title": f"Book {book}",
+                "author": "Jane Doe",
+                "cover_image_url": f"https://example.com/covers/{book}.jpg",
+                "description": "A long description of the book. " * 10,
+                "total_pages": 320,
+                "candidate_score": 1.0 - rank / RECOMMENDATION_CANDIDATES_PER_CATEGORY,
+            }
+            for rank, book in enumerate(
+                rng.sample(range(CATALOG_SIZE), RECOMMENDATION_CANDIDATES_PER_CATEGORY)
+            )
+        ]
+        for category_id in category_ids
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    category_ids = [f"category-{i}" for i in range(RECOMMENDATION_TOP_CATEGORIES)]
+    cache = CandidateCache(_candidates)
+    cache.get_many(category_ids)  # warm up, as after the first request
+    categories = [
+        {"category_id": category_id, "score": rng.uniform(0.5, 1.0)}
+        for category_id in category_ids
+    ]
+    library = [f"book-{book}" for book in rng.sample(range(CATALOG_SIZE), LIBRARY_SIZE)]
+
+    timings = []
+    for round_number in range(ROUNDS):
+        page = round_number % 5 + 1
+        started = time.perf_counter()
+        candidates = cache.get_many(c["category_id"] for c in categories)
+        rank_recommendations(categories, candidates, library, page * PAGE_SIZE + 1)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"Ranked {ROUNDS} pages: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    if p99 > args.budget_ms:
+        print(f"FAIL: p99 above the {args.budget_ms} ms budget")
+        return 1
+    print(f"OK: p99 within the {args.budget_ms} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,5 +26,25 @@ def mock_supabase(monkeypatch):
     yield
 
 
+@pytest.fixture(autouse=True)
+def reset_category_cache():
+    # The category cache is process-wide; start every test with it empty.
+    from api.services.categories_service import category_cache
+
+    category_cache.invalidate()
+    yield
+    category_cache.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def isolated_shared_cache(monkeypatch):
+    # Give every test an empty process-local shared cache instead of REDIS_URL.
+    from api.db import cache
+
+    shared = cache.SharedCache(cache.LocalCache())
+    monkeypatch.setattr(cache, "_shared_cache", shared)
+    yield shared
+
+
 os.environ.setdefault("NEXT_PUBLIC_SUPABASE_URL", "http://dummy-url")
 os.environ.setdefault("NEXT_PUBLIC_SUPABASE_ANON_KEY", "dummy-key")
@@ -0,0 +1,73 @@
+import numpy as np
+from unittest.mock import MagicMock
+
+from api.jobs.preference_engine import (
+    STATUS_CODES,
+    PreferenceEngine,
+    compute_preference_scores,
+)
+
+
+def test_compute_preference_scores_sums_and_decays_signals():
+    users = np.array([0, 0, 0, 1])
+    categories = np.array([0, 0, 1, 0])
+    status = np.array(
+        [
+            STATUS_CODES["finished"],
+            STATUS_CODES["finished"],
+            STATUS_CODES["abandoned"],
+            STATUS_CODES["finished"],
+        ]
+    )
+    progress = np.array([100.0, 100.0, 10.0, 100.0])
+    age_days = np.array([0.0, 0.0, 0.0, 90.0])
+
+    pair_users, pair_categories, scores = compute_preference_scores(
+        users, categories, status, progress, age_days, half_life_days=90
+    )
+    by_pair = dict(zip(zip(pair_users.tolist(), pair_categories.tolist()), scores))
+    assert by_pair[(0, 0)] > by_pair[(1, 0)] > 0.5  # two fresh reads beat one old one
+    assert by_pair[(0, 1)] < 0.5  # early abandonment is negative evidence
+    assert np.all((scores > 0) & (scores < 1))
+
+
+def test_preference_engine_walks_chunks_and_skips_uncategorized_books():
+    repo = MagicMock()
+    repo.fetch_interaction_chunk.side_effect = [
+        [
+            {
+                "user_id": "u1",
+                "category_id": "c1",
+                "status": "finished",
+                "progress_percentage": 100,
+                "age_days": 1,
+            },
+            {
+                "user_id": "u2",
+                "category_id": None,
+                "status": "reading",
+                "progress_percentage": 5,
+                "age_days": 1,
+            },
+        ],
+        [
+            {
+                "user_id": "u3",
+                "category_id": "c2",
+                "status": "reading",
+                "progress_percentage": 50,
+                "age_days": 3,
+            },
+        ],
+    ]
+    repo.upsert_implicit_preferences.side_effect = lambda rows, **kwargs: len(rows)
+
+    stats = PreferenceEngine(repo, chunk_users=2).run()
+
+    assert stats["users"] == 3
+    assert stats["preferences"] == 2
+    assert repo.fetch_interaction_chunk.call_args_list[1].args == ("u2", 2)
+    first_call = repo.upsert_implicit_preferences.call_args_list[0]
+    assert [row[:2] for row in first_call.args[0]] == [("u1", "c1")]
+    # u2 has no scorable signal left, so its old implicit rows are replaced too.
+    assert first_call.kwargs["replace_user_ids"] == ["u1", "u2"]
@@ -2,6 +2,13 @@ import pytest
 from unittest.mock import MagicMock
 from api.db.repositories.books_repository import BooksRepository
 from api.db.repositories.categories_repository import Categories
+from api.db.repositories.in_memory_books_repository import InMemoryBooksRepository
+from api.db.repositories.postgres_user_reading_progress_repository import (
+    PostgresUserReadingProgressRepository,
+)
+from api.db import postgres_client
+from api.db.postgres_client import PostgresSession
+from uuid import uuid4
 
 
 @pytest.fixture
@@ -35,6 +42,96 @@ def test_categories_repository_fetch_all_success(mock_db_client):
     assert cats[1][0]["name"] == "Fiction"
 
 
+def test_categories_repository_fetch_all_empty_table(mock_db_client):
+    repo = Categories(mock_db_client)
+    mock_db_client.table.return_value.select.return_value.order.return_value.execute.return_value = (
+        ("data", []),
+        ("count", None),
+    )
+    assert repo.fetch_all() == ("data", [])
+
+
 def test_categories_repository_fetch_all_no_client():
     repo = Categories(None)
     assert repo.fetch_all() is None
+
+
+@pytest.fixture
+def mock_pg_session():
+    session = MagicMock()
+    cursor = MagicMock()
+    session.transaction.return_value.__enter__.return_value = cursor
+    return session, cursor
+
+
+def test_postgres_progress_repository_add_book_conflict(mock_pg_session):
+    session, cursor = mock_pg_session
+    cursor.fetchone.return_value = None
+    repo = PostgresUserReadingProgressRepository(session)
+    assert repo.add_book_for_user(uuid4(), uuid4()) == {"error": "already_exists"}
+
+
+def test_postgres_progress_repository_rejects_unsupported_updates(mock_pg_session):
+    session, _ = mock_pg_session
+    repo = PostgresUserReadingProgressRepository(session)
+    assert repo.update_book_progress(uuid4(), uuid4(), {"user_id": "x"}) is None
+    session.transaction.assert_not_called()
+
+
+def test_postgres_session_prepares_statement_once():
+    session = PostgresSession({"role": "anon"}, connection_pool=MagicMock())
+    cursor = MagicMock()
+    cursor.connection.prepared_statements = set()
+    session.execute_prepared(cursor, "q", "SELECT $1::int", (1,))
+    session.execute_prepared(cursor, "q", "SELECT $1::int", (2,))
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements == [
+        "PREPARE q AS SELECT $1::int",
+        "EXECUTE q (%s)",
+        "EXECUTE q (%s)",
+    ]
+
+
+def test_postgres_session_skips_prepare_behind_transaction_pooler(monkeypatch):
+    monkeypatch.setattr(
+        postgres_client,
+        "DATABASE_URL",
+        "postgresql://u:p@aws-0-eu.pooler.supabase.com:6543/postgres",
+    )
+    session = PostgresSession({"role": "anon"}, connection_pool=MagicMock())
+    cursor = MagicMock()
+    cursor.connection.prepared_statements = set()
+    session.execute_prepared(
+        cursor, "q", "SELECT $1::int WHERE $2 LIKE 'a%' OR $1 > 0", (1, "x")
+    )
+    cursor.execute.assert_called_once_with(
+        "SELECT %(p1)s::int WHERE %(p2)s LIKE 'a%%' OR %(p1)s > 0",
+        {"p1": 1, "p2": "x"},
+    )
+    assert cursor.connection.prepared_statements == set()
+
+
+def test_in_memory_books_repository_search_ranks_title_matches_first():
+    books = [
+        {"id": "b1", "title": "Dune", "author": "Frank Herbert", "description": ""},
+        {
+            "id": "b2",
+            "title": "Children of Dune",
+            "author": "Frank Herbert",
+            "description": "",
+        },
+        {
+            "id": "b3",
+            "title": "Arrakis Atlas",
+            "author": "Someone",
+            "description": "A guide to the world of Dune.",
+        },
+        {"id": "b4", "title": "Emma", "author": "Jane Austen", "description": ""},
+    ]
+    repo = InMemoryBooksRepository(books, library_book_ids=["b2"])
+    results = repo.search_books("dune", page=1, limit=10)
+    assert [b["id"] for b in results] == ["b1", "b2", "b3"]
+    assert results[1]["is_in_library"] is True
+    assert results[0]["total_count"] == 3
+    assert repo.search_books("dune herbert", page=1, limit=10)[-1]["id"] == "b2"
+    assert repo.search_books("dune", page=2, limit=2)[0]["id"] == "b3"
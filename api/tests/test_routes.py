@@ -1,4 +1,12 @@
-from unittest.mock import patch
+import gzip
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from unittest.mock import patch, AsyncMock
+from api.utils.json_provider import dumps_bytes
+from api.utils.pagination import encode_cursor
 
 
 # Helper for auth headers
@@ -29,8 +37,8 @@ def test_me_unauthenticated(client):
 
 
 @patch(
-    "api.services.categories_service.get_categories",
-    return_value=[{"id": 1, "name": "Fiction"}],
+    "api.services.categories_service.get_categories_json",
+    return_value=b'[{"id":1,"name":"Fiction"}]',
 )
 def test_get_categories_success(mock_get, client):
     resp = client.get("/api/categories")
@@ -43,7 +51,8 @@ def test_get_categories_success(mock_get, client):
 
 
 @patch(
-    "api.services.categories_service.get_categories", side_effect=Exception("DB error")
+    "api.services.categories_service.get_categories_json",
+    side_effect=Exception("DB error"),
 )
 def test_get_categories_failure(mock_get, client):
     resp = client.get("/api/categories")
@@ -51,4 +60,405 @@ def test_get_categories_failure(mock_get, client):
     assert "error" in resp.json
 
 
+FICTION_ID = "123e4567-e89b-12d3-a456-426614174001"
+FANTASY_ID = "123e4567-e89b-12d3-a456-426614174002"
+
+
+@patch("api.services.categories_service.get_supabase_client")
+@patch("api.services.categories_service.Categories")
+def test_get_category_tree_and_path(mock_categories, mock_client, client):
+    mock_categories.return_value.fetch_all.return_value = (
+        None,
+        [
+            {"id": FICTION_ID, "name": "Fiction", "parent_id": None},
+            {"id": FANTASY_ID, "name": "Fantasy", "parent_id": FICTION_ID},
+        ],
+    )
+    resp = client.get("/api/categories?view=tree")
+    assert resp.status_code == 200
+    assert resp.json["categories"][0]["children"][0]["name"] == "Fantasy"
+
+    resp = client.get(f"/api/categories/{FANTASY_ID}/path")
+    assert [c["name"] for c in resp.json["path"]] == ["Fiction", "Fantasy"]
+
+    resp = client.get("/api/categories/123e4567-e89b-12d3-a456-426614174009/subtree")
+    assert resp.status_code == 404
+    mock_categories.return_value.fetch_all.assert_called_once()
+
+
+@patch("api.services.categories_service.spawn_with_request_context")
+@patch("api.services.categories_service.get_supabase_client")
+@patch("api.services.categories_service.Categories")
+def test_get_categories_serves_stale_list_past_ttl(
+    mock_categories, mock_client, mock_spawn, client, isolated_shared_cache
+):
+    from api.services.categories_service import category_cache
+
+    mock_categories.return_value.fetch_all.return_value = (
+        None,
+        [{"id": FICTION_ID, "name": "Fiction", "parent_id": None}],
+    )
+    assert client.get("/api/categories").headers.get("X-Cache-Stale") is None
+
+    # Both cache tiers expire and the database goes down.
+    category_cache._loaded_at = 0.0
+    for key, entry in list(isolated_shared_cache._l1.items()):
+        isolated_shared_cache._l1[key] = entry._replace(expires_at=0.0)
+    mock_categories.return_value.fetch_all.side_effect = Exception("DB down")
+
+    resp = client.get("/api/categories")
+    assert resp.status_code == 200
+    assert resp.json["categories"][0]["name"] == "Fiction"
+    assert resp.headers["X-Cache-Stale"].endswith("reason=revalidating")
+    assert "ETag" not in resp.headers
+    mock_spawn.assert_called_once()
+
+
+@patch("api.services.categories_service.get_supabase_client")
+@patch("api.services.categories_service.Categories")
+def test_get_categories_conditional_get(mock_categories, mock_client, client):
+    mock_categories.return_value.fetch_all.return_value = (
+        None,
+        [{"id": FICTION_ID, "name": "Fiction", "parent_id": None}],
+    )
+    resp = client.get("/api/categories")
+    etag = resp.headers["ETag"]
+    assert resp.status_code == 200
+
+    resp = client.get("/api/categories", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+
+    resp = client.get("/api/categories?view=tree", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+@patch("api.services.book_service.get_discover_books_json")
+@patch("api.services.book_service.get_content_versions")
+def test_get_books_not_modified_skips_fetch(
+    mock_versions, mock_discover, mock_validate, client
+):
+    mock_versions.return_value = {"catalog": "10:2025-01-01", "library": "2:x"}
+    mock_discover.return_value = b'[{"id":"b1"}]'
+    resp = client.get("/api/books", headers=auth_headers())
+    assert resp.json["books"] == [{"id": "b1"}]
+    etag = resp.headers["ETag"]
+
+    resp = client.get("/api/books", headers={**auth_headers(), "If-None-Match": etag})
+    assert resp.status_code == 304
+    mock_discover.assert_called_once()
+
+    mock_versions.return_value = {"catalog": "11:2025-01-02", "library": "2:x"}
+    resp = client.get("/api/books", headers={**auth_headers(), "If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+@patch("api.services.book_service.get_user_library_shelves")
+@patch("api.services.book_service.get_content_versions")
+def test_get_my_books_reads_only_the_library_version(
+    mock_versions, mock_shelves, mock_validate, client
+):
+    mock_versions.return_value = {"library": "2:x"}
+    mock_shelves.return_value = {"library": {}, "counts": {}, "next_cursors": {}}
+    resp = client.get("/api/my-books", headers=auth_headers())
+    assert resp.status_code == 200
+    assert "ETag" in resp.headers
+    mock_versions.assert_called_once_with(("library",))
+    # Shelves are complete unless the client pages through them.
+    assert mock_shelves.call_args.kwargs["shelf_limit"] is None
+
+
+def test_supabase_health_reports_pool_stats(client):
+    resp = client.get("/api/health/supabase")
+    assert resp.status_code == 200
+    assert "max_size" in resp.json["pool"]
+
+
+def test_supabase_health_probe_requires_token(client, monkeypatch):
+    from api.routes import home_routes
+
+    resp = client.get("/api/health/supabase?probe=1")
+    assert resp.status_code == 403
+
+    monkeypatch.setattr(home_routes, "HEALTH_PROBE_TOKEN", "internal")
+    resp = client.get(
+        "/api/health/supabase?probe=1", headers={"X-Health-Token": "wrong"}
+    )
+    assert resp.status_code == 403
+
+
+def test_dashboard_unauthenticated(client):
+    resp = client.get("/api/dashboard")
+    assert resp.status_code == 401
+    assert "error" in resp.json
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+@patch(
+    "api.services.dashboard_service.get_dashboard",
+    new_callable=AsyncMock,
+    return_value={"books": [], "categories": [], "library": {}},
+)
+def test_dashboard_authenticated(mock_dashboard, mock_validate, client):
+    resp = client.get("/api/dashboard", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.json["books"] == []
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_books_invalid_cursor(mock_validate, client):
+    resp = client.get("/api/books?cursor=%%%", headers=auth_headers())
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_cursor"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_books_rejects_page_with_category(mock_validate, client):
+    resp = client.get(
+        f"/api/books?category_id={uuid.uuid4()}&page=2", headers=auth_headers()
+    )
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_pagination"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_update_my_book_rejects_out_of_range_progress(mock_validate, client):
+    resp = client.patch(
+        f"/api/my-books/{uuid.uuid4()}", json={"progress": 140}, headers=auth_headers()
+    )
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "validation_error"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_books_cursor_with_bad_values(mock_validate, client):
+    cursor = encode_cursor("yesterday", "not-a-uuid")
+    resp = client.get(f"/api/books?cursor={cursor}", headers=auth_headers())
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_cursor"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_add_my_books_bulk_invalid_id(mock_validate, client):
+    resp = client.post(
+        "/api/my-books/bulk",
+        json={"book_ids": ["not-a-uuid"]},
+        headers=auth_headers(),
+    )
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_book_id_format"
+
+
+@patch(
+    "api.services.categories_service.get_categories_json",
+    return_value=dumps_bytes([{"id": i, "name": "Fiction " * 50} for i in range(20)]),
+)
+@patch("api.services.categories_service.get_categories_version", return_value=None)
+def test_large_json_response_is_gzipped(mock_version, mock_get, client):
+    resp = client.get("/api/categories", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert json.loads(gzip.decompress(resp.data))["categories"][0]["id"] == 0
+
+    resp = client.get("/api/health")
+    assert "Content-Encoding" not in resp.headers
+
+    stats = client.get("/api/health/compression").json["routes"]
+    assert stats["/api/categories"]["ratio"] < 1
+
+
+def test_json_provider_matches_default_semantics(app):
+    payload = {
+        "id": uuid.UUID("123e4567-e89b-12d3-a456-426614174000"),
+        "price": Decimal("9.99"),
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    }
+    default = DefaultJSONProvider(app)
+    assert json.loads(app.json.dumps(payload)) == json.loads(default.dumps(payload))
+    assert app.json.dumps({"big": 2**70}) == default.dumps({"big": 2**70})
+    assert json.loads(app.json.dumps({1: "a"})) == {"1": "a"}
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+@patch("api.services.book_service.iter_catalog_export")
+def test_export_books_streams_ndjson(mock_export, mock_validate, client):
+    def records():
+        yield {"id": "b1"}
+        yield {"id": "b2"}
+        raise RuntimeError("db down")
+
+    mock_export.return_value = records()
+    resp = client.get("/api/books/export", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.data.splitlines()]
+    assert lines[:2] == [{"id": "b1"}, {"id": "b2"}]
+    assert lines[2]["error"]["code"] == "export_error"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_search_books_requires_query(mock_validate, client):
+    resp = client.get("/api/books/search?q=", headers=auth_headers())
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_search_query"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_books_invalid_category_id(mock_validate, client):
+    resp = client.get("/api/books?category_id=fiction", headers=auth_headers())
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_category_id"
+
+
+@patch("api.services.book_service.get_recommendations")
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_recommendations(mock_validate, mock_recommend, client):
+    mock_recommend.return_value = {
+        "books": [{"id": "b1", "score": 0.8}],
+        "page": 1,
+        "has_more": False,
+    }
+    resp = client.get("/api/recommendations?limit=5", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.json["books"] == [{"id": "b1", "score": 0.8}]
+    mock_recommend.assert_called_once_with(page=1, limit=5)
+
+    mock_recommend.return_value = None
+    resp = client.get("/api/recommendations", headers=auth_headers())
+    assert resp.status_code == 500
+    assert resp.json["error"]["code"] == "fetch_recommendations_error"
+
+
+@patch("api.services.read_url_service.get_read_url")
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_book_read_url(mock_validate, mock_read_url, client):
+    book_id = "223e4567-e89b-12d3-a456-426614174000"
+    mock_read_url.return_value = {
+        "success": True,
+        "status_code": 200,
+        "data": {"signed_url": "https://s/x", "expires_at": "2030-01-01T00:00:00"},
+    }
+    resp = client.get(f"/api/books/{book_id}/read", headers=auth_headers())
+    assert resp.status_code == 200
+    assert resp.json["signed_url"] == "https://s/x"
+
+    mock_read_url.return_value = {
+        "success": False,
+        "status_code": 404,
+        "error": {"code": "book_content_not_found"},
+    }
+    resp = client.get(f"/api/books/{book_id}/read", headers=auth_headers())
+    assert resp.status_code == 404
+    assert resp.json["error"]["code"] == "book_content_not_found"
+
+
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_book_read_urls_validates_ids(mock_validate, client):
+    resp = client.post("/api/books/read-urls", json={}, headers=auth_headers())
+    assert resp.json["error"]["code"] == "missing_book_ids"
+    resp = client.post(
+        "/api/books/read-urls", json={"book_ids": ["nope"]}, headers=auth_headers()
+    )
+    assert resp.json["error"]["code"] == "invalid_book_id_format"
+    resp = client.post(
+        "/api/books/read-urls", json={"book_ids": []}, headers=auth_headers()
+    )
+    assert resp.status_code == 400
+    assert resp.json["error"]["code"] == "invalid_book_ids"
+
+
+@patch("api.services.book_content_service._download_to")
+@patch("api.services.read_url_service.get_read_url")
+@patch(
+    "api.utils.authentication.validate_token_and_get_user_id",
+    return_value="123e4567-e89b-12d3-a456-426614174000",
+)
+def test_get_book_content_serves_ranges_from_disk_cache(
+    mock_validate, mock_read_url, mock_download, client, tmp_path, monkeypatch
+):
+    from api.services import book_content_service
+    from api.services.epub_disk_cache import EpubDiskCache
+
+    book_id = "223e4567-e89b-12d3-a456-426614174000"
+    resp = client.get(f"/api/books/{book_id}/content", headers=auth_headers())
+    assert resp.json["error"]["code"] == "content_proxy_disabled"
+
+    monkeypatch.setattr(book_content_service, "EPUB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        book_content_service, "_disk_cache", EpubDiskCache(str(tmp_path), 1 << 20)
+    )
+    mock_read_url.return_value = {
+        "success": True,
+        "status_code": 200,
+        "data": {"signed_url": "https://s/x", "expires_at": "2030-01-01T00:00:00"},
+    }
+    mock_download.side_effect = lambda url, out: out.write(b"PK" + b"0" * 98) > 0
+
+    resp = client.get(
+        f"/api/books/{book_id}/content",
+        headers={**auth_headers(), "Range": "bytes=0-9"},
+    )
+    assert resp.status_code == 206
+    assert resp.data == b"PK00000000"
+    assert resp.headers["Content-Range"] == "bytes 0-9/100"
+    assert resp.mimetype == "application/epub+zip"
+
+    resp = client.get(f"/api/books/{book_id}/content", headers=auth_headers())
+    assert resp.status_code == 200
+    assert len(resp.data) == 100
+    assert "Content-Encoding" not in resp.headers
+    mock_download.assert_called_once()
+
+    resp = client.get(
+        f"/api/books/{book_id}/content",
+        headers={**auth_headers(), "Range": "bytes=500-"},
+    )
+    assert resp.status_code == 416
+    assert resp.headers["Content-Range"] == "bytes */100"
+
+
 # More endpoint tests (books, my-books, etc.) would follow a similar pattern
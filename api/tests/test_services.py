@@ -1,5 +1,21 @@
-from unittest.mock import patch, MagicMock
-from api.services import book_service, categories_service
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from flask import g
+from api.services import (
+    book_service,
+    categories_service,
+    dashboard_service,
+    read_url_service,
+)
+from api.db.cache import get_shared_cache
+from api.db.repositories import InMemoryBooksRepository
+from api.services.category_cache import CategoryTreeCache
+from api.services.epub_disk_cache import EpubDiskCache
+from api.services.preference_updates import PreferenceUpdateQueue
+from api.services.progress_buffer import ProgressWriteBuffer
+from api.utils.pagination import decode_cursor, encode_cursor
+from uuid import uuid4
 
 
 @patch("api.services.book_service.get_supabase_client")
@@ -40,6 +56,14 @@ def test_get_categories_success(mock_categories, mock_client):
     assert cats[0]["name"] == "Fiction"
 
 
+@patch("api.services.categories_service.get_supabase_client")
+@patch("api.services.categories_service.Categories")
+def test_get_categories_empty_table_is_not_an_error(mock_categories, mock_client):
+    mock_categories.return_value.fetch_all.return_value = ("data", [])
+    assert categories_service.get_categories() == []
+    assert categories_service.get_category_tree() == []
+
+
 @patch(
     "api.services.categories_service.get_supabase_client",
     side_effect=Exception("DB error"),
@@ -51,3 +75,643 @@ def test_get_categories_failure(mock_categories, mock_client):
     mock_categories.return_value = mock_repo
     cats = categories_service.get_categories()
     assert cats is None
+
+
+@patch("api.services.dashboard_service.close_async_client", new_callable=AsyncMock)
+@patch(
+    "api.services.dashboard_service.get_async_supabase_client", new_callable=AsyncMock
+)
+@patch(
+    "api.services.dashboard_service.get_user_subscription_status_async",
+    new_callable=AsyncMock,
+    side_effect=Exception("Stripe down"),
+)
+@patch("api.services.dashboard_service.get_user_library_async", new_callable=AsyncMock)
+@patch("api.services.dashboard_service.get_categories_async", new_callable=AsyncMock)
+@patch(
+    "api.services.dashboard_service.get_discover_books_async", new_callable=AsyncMock
+)
+def test_get_dashboard_isolates_failed_sections(
+    mock_books,
+    mock_categories,
+    mock_library,
+    mock_subscription,
+    mock_client,
+    mock_close,
+    app,
+):
+    mock_books.return_value = [{"id": 1, "title": "Book"}]
+    mock_categories.return_value = [{"id": 1, "name": "Fiction"}]
+    mock_library.return_value = {"reading": []}
+    with app.test_request_context():
+        dashboard = asyncio.run(dashboard_service.get_dashboard("user-id"))
+    assert dashboard["subscription_status"] is None
+    assert dashboard["books"][0]["title"] == "Book"
+    assert dashboard["categories"][0]["name"] == "Fiction"
+    mock_close.assert_awaited_once_with(mock_client.return_value)
+
+
+@patch("api.services.dashboard_service.close_async_client", new_callable=AsyncMock)
+@patch(
+    "api.services.dashboard_service.stripe.Subscription.retrieve_async",
+    new_callable=AsyncMock,
+)
+@patch(
+    "api.services.dashboard_service.get_async_supabase_admin_client",
+    new_callable=AsyncMock,
+)
+def test_get_user_subscription_status_async_deactivates_and_closes(
+    mock_admin, mock_retrieve, mock_close
+):
+    admin = MagicMock()
+    profile_query = admin.table.return_value.select.return_value.eq.return_value
+    profile_query.maybe_single.return_value.execute = AsyncMock(
+        return_value=MagicMock(
+            data={"subscription_status": "active", "stripe_subscription_id": "sub_1"}
+        )
+    )
+    update = admin.table.return_value.update.return_value.eq.return_value
+    update.execute = AsyncMock()
+    mock_admin.return_value = admin
+    mock_retrieve.return_value = MagicMock(status="canceled")
+
+    status = asyncio.run(dashboard_service.get_user_subscription_status_async("u1"))
+    assert status == "inactive"
+    update.execute.assert_awaited_once()
+    mock_close.assert_awaited_once_with(admin)
+
+
+@patch("api.services.book_service.get_supabase_client")
+def test_get_discover_books_page_returns_next_cursor(mock_client):
+    mock_rpc = MagicMock()
+    first, second = str(uuid4()), str(uuid4())
+    mock_rpc.rpc.return_value.execute.return_value.data = [
+        {"id": first, "created_at": "2025-01-02T00:00:00+00:00"},
+        {"id": second, "created_at": "2025-01-01T00:00:00+00:00"},
+    ]
+    mock_client.return_value = mock_rpc
+    page = book_service.get_discover_books_page(cursor=None, limit=1)
+    assert page["books"] == [{"id": first}]
+    assert decode_cursor(page["next_cursor"]) == ("2025-01-02T00:00:00+00:00", first)
+
+
+def test_decode_cursor_accepts_postgres_fractional_seconds():
+    book_id = str(uuid4())
+    for timestamp in (
+        "2024-05-01T12:34:56.12345+00:00",
+        "2024-05-01T12:34:56.1+00:00",
+        "2024-05-01T12:34:56.123456Z",
+    ):
+        assert decode_cursor(encode_cursor(timestamp, book_id)) == (timestamp, book_id)
+
+
+def test_get_discover_books_page_rejects_invalid_cursor():
+    with pytest.raises(ValueError):
+        book_service.get_discover_books_page(cursor="not-a-cursor", limit=10)
+
+
+@patch("api.services.book_service.get_supabase_client")
+def test_get_user_library_shelves_trims_and_paginates(mock_client):
+    ids = {i: str(uuid4()) for i in (3, 2, 1)}
+    books = [
+        {"book_id": ids[i], "last_progress_update_at": f"2025-01-0{i}"}
+        for i in (3, 2, 1)
+    ]
+    mock_rpc = MagicMock()
+    mock_rpc.rpc.return_value.execute.return_value.data = {
+        "reading": {"count": 5, "books": books}
+    }
+    mock_client.return_value = mock_rpc
+    result = book_service.get_user_library_shelves("user-id", shelf_limit=2)
+    assert [b["book_id"] for b in result["library"]["reading"]] == [ids[3], ids[2]]
+    assert result["counts"] == {
+        "reading": 5,
+        "to_read": 0,
+        "finished": 0,
+        "abandoned": 0,
+    }
+    assert decode_cursor(result["next_cursors"]["reading"]) == ("2025-01-02", ids[2])
+    assert result["next_cursors"]["to_read"] is None
+
+
+@patch("api.services.book_service._progress_repository")
+def test_get_user_library_shelves_returns_whole_shelves_by_default(mock_repo):
+    books = [
+        {"book_id": str(uuid4()), "last_progress_update_at": "2025-01-01"}
+        for _ in range(30)
+    ]
+    fetch = mock_repo.return_value.fetch_library_shelves
+    fetch.return_value = {"reading": {"count": 30, "books": books}}
+    result = book_service.get_user_library_shelves("user-id")
+    fetch.assert_called_once_with(None, None, None, None)
+    assert len(result["library"]["reading"]) == 30
+    assert result["next_cursors"]["reading"] is None
+
+
+def test_get_user_library_shelves_requires_status_for_cursor():
+    with pytest.raises(ValueError):
+        book_service.get_user_library_shelves("user-id", cursor="abc")
+
+
+def test_progress_buffer_coalesces_updates_per_book():
+    flush_fn = MagicMock()
+    buffer = ProgressWriteBuffer(flush_fn, interval=60)
+    buffer.add("u1", "b1", {"progress_percentage": 10})
+    buffer.add("u1", "b1", {"progress_percentage": 25})
+    buffer.add("u1", "b2", {"status": "finished"})
+    assert buffer.flush() == 2
+    flush_fn.assert_called_once_with(
+        [
+            {"user_id": "u1", "book_id": "b1", "progress_percentage": 25},
+            {"user_id": "u1", "book_id": "b2", "status": "finished"},
+        ]
+    )
+    assert buffer.stats()["coalesced"] == 1
+    buffer.shutdown()
+
+
+def test_progress_buffer_retries_failed_flush():
+    flush_fn = MagicMock(side_effect=[RuntimeError("db down"), None])
+    buffer = ProgressWriteBuffer(flush_fn, interval=60)
+    buffer.add("u1", "b1", {"progress_percentage": 10})
+    assert buffer.flush() == 0
+    buffer.add("u1", "b1", {"progress_percentage": 30})
+    assert buffer.stats()["pending"] == 1
+    buffer.shutdown()
+    assert flush_fn.call_args.args[0] == [
+        {"user_id": "u1", "book_id": "b1", "progress_percentage": 30}
+    ]
+    assert buffer.stats()["failed_flushes"] == 1
+
+
+def test_progress_buffer_splits_batch_after_repeated_failures():
+    def flush_fn(rows):
+        if any(row["book_id"] == "bad" for row in rows):
+            raise RuntimeError("violates foreign key constraint")
+
+    buffer = ProgressWriteBuffer(flush_fn, interval=60, max_retries=1)
+    buffer.add("u1", "bad", {"progress_percentage": 10})
+    buffer.add("u2", "b1", {"progress_percentage": 20})
+    assert buffer.flush() == 0
+    assert buffer.flush() == 1
+    stats = buffer.stats()
+    assert stats["pending"] == 0
+    assert stats["dropped_rows"] == 1
+    assert stats["rows_written"] == 1
+    buffer.shutdown()
+
+
+def test_progress_buffer_rejects_new_books_when_full():
+    buffer = ProgressWriteBuffer(MagicMock(), interval=60, max_pending=1)
+    assert buffer.add("u1", "b1", {"progress_percentage": 10}) is True
+    assert buffer.add("u1", "b1", {"progress_percentage": 20}) is True
+    assert buffer.add("u1", "b2", {"progress_percentage": 10}) is False
+    assert buffer.take("u1", "b1") == {"progress_percentage": 20}
+    assert buffer.stats()["rejected"] == 1
+    buffer.shutdown()
+
+
+@patch("api.services.book_service._progress_repository")
+@patch("api.services.book_service.progress_buffer")
+@patch("api.services.book_service.PROGRESS_WRITE_BEHIND", True)
+def test_update_user_book_progress_write_behind(mock_buffer, mock_repo, app):
+    mock_buffer.add.return_value = True
+    mock_buffer.is_pending.return_value = False
+    mock_repo.return_value.has_book.return_value = True
+    result = book_service.update_user_book_progress("u1", "b1", progress=40)
+    assert result["status_code"] == 202
+    assert result["data"]["queued"] is True
+    mock_buffer.add.assert_called_once_with("u1", "b1", {"progress_percentage": 40})
+    mock_repo.return_value.update_book_progress.assert_not_called()
+
+    # Status changes are written through, including the buffered progress.
+    mock_buffer.take.return_value = {"progress_percentage": 40}
+    mock_repo.return_value.update_book_progress.return_value = None
+    with app.test_request_context():
+        result = book_service.update_user_book_progress("u1", "b1", status="finished")
+    assert result["status_code"] == 404
+    mock_repo.return_value.update_book_progress.assert_called_once_with(
+        "u1", "b1", {"progress_percentage": 40, "status": "finished"}
+    )
+    # The failed write-through puts the buffered progress back.
+    mock_buffer.restore.assert_called_once_with("u1", "b1", {"progress_percentage": 40})
+
+    # A full buffer falls back to the synchronous write.
+    mock_buffer.add.return_value = False
+    mock_repo.return_value.update_book_progress.return_value = {"book_id": "b1"}
+    result = book_service.update_user_book_progress("u1", "b1", progress=50)
+    assert result["status_code"] == 200
+
+
+def test_progress_buffer_restore_keeps_newer_updates():
+    buffer = ProgressWriteBuffer(MagicMock(), interval=60)
+    buffer._stopped.set()
+    buffer.add("u1", "b1", {"progress_percentage": 10})
+    taken = buffer.take("u1", "b1")
+    buffer.add("u1", "b1", {"progress_percentage": 30})
+    buffer.restore("u1", "b1", {**taken, "status": "reading"})
+    assert buffer.take("u1", "b1") == {"progress_percentage": 30, "status": "reading"}
+
+
+@patch("api.services.book_service._progress_repository")
+@patch("api.services.book_service.progress_buffer")
+@patch("api.services.book_service.PROGRESS_WRITE_BEHIND", True)
+def test_update_user_book_progress_checks_before_buffering(mock_buffer, mock_repo, app):
+    for bad in (
+        {"progress": 150},
+        {"progress": -1},
+        {"progress": "40"},
+        {"progress": True},
+        {"status": "lost"},
+    ):
+        with pytest.raises(ValueError):
+            book_service.update_user_book_progress("u1", "b1", **bad)
+    mock_buffer.add.assert_not_called()
+
+    # A book outside the library is not buffered and still gets a 404.
+    mock_buffer.is_pending.return_value = False
+    mock_repo.return_value.has_book.return_value = False
+    mock_repo.return_value.update_book_progress.return_value = None
+    with app.test_request_context():
+        result = book_service.update_user_book_progress("u1", "b1", progress=40.5)
+    assert result["status_code"] == 404
+    mock_buffer.add.assert_not_called()
+
+    # Books already buffered skip the library check.
+    mock_buffer.is_pending.return_value = True
+    mock_buffer.add.return_value = True
+    mock_repo.return_value.has_book.reset_mock()
+    result = book_service.update_user_book_progress("u1", "b1", progress=41)
+    assert result["status_code"] == 202
+    mock_repo.return_value.has_book.assert_not_called()
+
+
+@patch("api.services.book_service.get_supabase_client")
+def test_add_books_to_user_library_counts_outcomes(mock_client):
+    outcomes = [
+        {"book_id": "b1", "outcome": "created"},
+        {"book_id": "b2", "outcome": "already_exists"},
+        {"book_id": "b3", "outcome": "not_found"},
+    ]
+    mock_rpc = MagicMock()
+    mock_rpc.rpc.return_value.execute.return_value.data = outcomes
+    mock_client.return_value = mock_rpc
+    result = book_service.add_books_to_user_library("u1", ["b1", "b2", "b1", "b3"])
+    assert result["status_code"] == 201
+    assert result["data"]["counts"] == {
+        "created": 1,
+        "already_exists": 1,
+        "not_found": 1,
+    }
+    mock_rpc.rpc.assert_called_once_with(
+        "add_books_to_library", {"book_ids": ["b1", "b2", "b3"]}
+    )
+
+
+def test_add_books_to_user_library_rejects_too_many():
+    with pytest.raises(ValueError):
+        book_service.add_books_to_user_library(
+            "u1", [f"b{i}" for i in range(book_service.MAX_BULK_ADD + 1)]
+        )
+
+
+def test_category_tree_cache_indexes_and_counts_hits():
+    categories = [
+        {"id": "fic", "name": "Fiction", "parent_id": None},
+        {"id": "fan", "name": "Fantasy", "parent_id": "fic"},
+        {"id": "epic", "name": "Epic", "parent_id": "fan"},
+        {"id": "sci", "name": "Science", "parent_id": None},
+    ]
+    loader = MagicMock(return_value=categories)
+    cache = CategoryTreeCache(loader, ttl=60)
+
+    tree = cache.get_tree()
+    assert [node["id"] for node in tree] == ["fic", "sci"]
+    assert tree[0]["children"][0]["children"][0]["id"] == "epic"
+    assert cache.get_subtree("fan")["children"][0]["id"] == "epic"
+    assert [c["id"] for c in cache.get_path("epic")] == ["fic", "fan", "epic"]
+    assert cache.get_path("missing") is None
+    loader.assert_called_once()
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 3
+
+    cache.invalidate()
+    cache.get_all()
+    assert loader.call_count == 2
+
+
+@patch("api.services.book_service.get_supabase_client")
+def test_iter_catalog_export_pages_with_keyset(mock_client):
+    batches = [
+        [{"id": "b1", "created_at": "t1"}, {"id": "b2", "created_at": "t2"}],
+        [{"id": "b3", "created_at": "t3"}],
+    ]
+    mock_rpc = MagicMock()
+    mock_rpc.rpc.return_value.execute.side_effect = [
+        MagicMock(data=batch) for batch in batches
+    ]
+    mock_client.return_value = mock_rpc
+    books = list(book_service.iter_catalog_export(batch_size=2))
+    assert [b["id"] for b in books] == ["b1", "b2", "b3"]
+    assert mock_rpc.rpc.call_args.args[1] == {
+        "cursor_created_at": "t2",
+        "cursor_id": "b2",
+        "page_size": 2,
+    }
+
+
+@patch("api.services.book_service._books_repository")
+def test_search_books_reports_total_and_has_more(mock_repo):
+    mock_repo.return_value = InMemoryBooksRepository(
+        [
+            {"id": f"b{i}", "title": f"Dune {i}", "author": "", "description": ""}
+            for i in range(3)
+        ]
+    )
+    result = book_service.search_books("  dune ", page=1, limit=2)
+    assert len(result["books"]) == 2
+    assert result["total"] == 3
+    assert result["has_more"] is True
+    assert "total_count" not in result["books"][0]
+
+    past_end = book_service.search_books("dune", page=5, limit=2)
+    assert past_end["books"] == []
+    assert past_end["total"] is None
+    assert past_end["has_more"] is False
+    assert book_service.search_books("tolkien", page=1, limit=2)["total"] == 0
+
+    with pytest.raises(ValueError):
+        book_service.search_books("   ", page=1, limit=2)
+
+
+@patch("api.services.book_service.get_supabase_client")
+def test_get_discover_books_page_filters_by_category(mock_client):
+    mock_rpc = MagicMock()
+    mock_rpc.rpc.return_value.execute.return_value.data = [
+        {"id": "b1", "created_at": "2025-01-02T00:00:00+00:00"}
+    ]
+    mock_client.return_value = mock_rpc
+    page = book_service.get_discover_books_page(cursor=None, limit=10, category_id="c1")
+    assert page == {"books": [{"id": "b1"}], "next_cursor": None}
+    name, params = mock_rpc.rpc.call_args.args
+    assert name == "get_discover_books_in_category_after"
+    assert params["filter_category_id"] == "c1"
+    assert params["page_size"] == 11
+
+
+@patch("api.services.book_service._books_repository")
+def test_get_recommendations_ranks_excludes_library_and_caches(mock_repo):
+    book_service.candidate_cache.invalidate()
+    repo = mock_repo.return_value
+    repo.fetch_recommendation_inputs.return_value = {
+        "categories": [
+            {"category_id": "scifi", "score": 0.9},
+            {"category_id": "space", "score": 0.6},
+        ],
+        "library_book_ids": ["owned"],
+    }
+    repo.fetch_category_candidates.return_value = [
+        {"category_id": "scifi", "id": "owned", "candidate_score": 1.0},
+        {"category_id": "scifi", "id": "dune", "candidate_score": 0.9},
+        {"category_id": "scifi", "id": "solaris", "candidate_score": 0.5},
+        {"category_id": "space", "id": "solaris", "candidate_score": 1.0},
+        {"category_id": "space", "id": "cosmos", "candidate_score": 0.2},
+    ]
+
+    result = book_service.get_recommendations(page=1, limit=2)
+    # solaris: 0.9 * 0.5 + 0.6 * 1.0 beats dune's 0.9 * 0.9.
+    assert [b["id"] for b in result["books"]] == ["solaris", "dune"]
+    assert result["books"][0]["because_category_id"] == "space"
+    assert "candidate_score" not in result["books"][0]
+    assert result["has_more"] is True
+
+    result = book_service.get_recommendations(page=2, limit=2)
+    assert [b["id"] for b in result["books"]] == ["cosmos"]
+    assert result["has_more"] is False
+    # Candidate lists are shared and cached; only the per-user inputs are re-read.
+    assert repo.fetch_category_candidates.call_count == 1
+    assert repo.fetch_recommendation_inputs.call_count == 2
+
+    # Invalidating the shared entity (as the preference job does) reaches the
+    # in-process lists too.
+    get_shared_cache().invalidate("candidates")
+    book_service.get_recommendations(page=1, limit=2)
+    assert repo.fetch_category_candidates.call_count == 2
+    book_service.candidate_cache.invalidate()
+
+
+@patch("api.services.book_service._progress_repository")
+@patch("api.services.book_service._books_repository")
+def test_get_discover_books_is_cached_per_user(mock_repo, mock_progress, app):
+    fetch = mock_repo.return_value.fetch_discover_books
+    fetch.return_value = [{"id": "b1", "is_in_library": False}]
+    mock_progress.return_value.add_book_for_user.return_value = {"book_id": "b1"}
+
+    with app.test_request_context():
+        g.user_id = "user-1"
+        book_service.get_discover_books(1, 10)
+        book_service.get_discover_books(1, 10)
+        assert fetch.call_count == 1
+
+        g.user_id = "user-2"
+        book_service.get_discover_books(1, 10)
+        assert fetch.call_count == 2
+
+        # Adding a book only invalidates that user's pages.
+        book_service.add_book_to_user_library("user-1", "b1")
+        g.user_id = "user-1"
+        book_service.get_discover_books(1, 10)
+        g.user_id = "user-2"
+        book_service.get_discover_books(1, 10)
+        assert fetch.call_count == 3
+
+
+@patch("api.services.book_service._books_repository")
+def test_get_discover_books_json_is_keyed_on_content_versions(mock_repo, app):
+    fetch = mock_repo.return_value.fetch_discover_books
+    fetch.return_value = [{"id": "b1", "is_in_library": False}]
+    before = {"catalog": "10", "library": "2"}
+
+    with app.test_request_context():
+        g.user_id = "user-1"
+        book_service.get_discover_books_json(1, 10, before)
+        book_service.get_discover_books_json(1, 10, before)
+        assert fetch.call_count == 1
+
+        # A catalog change must not reuse the page cached under the old version.
+        fetch.return_value = [{"id": "b2", "is_in_library": False}]
+        raw = book_service.get_discover_books_json(1, 10, {**before, "catalog": "11"})
+        assert fetch.call_count == 2
+        assert b"b2" in raw
+
+
+@patch("api.services.read_url_service.get_supabase_admin_client")
+def test_get_read_urls_signs_per_bucket_and_caches(mock_admin, app):
+    signed, missing, broken = (
+        "123e4567-e89b-12d3-a456-426614174001",
+        "123e4567-e89b-12d3-a456-426614174002",
+        "123e4567-e89b-12d3-a456-426614174003",
+    )
+    client = MagicMock()
+    client.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+        {"id": signed, "epub_storage_path": "public-epubs/a.epub"},
+        {"id": missing, "epub_storage_path": None},
+        {"id": broken, "epub_storage_path": "public-epubs/b.epub"},
+    ]
+    sign = client.storage.from_.return_value.create_signed_urls
+    sign.return_value = [
+        {"path": "a.epub", "signedURL": "https://s/a", "error": None},
+        {
+            "path": "b.epub",
+            "signedURL": None,
+            "error": "Either the object does not exist",
+        },
+    ]
+    mock_admin.return_value = client
+
+    with app.test_request_context():
+        g.request_id = "test"
+        result = read_url_service.get_read_urls([signed, missing, broken])
+        assert result["data"]["urls"][signed]["signed_url"] == "https://s/a"
+        assert result["data"]["unavailable"] == [missing]
+        assert result["data"]["failed"] == [broken]
+        client.storage.from_.assert_called_once_with("public-epubs")
+        assert sorted(sign.call_args[0][0]) == ["a.epub", "b.epub"]
+
+        # The cached signature is reused; only the failed book is re-signed.
+        again = read_url_service.get_read_url(signed)
+        assert again["data"]["signed_url"] == "https://s/a"
+        assert sign.call_count == 1
+        assert read_url_service.get_read_url(missing)["status_code"] == 404
+        assert read_url_service.get_read_url(broken)["status_code"] == 500
+        assert sign.call_count == 2
+
+        # Books without content are looked up again rather than cached as such.
+        lookups = client.table.return_value.select.return_value.in_.call_count
+        read_url_service.get_read_url(missing)
+        assert client.table.return_value.select.return_value.in_.call_count > lookups
+
+
+def test_get_read_urls_rejects_oversized_batch():
+    with pytest.raises(ValueError):
+        read_url_service.get_read_urls(
+            [f"123e4567-e89b-12d3-a456-{i:012d}" for i in range(51)]
+        )
+
+
+def test_epub_disk_cache_evicts_lru_by_size_but_not_pinned(tmp_path):
+    cache = EpubDiskCache(str(tmp_path), max_bytes=10)
+    downloads = []
+
+    def writer(key, size=4):
+        def download(out):
+            downloads.append(key)
+            out.write(b"x" * size)
+            return True
+
+        return download
+
+    with cache.pinned("a", writer("a")) as path:
+        assert open(path, "rb").read() == b"xxxx"
+    with cache.pinned("b", writer("b")):
+        pass
+    with cache.pinned("a", writer("a")):
+        pass  # hit, and "a" becomes the most recently used
+    with cache.pinned("c", writer("c")):
+        pass
+    assert downloads == ["a", "b", "c"]
+    assert not (tmp_path / "b.epub").exists()
+    assert cache.stats()["bytes"] == 8
+
+    with cache.pinned("a", writer("a")):
+        # "a" is in use, so the oversized download evicts "c" only.
+        with cache.pinned("d", writer("d", size=9)):
+            assert (tmp_path / "a.epub").exists()
+            assert not (tmp_path / "c.epub").exists()
+    # Once released, "d" alone no longer fits next to "a" and goes next.
+    assert cache.stats()["evictions"] == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.epub"]
+
+    with cache.pinned("e", lambda out: False) as path:
+        assert path is None
+    assert cache.stats()["download_errors"] == 1
+    assert list(tmp_path.glob("*.part")) == []
+
+    # A new process reuses the files already on disk.
+    other = EpubDiskCache(str(tmp_path), max_bytes=10)
+    assert other.stats()["files"] == 1
+
+    # A file removed by another process is downloaded again instead of served.
+    (tmp_path / "a.epub").unlink()
+    with other.pinned("a", writer("a")) as path:
+        assert open(path, "rb").read() == b"xxxx"
+    assert other.stats()["vanished"] == 1
+    assert other.stats()["bytes"] == 4
+
+
+def test_preference_update_queue_debounces_per_user():
+    apply_fn = MagicMock()
+    queue = PreferenceUpdateQueue(apply_fn, debounce=60, max_delay=120)
+    queue._stopped.set()  # drive processing by hand
+    queue.enqueue("u1", ["b1"])
+    queue.enqueue("u1", ["b2"])
+    queue.enqueue("u2", ["b1"])
+
+    assert queue.process_due() == 0  # still inside the debounce window
+    assert queue.process_due(force=True) == 2
+    assert sorted(apply_fn.call_args.args[0]) == [
+        ("u1", "b1"),
+        ("u1", "b2"),
+        ("u2", "b1"),
+    ]
+    assert queue.stats()["debounced"] == 1
+
+
+def test_preference_update_queue_requeues_failed_batch():
+    apply_fn = MagicMock(side_effect=[RuntimeError("db down"), None])
+    queue = PreferenceUpdateQueue(apply_fn, debounce=0, max_delay=0)
+    queue._stopped.set()
+    queue.enqueue("u1", ["b1"])
+    assert queue.process_due() == 0
+    assert queue.stats()["pending_users"] == 1
+    assert queue.process_due() == 1
+    assert apply_fn.call_args.args[0] == [("u1", "b1")]
+
+
+def test_preference_update_queue_drops_users_that_keep_failing():
+    def apply_fn(changes):
+        if any(user_id == "bad" for user_id, _ in changes):
+            raise RuntimeError("bad row")
+
+    queue = PreferenceUpdateQueue(apply_fn, debounce=0, max_delay=0, max_retries=1)
+    queue._stopped.set()
+    queue.enqueue("good", ["b1"])
+    queue.enqueue("bad", ["b2"])
+    assert queue.process_due() == 0  # retried once as a batch
+    assert queue.process_due() == 1  # then user by user
+    stats = queue.stats()
+    assert stats["dropped_users"] == 1
+    assert stats["users_rescored"] == 1
+    assert stats["pending_users"] == 0
+
+
+@patch("api.services.progress_buffer.notify_library_change")
+@patch("api.services.progress_buffer.UserReadingProgressRepository")
+@patch("api.services.progress_buffer.get_supabase_admin_client")
+def test_progress_flush_queues_rescore_only_after_write(
+    mock_admin, mock_repo, mock_notify
+):
+    from api.services.progress_buffer import _write_progress_batch
+
+    rows = [
+        {"user_id": "u1", "book_id": "b1", "progress_percentage": 10},
+        {"user_id": "u1", "book_id": "b2", "progress_percentage": 20},
+    ]
+    mock_repo.return_value.apply_progress_batch.return_value = None
+    with pytest.raises(RuntimeError):
+        _write_progress_batch(rows)
+    mock_notify.assert_not_called()
+
+    mock_repo.return_value.apply_progress_batch.return_value = 2
+    _write_progress_batch(rows)
+    mock_notify.assert_called_once_with("u1", ["b1", "b2"])
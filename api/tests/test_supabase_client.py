@@ -0,0 +1,293 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from flask import g
+from api.db import supabase_client
+from api.db.cache import LocalCache, SharedCache
+from api.db.request_scope import get_request_scoped, spawn_with_request_context
+from api.db.supabase_client import (
+    SupabaseClientPool,
+    get_supabase_admin_client,
+    get_supabase_client,
+)
+
+
+@pytest.fixture
+def pooled_client(monkeypatch):
+    client = MagicMock()
+    client.postgrest.session.headers = {}
+    monkeypatch.setattr(supabase_client, "SUPABASE_URL", "http://dummy-url")
+    monkeypatch.setattr(supabase_client, "SUPABASE_ANON_KEY", "dummy-key")
+    monkeypatch.setattr(
+        supabase_client, "_client_pool", SupabaseClientPool(lambda: client)
+    )
+    return client
+
+
+def test_pool_reuses_released_clients():
+    factory = MagicMock(side_effect=lambda: MagicMock())
+    pool = SupabaseClientPool(factory, max_size=2, acquire_timeout=0.01)
+    client = pool.acquire()
+    pool.release(client)
+    assert pool.acquire() is client
+    assert factory.call_count == 1
+
+
+def test_pool_release_resets_authorization_header():
+    client = MagicMock()
+    client.postgrest.session.headers = {"Authorization": "Bearer user-jwt"}
+    pool = SupabaseClientPool(lambda: client, max_size=1)
+    pool.release(pool.acquire())
+    assert client.postgrest.session.headers["Authorization"] != "Bearer user-jwt"
+
+
+def test_pool_times_out_when_exhausted():
+    pool = SupabaseClientPool(MagicMock, max_size=1, acquire_timeout=0.01)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["in_use"] == 1
+    assert stats["timeouts_total"] == 1
+
+
+def test_stateless_mode_forwards_verified_jwt_without_gotrue(
+    app, pooled_client, monkeypatch
+):
+    monkeypatch.setattr(supabase_client, "SUPABASE_CLIENT_MODE", "stateless")
+    with app.test_request_context():
+        g.user_id = "123e4567-e89b-12d3-a456-426614174000"
+        g.user_jwt = "user-jwt"
+        g.refresh_token = None
+        client = get_supabase_client()
+        assert client.postgrest.session.headers["Authorization"] == "Bearer user-jwt"
+    pooled_client.auth.get_user.assert_not_called()
+
+
+def test_stateless_mode_ignores_unverified_jwt(app, pooled_client, monkeypatch):
+    monkeypatch.setattr(supabase_client, "SUPABASE_CLIENT_MODE", "stateless")
+    with app.test_request_context():
+        g.user_id = None
+        g.user_jwt = "forged-jwt"
+        client = get_supabase_client()
+        assert client.postgrest.session.headers == {}
+
+
+def test_admin_client_is_created_once(monkeypatch):
+    monkeypatch.setattr(supabase_client, "_admin_client", None)
+    monkeypatch.setattr(supabase_client, "SUPABASE_SERVICE_KEY", "service-key")
+    monkeypatch.setattr(supabase_client, "SUPABASE_URL", "http://dummy-url")
+    monkeypatch.setattr(supabase_client, "SUPABASE_ANON_KEY", "dummy-key")
+    mock_create = MagicMock()
+    monkeypatch.setattr(supabase_client, "create_client", mock_create)
+    first = get_supabase_admin_client()
+    assert get_supabase_admin_client() is first
+    assert mock_create.call_count == 1
+
+
+def test_admin_warm_up_failure_is_reported(monkeypatch):
+    admin = MagicMock()
+    admin.postgrest.session.head.side_effect = ConnectionError("dns failure")
+    monkeypatch.setattr(supabase_client, "_admin_client", admin)
+    monkeypatch.setattr(supabase_client, "get_supabase_admin_client", lambda: admin)
+    monkeypatch.setattr(
+        supabase_client, "_admin_state", dict(supabase_client._admin_state)
+    )
+    assert supabase_client.warm_up_admin_client() is False
+    health = supabase_client.get_admin_client_health()
+    assert health["initialized"] is True
+    assert health["warmed_up"] is False
+    assert health["last_error"] == "ConnectionError"
+
+
+def test_client_is_borrowed_once_per_request(app, pooled_client):
+    with app.test_request_context():
+        g.user_id = None
+        g.user_jwt = None
+        g.refresh_token = None
+        assert get_supabase_client() is get_supabase_client()
+        assert supabase_client._client_pool.stats()["borrowed_total"] == 1
+    assert supabase_client._client_pool.stats()["in_use"] == 0
+
+
+def test_request_scope_keys_do_not_contain_the_jwt(app, pooled_client):
+    with app.test_request_context():
+        g.user_id = "user-1"
+        g.user_jwt = "secret.jwt.token"
+        g.refresh_token = None
+        get_supabase_client()
+        keys = list(g._request_scope)
+        assert len(keys) == 1
+        assert "secret.jwt.token" not in keys[0]
+
+
+def test_request_scope_closes_objects_on_teardown(app):
+    close = MagicMock()
+    with app.test_request_context():
+        first = get_request_scoped("repo", object, close=close)
+        assert get_request_scoped("repo", object, close=close) is first
+    close.assert_called_once_with(first)
+
+
+def test_shared_cache_hits_return_stored_bytes():
+    cache = SharedCache(LocalCache())
+    loader = MagicMock(return_value={"books": [{"id": "b1"}]})
+    first = cache.get_or_load("catalog", ("page", 1), loader)
+    second = cache.get_or_load("catalog", ("page", 1), loader)
+    assert loader.call_count == 1
+    assert second.raw == first.raw == b'{"books":[{"id":"b1"}]}'
+    assert second.data == {"books": [{"id": "b1"}]}
+    assert cache.get_or_load("catalog", ("page", 2), lambda: None) is None
+
+
+def test_shared_cache_invalidate_bumps_version_for_all_instances():
+    backend = LocalCache()
+    first, second = SharedCache(backend), SharedCache(backend)
+    first.get_or_load("categories", ("all",), lambda: ["fiction"])
+    assert second.get_or_load("categories", ("all",), lambda: ["stale"]).data == [
+        "fiction"
+    ]
+
+    second.invalidate("categories")
+    first._versions.clear()  # as if CACHE_VERSION_TTL had passed
+    assert first.get_or_load("categories", ("all",), lambda: ["poetry"]).data == [
+        "poetry"
+    ]
+
+
+def test_shared_cache_version_counters_expire():
+    backend = MagicMock()
+    backend.incr.return_value = 1
+    SharedCache(backend).invalidate("discover", scope="user-1")
+    key, ex = backend.incr.call_args.args[0], backend.incr.call_args.kwargs["ex"]
+    assert key.endswith(":discover:user-1:version")
+    assert ex >= 600 + 60
+
+    local = LocalCache()
+    assert local.incr("counter", ex=1, start=100) == 101
+    assert local.incr("counter", ex=1, start=500) == 102
+    local._entries["counter"] = (time.monotonic() - 1, b"1")  # as if 1s had passed
+    assert local.get("counter") is None
+
+
+def test_shared_cache_fails_open_on_backend_errors():
+    backend = MagicMock()
+    backend.get.side_effect = ConnectionError("redis down")
+    cache = SharedCache(backend)
+    assert cache.get_or_load("categories", ("all",), lambda: [1]).data == [1]
+    assert cache.stats()["entities"]["categories"]["errors"] == 1
+
+
+def test_shared_cache_loads_only_missing_ids_in_one_batch():
+    cache = SharedCache(LocalCache())
+    cache.get_or_load_many("candidates", ["c1"], lambda ids: {"c1": ["b1"]})
+    loader = MagicMock(return_value={"c2": ["b2"], "c3": []})
+    found = cache.get_or_load_many("candidates", ["c1", "c2", "c3"], loader)
+    loader.assert_called_once_with(["c2", "c3"])
+    assert {k: v.data for k, v in found.items()} == {
+        "c1": ["b1"],
+        "c2": ["b2"],
+        "c3": [],
+    }
+
+
+def test_shared_cache_coalesces_concurrent_misses():
+    cache = SharedCache(LocalCache())
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return {"page": 1}
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                cache.get_or_load("discover", (1,), slow_loader)
+            )
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert [r.data for r in results] == [{"page": 1}] * 8
+    assert cache.stats()["entities"]["discover"]["coalesced"] == 7
+
+
+def test_shared_cache_refreshes_hot_keys_early():
+    cache = SharedCache(LocalCache(), early_refresh_beta=1e9)
+
+    def get(loader):
+        # Without a stale TTL the early refresh runs inline.
+        return cache.get_or_load("categories", ("all",), loader, stale_ttl=0)
+
+    get(lambda: time.sleep(0.01) or ["old"])
+    # With a huge beta every hit decides to refresh; a failed refresh keeps the old value.
+    assert get(lambda: None).data == ["old"]
+    assert get(lambda: ["new"]).data == ["new"]
+    assert cache.stats()["entities"]["categories"]["early_refreshes"] == 2
+
+    cache.early_refresh_beta = 0
+    assert get(lambda: ["newer"]).data == ["new"]
+
+
+def test_shared_cache_serves_stale_while_revalidating_and_on_error():
+    cache = SharedCache(LocalCache(), early_refresh_beta=0)
+    refreshes = []
+
+    def get(loader):
+        return cache.get_or_load(
+            "discover", (1,), loader, ttl=1, stale_ttl=60, background=refreshes.append
+        )
+
+    get(lambda: ["v1"])
+    key = next(iter(cache._l1))
+    entry = cache._l1[key]
+    cache._l1[key] = entry._replace(expires_at=time.time() - 5)  # as if expired
+
+    stale = get(lambda: ["v2"])
+    assert stale.data == ["v1"]
+    assert stale.stale_reason == "revalidating" and stale.stale_for >= 5
+    assert len(refreshes) == 1
+    # Only one refresh is scheduled while it is pending.
+    assert get(lambda: ["v2"]).stale_for is not None
+    assert len(refreshes) == 1
+
+    def fail():
+        raise ConnectionError("upstream down")
+
+    refreshes.clear()
+    cache._flights.clear()  # drop the refresh that was never run
+    get(fail)
+    refreshes.pop()()  # the refresh fails
+    assert get(fail).stale_reason == "error"
+
+    refreshes.pop()()  # retried in the background; fails again
+    get(lambda: ["v2"])
+    refreshes.pop()()
+    fresh = get(lambda: ["v3"])
+    assert fresh.data == ["v2"] and fresh.stale_for is None
+
+
+def test_spawn_with_request_context_keeps_the_user(app):
+    seen = []
+    done = threading.Event()
+
+    def task():
+        seen.append((g.user_id, g.user_jwt))
+        done.set()
+
+    with app.test_request_context():
+        g.user_id, g.user_jwt = "user-1", "jwt-1"
+        spawn_with_request_context(task)
+    assert done.wait(5)
+    assert seen == [("user-1", "jwt-1")]
@@ -1,3 +1,4 @@
+import inspect
 import jwt
 import os
 
@@ -9,6 +10,7 @@ from functools import wraps
 from flask import request, g, jsonify
 
 from api.utils.logger_config import logger
+from api.db.supabase_client import is_stateless_mode
 
 load_dotenv()
 
@@ -21,25 +23,38 @@ def login_required(func):
     Ensures a valid user is present, otherwise returns 401.
     """
 
+    def unauthorized_response():
+        logger.warning(
+            f"Unauthorized access attempt | Request ID: {getattr(g, 'request_id', None)}"
+        )
+        return (
+            jsonify(
+                {
+                    "error": {
+                        "type": "AuthenticationError",
+                        "message": "Authentication required",
+                        "code": "unauthorized",
+                        "request_id": getattr(g, "request_id", None),
+                    }
+                }
+            ),
+            401,
+        )
+
+    if inspect.iscoroutinefunction(func):
+        # Async views must stay coroutine functions so Flask awaits them.
+        @wraps(func)
+        async def decorated_coroutine(*args, **kwargs):
+            if not g.get("user_id"):
+                return unauthorized_response()
+            return await func(*args, **kwargs)
+
+        return decorated_coroutine
+
     @wraps(func)
     def decorated_function(*args, **kwargs):
         if not g.get("user_id"):
-            logger.warning(
-                f"Unauthorized access attempt | Request ID: {getattr(g, 'request_id', None)}"
-            )
-            return (
-                jsonify(
-                    {
-                        "error": {
-                            "type": "AuthenticationError",
-                            "message": "Authentication required",
-                            "code": "unauthorized",
-                            "request_id": getattr(g, "request_id", None),
-                        }
-                    }
-                ),
-                401,
-            )
+            return unauthorized_response()
         return func(*args, **kwargs)
 
     return decorated_function
@@ -85,7 +100,7 @@ def get_current_user() -> Optional[UUID]:
 
     # Store refresh token
     refresh_token = request.headers.get("refresh-token", None)
-    if not refresh_token:
+    if not refresh_token and not is_stateless_mode():
         logger.warning("Refresh token is missing")
 
     g.refresh_token = refresh_token
@@ -0,0 +1,122 @@
+# api/utils/compression.py
+
+import gzip
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+}
+
+_stats: Dict[str, Dict[str, Any]] = {}
+_stats_lock = threading.Lock()
+
+
+def _choose_encoding() -> Optional[str]:
+    """Picks brotli or gzip from Accept-Encoding, preferring brotli on a tie."""
+    accepted = request.accept_encodings
+    candidates = []
+    if brotli is not None and accepted.quality("br") > 0:
+        candidates.append((accepted.quality("br"), 1, "br"))
+    if accepted.quality("gzip") > 0:
+        candidates.append((accepted.quality("gzip"), 0, "gzip"))
+    return max(candidates)[2] if candidates else None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical bodies.
+    return gzip.compress(data, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _record(route: str, encoding: str, size_in: int, size_out: int, ms: float):
+    with _stats_lock:
+        entry = _stats.setdefault(
+            route,
+            {"responses": 0, "bytes_in": 0, "bytes_out": 0, "time_ms": 0.0},
+        )
+        entry["responses"] += 1
+        entry["bytes_in"] += size_in
+        entry["bytes_out"] += size_out
+        entry["time_ms"] += ms
+        entry.setdefault("encodings", {}).setdefault(encoding, 0)
+        entry["encodings"][encoding] += 1
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compresses eligible responses with the best encoding the client accepts.
+    To be called via @app.after_request.
+
+    Skipped: streamed/passthrough bodies, bodies below COMPRESSION_MIN_SIZE,
+    non-text mimetypes, responses that already have a Content-Encoding, and
+    anything that is not a plain 200.
+    """
+    if not COMPRESSION_ENABLED or response.status_code != 200:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    started = time.perf_counter()
+    compressed = _compress(data, encoding)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity representation, so a
+    # strong validator no longer applies; If-None-Match still matches weakly.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    route = request.url_rule.rule if request.url_rule else request.path
+    _record(route, encoding, len(data), len(compressed), elapsed_ms)
+    return response
+
+
+def get_compression_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns per-route compression counters with the average ratio and time."""
+    with _stats_lock:
+        report = {}
+        for route, entry in _stats.items():
+            report[route] = {
+                **entry,
+                "encodings": dict(entry.get("encodings", {})),
+                "ratio": round(entry["bytes_out"] / entry["bytes_in"], 3),
+                "avg_time_ms": round(entry["time_ms"] / entry["responses"], 3),
+                "time_ms": round(entry["time_ms"], 3),
+            }
+        return report
@@ -0,0 +1,100 @@
+# api/utils/http_cache.py
+
+import hashlib
+import json
+from typing import Any, Optional
+
+from flask import Response, g, has_request_context, jsonify, request
+
+from api.utils.json_provider import dumps_bytes
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Builds an ETag from version parts (e.g. user id, query args and a data
+    version returned by the database). Returns the unquoted tag.
+    """
+    raw = json.dumps(parts, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def content_etag(payload: Any) -> str:
+    """Builds an ETag from a response payload. Call it before adding request_id."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def not_modified(etag: Optional[str]) -> Optional[Response]:
+    """
+    Returns a 304 response if the request's If-None-Match matches `etag`,
+    otherwise None so the caller builds the full response.
+    """
+    if not etag or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_etag(Response(status=304), etag)
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    """
+    Sets the ETag on a response. `private, no-cache` keeps shared caches out
+    and makes browsers revalidate, which is what turns refetches into 304s.
+    """
+    if etag:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def json_with_etag(payload: Any, etag: Optional[str], status: int = 200):
+    """jsonify()s `payload` plus the request_id and attaches `etag`."""
+    response = jsonify({**payload, "request_id": g.request_id})
+    response.status_code = status
+    return with_etag(response, etag)
+
+
+def raw_json_with_etag(field: str, raw: bytes, etag: Optional[str]) -> Response:
+    """
+    Like json_with_etag({field: ...}), but splices already-encoded JSON bytes
+    (e.g. CachedJSON.raw) into the body instead of decoding and re-encoding.
+    """
+    body = b"".join(
+        (
+            b"{",
+            dumps_bytes(field),
+            b":",
+            raw,
+            b',"request_id":',
+            dumps_bytes(g.request_id),
+            b"}\n",
+        )
+    )
+    return with_etag(Response(body, mimetype="application/json"), etag)
+
+
+def note_stale(stale_for: Optional[float], reason: Optional[str]) -> None:
+    """
+    Records that the current response includes cached data `stale_for`
+    seconds past its TTL, served because a refresh is running ("revalidating")
+    or failed ("error"). add_stale_header() reports the stalest part.
+    """
+    if stale_for is None or not has_request_context():
+        return
+    current = g.get("stale_for")
+    if current is None or stale_for > current:
+        g.stale_for = stale_for
+        g.stale_reason = reason
+
+
+def add_stale_header(response: Response) -> Response:
+    """
+    Marks responses built from stale data with `X-Cache-Stale: <seconds>;
+    reason=<reason>` and drops their ETag, so clients do not keep revalidating
+    old content against a current version. To be called via @app.after_request.
+    """
+    stale_for = g.get("stale_for")
+    if stale_for is None:
+        return response
+    response.headers["X-Cache-Stale"] = f"{int(stale_for)}; reason={g.stale_reason}"
+    response.headers.pop("ETag", None)
+    response.headers["Cache-Control"] = "no-store"
+    return response
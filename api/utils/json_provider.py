@@ -0,0 +1,75 @@
+# api/utils/json_provider.py
+
+import json
+import typing as t
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes with orjson when it is installed.
+
+    Output matches DefaultJSONProvider for everything the API returns: UUIDs
+    and Decimals become strings, dataclasses become objects, and datetimes
+    are passed to Flask's default hook (HTTP date format). Keys are not
+    sorted; debug mode still pretty-prints through the default provider.
+    Anything orjson cannot encode (e.g. integers above 64 bits) falls back
+    to the stdlib encoder.
+    """
+
+    sort_keys = False
+
+    if orjson is not None:
+        _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _orjson_dumps(self, obj: t.Any) -> t.Optional[bytes]:
+        try:
+            return orjson.dumps(obj, default=_default, option=self._OPTIONS)
+        except TypeError:
+            return None
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if orjson is not None and not kwargs:
+            encoded = self._orjson_dumps(obj)
+            if encoded is not None:
+                return encoded.decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: t.Union[str, bytes], **kwargs: t.Any) -> t.Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        encoded = self._orjson_dumps(obj)
+        if encoded is None:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
+
+
+def dumps_bytes(obj: t.Any) -> bytes:
+    """
+    Encodes `obj` to compact UTF-8 JSON with the same semantics as
+    FastJSONProvider, for storing response bodies that are sent as-is later.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=FastJSONProvider._OPTIONS)
+        except TypeError:
+            pass
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def loads_bytes(data: t.Union[str, bytes]) -> t.Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
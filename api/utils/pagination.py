@@ -0,0 +1,51 @@
+# api/utils/pagination.py
+
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Tuple
+from uuid import UUID
+
+# Postgres drops trailing zeros from fractional seconds, and before Python 3.11
+# datetime.fromisoformat only accepts exactly 3 or 6 fractional digits.
+_FRACTION = re.compile(r"\.(\d{1,6})(?=\D|$)")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    value = _FRACTION.sub(lambda m: "." + m.group(1).ljust(6, "0"), value, count=1)
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def encode_cursor(*values: str) -> str:
+    """Encodes keyset values (e.g. created_at and id) into an opaque URL-safe cursor."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decodes a (timestamp, id) cursor produced by encode_cursor.
+    Raises ValueError if the cursor is malformed, the timestamp is not ISO 8601
+    or the id is not a UUID, so a bad cursor never reaches the database.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+    if (
+        not isinstance(values, list)
+        or len(values) != 2
+        or not all(isinstance(value, str) for value in values)
+    ):
+        raise ValueError("Invalid cursor.")
+
+    timestamp, row_id = values
+    try:
+        _parse_timestamp(timestamp)
+        UUID(row_id)
+    except ValueError as e:
+        raise ValueError("Invalid cursor.") from e
+    return timestamp, row_id